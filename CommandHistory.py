@@ -0,0 +1,89 @@
+from collections import deque
+import contextlib
+
+class CommandHistory:
+    """Undo/redo log for a CommandSequence.
+    Every edit is recorded as the splice that made it, [index, removed,
+    inserted], holding the Command objects themselves - they are shared with
+    the sequence, never copied. A step costs memory for what it changed, not
+    for the length of the path: adding a command to a 10k-command path
+    stores one reference, swapping two stores two.
+
+    Edits inside group() (a path file load, a planned route) undo as one
+    step. The oldest steps are dropped past `limit`"""
+
+    def __init__(self, limit=10000):
+        self.undo_steps = deque(maxlen=limit)  # each a list of splices, oldest first
+        self.redo_steps = []
+        self.open_step = None  # the group being recorded
+        self.depth = 0
+
+    def __len__(self):
+        return len(self.undo_steps)
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_steps) or bool(self.open_step)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def record(self, index, removed, inserted):
+        """Note an edit: items[index:index + len(removed)] became `inserted`"""
+        self.redo_steps.clear()
+        if not self.depth:
+            self.undo_steps.append([[index, removed, inserted]])
+            return
+        last = self.open_step[-1] if self.open_step else None
+        if last is not None and not removed and not last[1] and last[0] + len(last[2]) == index:
+            # Appends in a row - one splice, however many commands
+            last[2].extend(inserted)
+        else:
+            self.open_step.append([index, removed, inserted])
+
+    def begin_group(self):
+        if not self.depth:
+            self.open_step = []
+        self.depth += 1
+
+    def end_group(self):
+        if not self.depth:
+            return
+        self.depth -= 1
+        if not self.depth:
+            if self.open_step:
+                self.undo_steps.append(self.open_step)
+            self.open_step = None
+
+    @contextlib.contextmanager
+    def group(self):
+        """Record the edits made inside the block as one undo step"""
+        self.begin_group()
+        try:
+            yield
+        finally:
+            self.end_group()
+
+    def take_undo(self):
+        """The most recent step, moved over to the redo side - None if there is none"""
+        while self.depth:
+            self.end_group()  # undo finishes a group still being recorded
+        if not self.undo_steps:
+            return None
+        step = self.undo_steps.pop()
+        self.redo_steps.append(step)
+        return step
+
+    def take_redo(self):
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return step
+
+    def clear(self):
+        """Forget every step, the current sequence becomes the starting point"""
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.open_step = [] if self.depth else None
@@ -0,0 +1,485 @@
+from Commands import CommandSequence
+import customtkinter
+import sys
+
+ROW_HEIGHT = 60
+ROW_GAP = 10
+ROW_PITCH = ROW_HEIGHT + ROW_GAP
+
+BORDER_COLOR = ("#3b8ed0", "#1f6aa5")
+SELECTED_BORDER_COLOR = ("#ffa94d", "#fd7e14")
+
+# Upload progress of each command, see PipelinedSender
+STATE_STYLES = {
+    "queued": ("…", ("#888888", "#666666")),
+    "sent": ("↗", ("#3b8ed0", "#1f6aa5")),
+    "acked": ("✓", ("#2f9e44", "#51cf66")),
+    "failed": ("✗", ("#e03131", "#ff6b6b")),
+}
+
+class CommandRow(customtkinter.CTkFrame):
+    """One recycled row of the command list - shows whichever command it is bound to"""
+
+    def __init__(self, master, on_up, on_down):
+        super().__init__(
+            master,
+            fg_color=("#ffffff", "#1e1e1e"),
+            border_width=2,
+            border_color=BORDER_COLOR,
+            corner_radius=8,
+            height=ROW_HEIGHT
+        )
+        self.pack_propagate(False)
+        self.index = None  # position in the sequence this row shows
+        self.command_data = None
+        self.selected = False
+        self.state = None
+
+        # Command type label (left side)
+        self.type_label = customtkinter.CTkLabel(
+            self,
+            text="",
+            font=("Arial", 11, "bold"),
+            width=60
+        )
+        self.type_label.pack(side="left", padx=(15, 10), pady=10)
+
+        # Command details (center)
+        self.details_label = customtkinter.CTkLabel(
+            self,
+            text="",
+            font=("Arial", 12),
+            anchor="w"
+        )
+        self.details_label.pack(side="left", padx=10, pady=10, fill="x", expand=True)
+
+        # ID label (right side)
+        self.id_label = customtkinter.CTkLabel(
+            self,
+            text="",
+            font=("Arial", 10),
+            text_color=("#888888", "#666666"),
+            width=50
+        )
+        self.id_label.pack(side="right", padx=(10, 5), pady=10)
+
+        # Upload state (right of the details)
+        self.state_label = customtkinter.CTkLabel(
+            self,
+            text="",
+            font=("Arial", 14, "bold"),
+            width=20
+        )
+        self.state_label.pack(side="right", padx=(5, 0), pady=10)
+
+        # Up/Down buttons for reordering - bound once to the row, they act on
+        # the id of whatever command the row currently shows
+        button_frame = customtkinter.CTkFrame(self, fg_color="transparent", width=60)
+        button_frame.pack(side="right", padx=(0, 10))
+
+        self.up_btn = customtkinter.CTkButton(
+            button_frame,
+            text="↑",
+            width=25,
+            height=25,
+            font=("Arial", 14),
+            fg_color="transparent",
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            border_width=1,
+            border_color=("#c0c0c0", "#404040"),
+            command=lambda: self.command_data and on_up(self.command_data.id)
+        )
+        self.up_btn.pack(side="left", padx=2)
+
+        self.down_btn = customtkinter.CTkButton(
+            button_frame,
+            text="↓",
+            width=25,
+            height=25,
+            font=("Arial", 14),
+            fg_color="transparent",
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            border_width=1,
+            border_color=("#c0c0c0", "#404040"),
+            command=lambda: self.command_data and on_down(self.command_data.id)
+        )
+        self.down_btn.pack(side="left", padx=2)
+
+    def drag_handles(self):
+        """Widgets that start a drag or selection when clicked"""
+        return (self, self.type_label, self.details_label, self.id_label)
+
+    def show(self, index, command_data, selected=False, state=None):
+        """Bind the row to a command, skipping the update if nothing changed"""
+        self.index = index
+
+        if self.command_data is not command_data:
+            self.command_data = command_data
+            if command_data.is_move:
+                # Always forward now, so we can simplify the display
+                self.type_label.configure(text="MOVE", text_color=("#3b8ed0", "#1f6aa5"))
+            else:  # turn
+                self.type_label.configure(text="TURN", text_color=("#9775fa", "#7950f2"))
+            self.details_label.configure(text=command_data.describe())
+            self.id_label.configure(text=f"#{command_data.id}")
+
+        if self.selected != selected:
+            self.selected = selected
+            self.configure(border_color=SELECTED_BORDER_COLOR if selected else BORDER_COLOR)
+
+        if self.state != state:
+            self.state = state
+            text, color = STATE_STYLES.get(state, ("", None))
+            self.state_label.configure(text=text, text_color=color)
+
+
+class CommandListView(customtkinter.CTkFrame):
+    """Virtualized list of command blocks.
+    Only enough row widgets to fill the viewport exist; scrolling rebinds
+    them to different commands. Memory and redraw cost depend on the
+    window height, not on how long the path is.
+
+    The list shows a CommandSequence, whose id -> position index lets
+    reordering touch only the rows showing the moved commands.
+    Click selects, Ctrl-click toggles, Shift-click selects a range, and
+    dragging moves the whole selection as one block"""
+
+    def __init__(self, master, sequence=None, drag_data=None, on_change=None, on_edit=None, **kwargs):
+        super().__init__(
+            master,
+            fg_color=("#e8e8e8", "#2b2b2b"),
+            border_width=2,
+            border_color=("#c0c0c0", "#404040"),
+            corner_radius=8,
+            **kwargs
+        )
+        self.sequence = sequence if sequence is not None else CommandSequence()
+        self.on_change = on_change  # called with the first index an edit touched
+        self.on_edit = on_edit  # called with a command's id when its row is double-clicked
+        self.selected = set()  # ids of selected commands
+        self.states = {}  # id -> upload state of the last send
+        self.select_anchor = None  # id Shift-click extends from
+
+        self.rows = []  # pool of recycled CommandRow widgets
+        self.offset = 0  # scroll position in pixels
+        self.viewport_height = 0
+
+        # State of the drag in progress
+        self.drag_data = drag_data if drag_data is not None else {}
+        self.drag_data.update({"widget": None, "start_y": 0, "original_index": 0, "moved": False})
+
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y", padx=(0, 4), pady=6)
+
+        self.viewport = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True, padx=(4, 0), pady=4)
+        self.viewport.bind("<Configure>", self._on_resize)
+
+        # Empty state message
+        self.empty_label = customtkinter.CTkLabel(
+            self.viewport,
+            text="No commands yet. Add a movement or turn command to begin.",
+            font=("Arial", 11, "italic"),
+            text_color=("#888888", "#666666")
+        )
+        self.empty_label.place(relx=0.5, y=40, anchor="n")
+
+        # Shows where a dragged block will land
+        self.drop_marker = customtkinter.CTkFrame(self.viewport, height=3, fg_color=SELECTED_BORDER_COLOR)
+
+        # Wheel events go to the widget under the mouse, so listen app-wide
+        # and only react when it is one of ours
+        if sys.platform.startswith("linux"):
+            self.bind_all("<Button-4>", self._on_mouse_wheel, add="+")
+            self.bind_all("<Button-5>", self._on_mouse_wheel, add="+")
+        else:
+            self.bind_all("<MouseWheel>", self._on_mouse_wheel, add="+")
+
+    # ----- sequence operations -----
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def items(self):
+        return self.sequence.items
+
+    @property
+    def positions(self):
+        return self.sequence.positions
+
+    def index_of(self, command_id):
+        return self.sequence.index_of(command_id)
+
+    def _changed(self, index):
+        if self.on_change:
+            self.on_change(index)
+
+    def append(self, command):
+        self.sequence.append(command)
+        self.render()
+        self._changed(len(self.items) - 1)
+
+    def extend(self, commands):
+        """Append many commands with one redraw - rows only exist for the visible ones"""
+        first = len(self.items)
+        try:
+            self.sequence.extend(commands)
+        finally:
+            if len(self.items) > first:
+                self.render()
+                self._changed(first)
+
+    def pop(self):
+        command = self.sequence.pop()
+        self.selected.discard(command.id)
+        self._clamp_offset()
+        self.render()
+        self._changed(len(self.items))
+        return command
+
+    def clear(self):
+        self.sequence.clear()
+        self.selected.clear()
+        self.states.clear()
+        self.select_anchor = None
+        self.offset = 0
+        self.render()
+        self._changed(0)
+
+    def swap(self, i, j):
+        """Swap two commands - only the rows showing them change"""
+        self.sequence.swap(i, j)
+        self._refresh_row(i)
+        self._refresh_row(j)
+        self._changed(min(i, j))
+
+    def move_up(self, command_id):
+        index = self.positions[command_id]
+        if index > 0:
+            self.swap(index, index - 1)
+
+    def move_down(self, command_id):
+        index = self.positions[command_id]
+        if index < len(self.items) - 1:
+            self.swap(index, index + 1)
+
+    def move_block(self, command_ids, target):
+        """Move several commands, keeping their order, so they sit together
+        before position `target` (counted before the move)"""
+        low, high = self.sequence.move_block(command_ids, target)
+        self.render()
+        self._changed(low)
+
+    def replace(self, index, command):
+        """Swap in an edited command - only its row redraws"""
+        self.states.pop(self.items[index].id, None)
+        self.sequence.replace(index, command)
+        self._refresh_row(index)
+        self._changed(index)
+
+    def undo(self):
+        """Revert the last edit, returns whether there was one"""
+        return self._replayed(self.sequence.undo())
+
+    def redo(self):
+        return self._replayed(self.sequence.redo())
+
+    def _replayed(self, index):
+        """Show an undone or redone edit. Rows still showing the same
+        command keep their widgets as they are, so only the rows whose
+        command changed are redrawn"""
+        if index is None:
+            return False
+        self.selected = {command_id for command_id in self.selected if command_id in self.positions}
+        self._clamp_offset()
+        self.see(min(index, max(0, len(self.items) - 1)))
+        self.render()
+        self._changed(index)
+        return True
+
+    # ----- selection -----
+
+    def select(self, command_id, toggle=False, extend=False):
+        if extend and self.select_anchor in self.positions:
+            start = self.positions[self.select_anchor]
+            end = self.positions[command_id]
+            if start > end:
+                start, end = end, start
+            self.selected = {self.items[i].id for i in range(start, end + 1)}
+        elif toggle:
+            self.selected ^= {command_id}
+            self.select_anchor = command_id
+        else:
+            self.selected = {command_id}
+            self.select_anchor = command_id
+        self.render()
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.render()
+
+    # ----- upload state -----
+
+    def set_state(self, command_ids, state):
+        """Mark commands as queued/sent/acked/failed - only their rows redraw"""
+        for command_id in command_ids:
+            self.states[command_id] = state
+            if command_id in self.positions:
+                self._refresh_row(self.positions[command_id])
+
+    def reset_states(self, state=None):
+        """Give every command the same state, or none"""
+        self.states = dict.fromkeys(self.positions, state) if state else {}
+        self.render()
+
+    # ----- scrolling -----
+
+    def content_height(self):
+        return len(self.items) * ROW_PITCH
+
+    def _clamp_offset(self):
+        max_offset = max(0, self.content_height() - self.viewport_height)
+        self.offset = max(0, min(self.offset, max_offset))
+
+    def scroll_to(self, offset):
+        self.offset = int(offset)
+        self._clamp_offset()
+        self.render()
+
+    def see(self, index):
+        """Scroll just enough to make a command visible"""
+        top = index * ROW_PITCH
+        if top < self.offset:
+            self.scroll_to(top)
+        elif top + ROW_PITCH > self.offset + self.viewport_height:
+            self.scroll_to(top + ROW_PITCH - self.viewport_height)
+
+    def _on_scrollbar(self, action, value, units=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * self.content_height())
+        elif action == "scroll":
+            step = ROW_PITCH if units == "units" else self.viewport_height
+            self.scroll_to(self.offset + int(value) * step)
+
+    def _on_mouse_wheel(self, event):
+        if not str(event.widget).startswith(str(self)):
+            return
+        if sys.platform.startswith("win"):
+            delta = -int(event.delta / 40)
+        elif sys.platform == "darwin":
+            delta = -event.delta
+        else:
+            delta = -1 if event.num == 4 else 1
+        self.scroll_to(self.offset + delta * ROW_PITCH // 2)
+
+    def _on_resize(self, event):
+        self.viewport_height = event.height
+
+        # Enough rows to cover the viewport, plus one partly scrolled in
+        needed = self.viewport_height // ROW_PITCH + 2
+        while len(self.rows) < needed:
+            row = CommandRow(self.viewport, self.move_up, self.move_down)
+            for handle in row.drag_handles():
+                handle.bind("<ButtonPress-1>", lambda e, r=row: self._on_press(e, r))
+                handle.bind("<B1-Motion>", self._on_drag)
+                handle.bind("<ButtonRelease-1>", self._on_release)
+                handle.bind("<Double-Button-1>", lambda e, r=row: self._on_double_click(r))
+            self.rows.append(row)
+
+        self._clamp_offset()
+        self.render()
+
+    # ----- drag to reorder -----
+
+    def _on_press(self, event, row):
+        if row.command_data is None:
+            return
+        command_id = row.command_data.id
+
+        ctrl = event.state & 0x0004
+        shift = event.state & 0x0001
+        if ctrl or shift or command_id not in self.selected:
+            self.select(command_id, toggle=bool(ctrl), extend=bool(shift))
+
+        self.drag_data["widget"] = row
+        self.drag_data["start_y"] = event.y_root
+        self.drag_data["original_index"] = row.index
+        self.drag_data["moved"] = False
+
+    def _on_double_click(self, row):
+        if self.on_edit and row.command_data is not None:
+            self.on_edit(row.command_data.id)
+
+    def _drop_index(self, y_root):
+        """Insertion position under the pointer"""
+        y = y_root - self.viewport.winfo_rooty() + self.offset
+        return max(0, min(len(self.items), round(y / ROW_PITCH)))
+
+    def _on_drag(self, event):
+        if self.drag_data["widget"] is None:
+            return
+        if not self.drag_data["moved"] and abs(event.y_root - self.drag_data["start_y"]) < 5:
+            return
+        self.drag_data["moved"] = True
+
+        # Scroll when dragging past the top or bottom edge
+        y = event.y_root - self.viewport.winfo_rooty()
+        if y < 0:
+            self.scroll_to(self.offset - ROW_PITCH // 2)
+        elif y > self.viewport_height:
+            self.scroll_to(self.offset + ROW_PITCH // 2)
+
+        target = self._drop_index(event.y_root)
+        marker_y = target * ROW_PITCH - self.offset
+        self.drop_marker.place(relx=0.5, y=max(0, marker_y), anchor="n", relwidth=0.97)
+        self.drop_marker.lift()
+
+    def _on_release(self, event):
+        if self.drag_data["widget"] is None:
+            return
+        if self.drag_data["moved"]:
+            self.drop_marker.place_forget()
+            self.move_block(self.selected, self._drop_index(event.y_root))
+        self.drag_data["widget"] = None
+        self.drag_data["moved"] = False
+
+    # ----- drawing -----
+
+    def _refresh_row(self, index):
+        """Redraw the row showing one position, if it is on screen"""
+        k = index - self.offset // ROW_PITCH
+        if 0 <= k < len(self.rows) and self.rows[k].index == index:
+            command_data = self.items[index]
+            self.rows[k].show(index, command_data, command_data.id in self.selected,
+                              self.states.get(command_data.id))
+
+    def render(self):
+        """Bind the pooled rows to the commands in the visible window"""
+        if self.items:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, y=40, anchor="n")
+
+        first = self.offset // ROW_PITCH
+        for k, row in enumerate(self.rows):
+            index = first + k
+            y = index * ROW_PITCH - self.offset
+            if index < len(self.items) and y < self.viewport_height:
+                command_data = self.items[index]
+                row.show(index, command_data, command_data.id in self.selected,
+                         self.states.get(command_data.id))
+                row.place(relx=0.5, y=y + ROW_GAP // 2, anchor="n", relwidth=0.97)
+            elif row.index is not None:
+                row.place_forget()
+                row.index = None
+                row.command_data = None
+
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = self.content_height()
+        if total <= self.viewport_height or total == 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.viewport_height) / total)
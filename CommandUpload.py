@@ -0,0 +1,98 @@
+from RobotClient import RobotError
+from PipelinedSender import PipelinedSender, check_ack, SENT, ACKED, FAILED, QUEUED
+import time
+
+# Ways to upload a path, "auto" picks the best one the robot supports
+UPLOAD_MODES = ("auto", "pipelined", "batched", "per-command")
+
+# Answers to a batch that mean the robot won't take batches - nothing in it ran
+BATCH_REJECTED = (400, 413)
+
+# These run on a worker thread and must not touch the GUI. `job` is
+# anything with a `cancelled` flag and a report(progress) method
+
+def send_batched(job, robot, commands, delivered=0, batch_size=0):
+    """Send commands in fixed-size chunks, one request per chunk.
+    Returns how many commands were sent before the robot rejected a batch.
+    A batch only counts as delivered when the robot echoes its last id;
+    any other answer raises RobotError.
+    `delivered` counts commands an earlier attempt already sent, for progress"""
+    chunk_size = batch_size or len(commands)
+    if robot.max_batch:
+        chunk_size = min(chunk_size, robot.max_batch)
+
+    sent = 0
+    while sent < len(commands) and not job.cancelled:
+        batch = commands[sent:sent + chunk_size]
+        batch_ids = [command["id"] for command in batch]
+        job.report((delivered + sent, dict.fromkeys(batch_ids, SENT)))
+        try:
+            response = robot.post_commands(batch)
+        except Exception as e:
+            job.report((delivered + sent, dict.fromkeys(batch_ids, FAILED)))
+            raise RobotError(f"Error sending commands {sent+1}-{sent+len(batch)}") from e
+        print(f"Sent commands {sent+1}-{sent+len(batch)}/{len(commands)} - Status: {response.status_code}")
+
+        if response.status_code in BATCH_REJECTED:
+            # Robot doesn't understand batches after all, fall back for the rest
+            print("Batch rejected, falling back to per-command sends")
+            robot.batch_supported = False
+            job.report((delivered + sent, dict.fromkeys(batch_ids, QUEUED)))
+            break
+        error = check_ack(robot, response, batch_ids[-1], len(batch))
+        if error is not None:
+            job.report((delivered + sent, dict.fromkeys(batch_ids, FAILED)))
+            raise RobotError(f"Commands {sent+1}-{sent+len(batch)} not acknowledged") from error
+        sent += len(batch)
+        job.report((delivered + sent, dict.fromkeys(batch_ids, ACKED)))
+
+    return sent
+
+def send_per_command(job, robot, commands, delivered=0, start=0):
+    """Send commands one request at a time, from position `start`.
+    Each must be acknowledged with its own id, else RobotError is raised"""
+    total = delivered + len(commands)
+    for i in range(start, len(commands)):
+        if job.cancelled:
+            break
+        command_id = commands[i]["id"]
+        number = delivered + i + 1
+        job.report((number - 1, {command_id: SENT}))
+        try:
+            response = robot.post_commands(commands[i])
+            print(f"Sent command {number}/{total} - Status: {response.status_code}")
+        except Exception as e:
+            job.report((number - 1, {command_id: FAILED}))
+            raise RobotError(f"Error sending command {number}") from e
+        error = check_ack(robot, response, command_id)
+        if error is not None:
+            job.report((number - 1, {command_id: FAILED}))
+            raise RobotError(f"Command {number} not acknowledged") from error
+        job.report((number, {command_id: ACKED}))
+
+def upload_commands(job, robot, commands, upload=None, already_acked=(),
+                    mode="auto", batch_size=0, pipeline_window=8):
+    """Send the whole path to one robot's client, returns (mode, seconds taken).
+    Commands in already_acked were delivered by an earlier attempt and are skipped.
+    Progress is reported as (commands delivered, {id: new state}).
+    A forced mode the robot doesn't support falls back like "auto" would"""
+    start_time = time.perf_counter()
+
+    if mode in ("auto", "pipelined"):
+        window = min(pipeline_window, robot.pipeline_window())
+        if window > 1:
+            sender = PipelinedSender(robot, window=window)
+            sender.send(job, commands, upload, already_acked)
+            used = f"pipelined, window {window}, {sender.stats['retransmits']} retransmits"
+            return used, time.perf_counter() - start_time
+
+    delivered = len(already_acked)
+    commands = [command for command in commands if command["id"] not in already_acked]
+    used = "per-command"
+    sent = 0
+    if mode in ("auto", "pipelined", "batched") and robot.supports_batch():
+        used = "batched"
+        sent = send_batched(job, robot, commands, delivered, batch_size)
+
+    send_per_command(job, robot, commands, delivered, sent)
+    return used, time.perf_counter() - start_time
@@ -0,0 +1,238 @@
+import contextlib
+import json
+import math
+
+def format_number(value):
+    """Shortest text for a float that reads back exactly - 45.0 -> "45" """
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+class Command:
+    """One step of a path, validated when it is created.
+    value is the distance in meters for a move, or the turn angle in
+    degrees (90 is straight ahead) for a turn"""
+
+    __slots__ = ("cmd", "value", "dir", "id", "_wire")
+
+    def __init__(self, cmd, value, command_id, direction=1):
+        if cmd not in ("move", "turn"):
+            raise ValueError(f"Unknown command type: {cmd}")
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {'distance' if cmd == 'move' else 'angle'}: {value!r}") from None
+        if not math.isfinite(value):
+            raise ValueError(f"Invalid {'distance' if cmd == 'move' else 'angle'}: {value}")
+        if cmd == "move" and value <= 0:
+            raise ValueError(f"Distance must be positive: {value}")
+
+        self.cmd = cmd
+        self.value = value
+        self.dir = int(direction)
+        self.id = command_id
+        self._wire = None
+
+    @property
+    def is_move(self):
+        return self.cmd == "move"
+
+    def to_dict(self):
+        """The JSON object the robot expects, built once and reused"""
+        if self._wire is None:
+            if self.cmd == "move":
+                self._wire = {"cmd": "move", "d": format_number(self.value), "dir": self.dir, "id": self.id}
+            else:
+                self._wire = {"cmd": "turn", "a": format_number(self.value), "id": self.id}
+        return self._wire
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parse and validate a command in the robot's JSON format"""
+        if data.get("cmd") == "move":
+            return cls("move", data.get("d"), data.get("id"), data.get("dir", 1))
+        return cls(data.get("cmd"), data.get("a"), data.get("id"))
+
+    def describe(self):
+        """Short text for the command list, e.g. "0.2m forward" or "45°" """
+        if self.cmd == "move":
+            return f"{format_number(self.value)}m forward"
+        return f"{format_number(self.value)}°"
+
+    def __repr__(self):
+        if self.cmd == "move":
+            return f"{{ cmd: move d: {format_number(self.value)} dir: {self.dir} id: {self.id} }}"
+        return f"{{ cmd: turn direction: {format_number(self.value)} id: {self.id} }}"
+
+
+class CommandSequence:
+    """Ordered list of commands with an id -> position index.
+    Append, pop and swap are O(1); ids are minted here ("m1", "t1", ...)
+    and never reused, even after clear().
+    With a CommandHistory, every edit is recorded and can be undone"""
+
+    def __init__(self, history=None):
+        self.items = []
+        self.positions = {}
+        self.next_ids = {"move": 1, "turn": 1}
+        self.history = history
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def mint_id(self, cmd):
+        number = self.next_ids[cmd]
+        self.next_ids[cmd] += 1
+        return f"{cmd[0]}{number}"
+
+    def new_move(self, distance):
+        """Validate and create (but don't add) a forward move"""
+        command = Command("move", distance, None)
+        command.id = self.mint_id("move")  # only mint ids for valid commands
+        return command
+
+    def new_turn(self, angle):
+        """Validate and create (but don't add) a turn"""
+        command = Command("turn", angle, None)
+        command.id = self.mint_id("turn")
+        return command
+
+    def reserve_id(self, command_id):
+        """Make sure a command id that came from elsewhere (a saved path,
+        the send journal) is never minted again"""
+        cmd = {"m": "move", "t": "turn"}.get(str(command_id)[:1])
+        number = str(command_id)[1:]
+        if cmd and number.isdigit():
+            self.next_ids[cmd] = max(self.next_ids[cmd], int(number) + 1)
+
+    def index_of(self, command_id):
+        return self.positions[command_id]
+
+    def append(self, command):
+        if command.id is None:
+            command.id = self.mint_id(command.cmd)  # e.g. from a hand-written path file
+        elif command.id in self.positions:
+            raise ValueError(f"Duplicate command id: {command.id}")
+        self.reserve_id(command.id)
+        self._record(len(self.items), [], [command])
+        self.positions[command.id] = len(self.items)
+        self.items.append(command)
+
+    def extend(self, commands):
+        """Append several commands, returns the position of the first.
+        They undo as one step"""
+        first = len(self.items)
+        with self.history.group() if self.history is not None else contextlib.nullcontext():
+            for command in commands:
+                self.append(command)
+        return first
+
+    def pop(self):
+        command = self.items.pop()
+        del self.positions[command.id]
+        self._record(len(self.items), [command], [])
+        return command
+
+    def clear(self):
+        self._record(0, self.items[:], [])
+        self.items.clear()
+        self.positions.clear()
+
+    def swap(self, i, j):
+        low, high = min(i, j), max(i, j) + 1
+        before = self.items[low:high] if self.history is not None else None
+        self.items[i], self.items[j] = self.items[j], self.items[i]
+        self.positions[self.items[i].id] = i
+        self.positions[self.items[j].id] = j
+        if before is not None and i != j:
+            self._record(low, before, self.items[low:high])
+
+    def replace(self, index, command):
+        """Put an edited command in place of the one at `index`"""
+        self.splice(index, 1, [command])
+
+    def splice(self, index, count, commands):
+        """Replace items[index:index + count] with commands - the one edit
+        all the others can be written as. Returns the removed commands"""
+        removed = self.items[index:index + count]
+        self._splice(index, count, commands)
+        self._record(index, removed, list(commands))
+        return removed
+
+    def _splice(self, index, count, commands):
+        removed_ids = {command.id for command in self.items[index:index + count]}
+        for command in commands:
+            if command.id in self.positions and command.id not in removed_ids:
+                raise ValueError(f"Duplicate command id: {command.id}")
+        for command_id in removed_ids:
+            del self.positions[command_id]
+        for command in commands:
+            if command.id is None:
+                command.id = self.mint_id(command.cmd)
+            self.reserve_id(command.id)
+
+        self.items[index:index + count] = commands
+        # Only the tail shifts, and only if the length changed
+        end = len(self.items) if len(commands) != count else index + len(commands)
+        for i in range(index, end):
+            self.positions[self.items[i].id] = i
+
+    def _record(self, index, removed, inserted):
+        if self.history is not None and (removed or inserted):
+            self.history.record(index, removed, inserted)
+
+    def undo(self):
+        """Revert the last recorded edit. Returns the first position it
+        touched, or None when there is nothing to undo"""
+        step = self.history.take_undo() if self.history is not None else None
+        if step is None:
+            return None
+        for index, removed, inserted in reversed(step):
+            self._splice(index, len(inserted), removed)
+        return min(index for index, _, _ in step)
+
+    def redo(self):
+        """Apply the last undone edit again, like undo()"""
+        step = self.history.take_redo() if self.history is not None else None
+        if step is None:
+            return None
+        for index, removed, inserted in step:
+            self._splice(index, len(removed), inserted)
+        return min(index for index, _, _ in step)
+
+    def move_block(self, command_ids, target):
+        """Move several commands, keeping their order, so they sit together
+        before position `target` (counted before the move).
+        Returns the (low, high) span that changed"""
+        indices = sorted(self.positions[command_id] for command_id in command_ids)
+        if not indices:
+            return target, target
+        moving = [self.items[i] for i in indices]
+
+        # Only the span between the block and its destination shifts
+        low = min(indices[0], target)
+        high = max(indices[-1] + 1, target)
+        moving_ids = set(command_ids)
+        before = self.items[low:high]
+        staying = [item for item in before if item.id not in moving_ids]
+        insert_at = target - low - sum(1 for i in indices if i < target)
+
+        self.items[low:high] = staying[:insert_at] + moving + staying[insert_at:]
+        if before != self.items[low:high]:
+            self._record(low, before, self.items[low:high])
+        for i in range(low, high):
+            self.positions[self.items[i].id] = i
+        return low, high
+
+    def encode(self):
+        """The whole path as the list of dicts the robot expects"""
+        return [command.to_dict() for command in self.items]
+
+    def to_json(self):
+        return json.dumps(self.encode())
@@ -0,0 +1,120 @@
+from RobotClient import RobotClient
+from NetworkWorker import NetworkWorker
+from SendJournal import SendJournal, journal_path
+import json
+
+# Marker colors on the pose canvas, reused round-robin for bigger fleets
+FLEET_COLORS = ["#3b8ed0", "#e8590c", "#2f9e44", "#ae3ec9", "#f08c00", "#0c8599", "#e03131", "#5c7cfa"]
+
+class FleetRobot:
+    """One car of the fleet - its address, client and upload journal"""
+
+    def __init__(self, name, address, color, client_options=None):
+        self.name = name
+        self.address = address
+        self.color = color
+        self.client = RobotClient(address, **(client_options or {}))
+        self.journal = SendJournal(journal_path(address))
+        self.selected = True  # whether Send uploads to this car
+
+    def __repr__(self):
+        return f"FleetRobot({self.name!r}, {self.address!r})"
+
+
+class Fleet:
+    """Registry of the robots one planner drives.
+    The first robot is the primary one: the main pose display, trail and
+    predicted path follow it"""
+
+    def __init__(self, robots):
+        if not robots:
+            raise ValueError("A fleet needs at least one robot")
+        self.robots = list(robots)
+        self.by_name = {robot.name: robot for robot in self.robots}
+        if len(self.by_name) != len(self.robots):
+            raise ValueError("Robot names must be unique")
+
+    @classmethod
+    def single(cls, address, client_options=None):
+        """A fleet of one, for the usual one-car setup"""
+        return cls([FleetRobot("robot", address, FLEET_COLORS[0], client_options)])
+
+    @classmethod
+    def load(cls, path, client_options=None):
+        """Read a fleet file - a JSON list of {"name", "address", "color"} objects,
+        color is optional"""
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+
+        robots = []
+        for i, entry in enumerate(entries):
+            color = entry.get("color", FLEET_COLORS[i % len(FLEET_COLORS)])
+            robots.append(FleetRobot(entry["name"], entry["address"], color, client_options))
+        return cls(robots)
+
+    def __len__(self):
+        return len(self.robots)
+
+    def __iter__(self):
+        return iter(self.robots)
+
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    @property
+    def primary(self):
+        return self.robots[0]
+
+    def selected(self):
+        return [robot for robot in self.robots if robot.selected]
+
+    def close(self):
+        for robot in self.robots:
+            robot.client.close()
+
+
+class FleetDispatcher:
+    """Runs one job per robot, all robots in parallel.
+    Each robot has its own pooled client, so the uploads share no
+    connections and a slow car doesn't hold up the others. Callbacks run on
+    the Tk thread with the robot as their first argument"""
+
+    def __init__(self, root, fleet, max_parallel=32):
+        self.network = NetworkWorker(
+            root,
+            workers=min(max_parallel, len(fleet)),
+            max_pending=2 * len(fleet)
+        )
+        self.jobs = {}  # robot name -> its latest job
+
+    def submit(self, robot, fn, *args, on_done=None, on_error=None, on_progress=None):
+        """Queue fn(job, *args) for a robot, returns the Job or None when busy"""
+        job = self.network.submit(
+            fn, *args,
+            on_done=on_done and (lambda result: on_done(robot, result)),
+            on_error=on_error and (lambda e: on_error(robot, e)),
+            on_progress=on_progress and (lambda progress: on_progress(robot, progress))
+        )
+        if job is not None:
+            self.jobs[robot.name] = job
+        return job
+
+    def active(self):
+        """Names of the robots with a job still running"""
+        return [name for name, job in self.jobs.items() if not job.done and not job.cancelled]
+
+    @property
+    def busy(self):
+        return bool(self.active())
+
+    def stopping(self):
+        """Names of the robots whose cancelled job hasn't returned yet"""
+        return [name for name, job in self.jobs.items() if job.cancelled and not job.done]
+
+    def cancel(self):
+        for job in self.jobs.values():
+            job.cancel()
+
+    def stop(self):
+        self.cancel()
+        self.network.stop()
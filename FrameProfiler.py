@@ -0,0 +1,264 @@
+from collections import deque
+import contextlib
+import json
+import math
+import sys
+import time
+
+# Frame profiling: run with --profile-frames for the debug overlay
+# (F12 shows/hides it, F11 dumps a trace)
+enabled = "--profile-frames" in sys.argv
+
+def percentile(values, p):
+    """Nearest-rank percentile, 0.0 for no values"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+class SpanStats:
+    """Durations (or delays) of one named piece of work"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "recent")
+
+    def __init__(self, recent=500):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.recent.append(ms)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p95_ms": round(percentile(self.recent, 95), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class FrameProfiler:
+    """Measures where the Tk mainloop spends its time.
+
+    - Frame lateness: a heartbeat asks to run every interval_ms, how late
+      it actually runs is how long the loop was busy with something else
+    - after() callbacks: how late each callback ran and how long it took,
+      grouped by function name (toast slides, network polling, ...)
+    - Spans: methods wrapped with instrument(), or blocks timed with span()
+
+    Everything also goes to a ring buffer that dump_trace() writes in the
+    Chrome trace format (open in chrome://tracing or ui.perfetto.dev)"""
+
+    def __init__(self, root, interval_ms=16, trace_size=50000):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.frames = SpanStats(recent=600)  # heartbeat lateness
+        self.after_delay = {}  # callback name -> SpanStats of how late it ran
+        self.spans = {}  # name -> SpanStats of how long it took
+        self.trace = deque(maxlen=trace_size)
+        self.running = False
+
+        self._origin = time.perf_counter()
+        self._after = root.after
+        self._instrumented = []
+        self._due = None
+
+    # ----- recording -----
+
+    def record(self, name, start, end, category="span"):
+        """Record work that ran from start to end (perf_counter seconds)"""
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = SpanStats()
+        stats.add((end - start) * 1000)
+        self.trace.append((name, category, (start - self._origin) * 1e6, (end - start) * 1e6))
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time a block: with profiler.span("load file"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def instrument(self, obj, method_name, label=None):
+        """Time every call of obj.method_name from now on"""
+        original = getattr(obj, method_name)
+        name = label or f"{type(obj).__name__}.{method_name}"
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(name, start, time.perf_counter())
+
+        setattr(obj, method_name, timed)
+        self._instrumented.append((obj, method_name, original))
+
+    # ----- the mainloop -----
+
+    def start(self):
+        """Begin the heartbeat and time after() callbacks scheduled on root"""
+        if self.running:
+            return
+        self.running = True
+        self.root.after = self._timed_after
+        self._due = time.perf_counter() + self.interval_ms / 1000
+        self._after(self.interval_ms, self._heartbeat)
+
+    def stop(self):
+        """Stop measuring and unwrap everything"""
+        self.running = False
+        self.root.after = self._after
+        for obj, method_name, original in reversed(self._instrumented):
+            setattr(obj, method_name, original)
+        self._instrumented = []
+
+    def _heartbeat(self):
+        if not self.running:
+            return
+        now = time.perf_counter()
+        late_ms = max(0.0, (now - self._due) * 1000)
+        self.frames.add(late_ms)
+        if late_ms > self.interval_ms:
+            self.trace.append(("long frame", "frame", (self._due - self._origin) * 1e6, late_ms * 1000))
+        self._due = now + self.interval_ms / 1000
+        self._after(self.interval_ms, self._heartbeat)
+
+    def _timed_after(self, ms, func=None, *args):
+        """Stand-in for root.after that measures the callback"""
+        if func is None:
+            return self._after(ms)
+        name = getattr(func, "__qualname__", None) or repr(func)
+        due = time.perf_counter() + ms / 1000
+
+        def run(*call_args):
+            start = time.perf_counter()
+            stats = self.after_delay.get(name)
+            if stats is None:
+                stats = self.after_delay[name] = SpanStats()
+            stats.add(max(0.0, (start - due) * 1000))
+            try:
+                return func(*call_args)
+            finally:
+                self.record(f"after: {name}", start, time.perf_counter(), "after")
+
+        return self._after(ms, run, *args)
+
+    # ----- reporting -----
+
+    def widget_count(self, widget=None):
+        """Number of Tk widgets under widget (the whole window by default)"""
+        widget = widget or self.root
+        count = 0
+        pending = [widget]
+        while pending:
+            children = pending.pop().winfo_children()
+            count += len(children)
+            pending.extend(children)
+        return count
+
+    def summary(self):
+        return {
+            "frame_late_ms": self.frames.summary(),
+            "after_delay_ms": {name: stats.summary() for name, stats in self.after_delay.items()},
+            "spans_ms": {name: stats.summary() for name, stats in self.spans.items()},
+            "widgets": self.widget_count(),
+        }
+
+    def dump_trace(self, path=None):
+        """Write the trace (plus the summary as metadata), returns the path"""
+        path = path or time.strftime("frame-trace-%Y%m%d-%H%M%S.json")
+        events = [
+            {"name": name, "cat": category, "ph": "X", "ts": round(ts, 1), "dur": round(dur, 1), "pid": 1, "tid": 1}
+            for name, category, ts, dur in self.trace
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "metadata": self.summary()}, f)
+        return path
+
+
+def instrument_gui(profiler, gui):
+    """Time the GUI methods that run on every edit, pose update or toast"""
+    profiler.instrument(gui, "add_command_block", "GUI.add_command_block")
+    profiler.instrument(gui, "update_pose_display", "GUI.update_pose_display")
+    profiler.instrument(gui, "show_toast", "GUI.show_toast")
+    profiler.instrument(gui, "_draw_robot_position", "GUI._draw_robot_position")
+    profiler.instrument(gui, "_compact_trail", "GUI._compact_trail")
+    profiler.instrument(gui, "update_fleet_pose", "GUI.update_fleet_pose")
+    profiler.instrument(gui, "_draw_prediction", "GUI._draw_prediction")
+    profiler.instrument(gui.command_list, "render", "CommandListView.render")
+    profiler.instrument(gui.command_list, "_refresh_row", "CommandListView._refresh_row")
+
+
+class DebugOverlay:
+    """Small always-on-top readout of the profiler in the window corner.
+    F12 shows/hides it, F11 dumps the trace"""
+
+    def __init__(self, profiler, refresh_ms=500, visible=True):
+        import tkinter
+        self.profiler = profiler
+        self.refresh_ms = refresh_ms
+        self.visible = False
+
+        root = profiler.root
+        self.label = tkinter.Label(
+            root,
+            text="",
+            justify="left",
+            anchor="nw",
+            font=("Courier", 9),
+            bg="#000000",
+            fg="#51cf66"
+        )
+        root.bind("<F12>", lambda e: self.toggle(), add="+")
+        root.bind("<F11>", lambda e: self.dump(), add="+")
+        if visible:
+            self.toggle()
+        self._refresh()
+
+    def toggle(self):
+        self.visible = not self.visible
+        if self.visible:
+            self.label.place(relx=1.0, x=-8, y=8, anchor="ne")
+            self.label.lift()
+        else:
+            self.label.place_forget()
+
+    def dump(self):
+        path = self.profiler.dump_trace()
+        print(f"Frame trace written to {path}")
+
+    def text(self):
+        profiler = self.profiler
+        frames = profiler.frames.summary()
+        lines = [
+            f"frame late  p95 {frames['p95_ms']:6.1f}  max {frames['max_ms']:6.1f} ms",
+            f"widgets     {profiler.widget_count()}",
+        ]
+
+        # The slowest recent work, callbacks and spans together
+        slowest = sorted(profiler.spans.items(), key=lambda item: -percentile(item[1].recent, 95))[:6]
+        for name, stats in slowest:
+            summary = stats.summary()
+            lines.append(f"{name[-28:]:<28} p95 {summary['p95_ms']:6.1f} ms  x{summary['count']}")
+
+        late = sorted(profiler.after_delay.items(), key=lambda item: -percentile(item[1].recent, 95))[:3]
+        for name, stats in late:
+            lines.append(f"late {name[-23:]:<23} p95 {percentile(stats.recent, 95):6.1f} ms")
+        return "\n".join(lines)
+
+    def _refresh(self):
+        if self.visible:
+            self.label.configure(text=self.text())
+            self.label.lift()
+        # Unprofiled after(), so the overlay doesn't measure itself
+        self.profiler._after(self.refresh_ms, self._refresh)
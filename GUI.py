@@ -1,21 +1,26 @@
 import customtkinter
-from PIL import Image, ImageTk
+from PoseHistory import PoseHistory, douglas_peucker
+from CommandListView import CommandListView
+from ToastManager import ToastManager
+from WaypointPlanner import OccupancyGrid
+import math
 import os
+import tkinter
 
 class GUI:
-    def __init__(self):
+    def __init__(self, sequence=None):
         # Set appearance mode and default color theme
         customtkinter.set_appearance_mode("dark")  # Modes: "dark", "light", "system"
         customtkinter.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
         
         self.root = customtkinter.CTk()
         self.root.title("Robot Car Pathing")
-        self.root.geometry("1100x540")  # Wider to accommodate pose display
+        self.root.geometry("1100x600")  # Wider to accommodate pose display
         
-        # Load car image for pose display
+        # Car image for pose display - loaded by load_car_image() once the
+        # window is up, until then the robot is drawn with the default icon
         self.car_image = None
-        self.car_photo = None
-        self._load_car_image()
+        self.car_sprites = None  # rotated PhotoImages of car_image
 
         # NOTE: making everything self.var allows access from outside
         # This amount of access is almost certainly overkill though
@@ -179,6 +184,52 @@ class GUI:
             font=("Arial", 12, "bold")
         )
         self.send_button.grid(column=3, row=0, padx=5, pady=5)
+        
+        # Path file buttons - info style, like Clear
+        self.load_path_button = customtkinter.CTkButton(
+            self.button_panel, 
+            text="Load Path",
+            fg_color="transparent",
+            border_width=2,
+            border_color=("#3b8ed0", "#1f6aa5"),
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            font=("Arial", 12)
+        )
+        self.load_path_button.grid(column=0, row=1, padx=5, pady=5)
+        
+        self.save_path_button = customtkinter.CTkButton(
+            self.button_panel, 
+            text="Save Path",
+            fg_color="transparent",
+            border_width=2,
+            border_color=("#3b8ed0", "#1f6aa5"),
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            font=("Arial", 12)
+        )
+        self.save_path_button.grid(column=1, row=1, padx=5, pady=5)
+        
+        # Undo/redo - also Ctrl+Z and Ctrl+Y / Ctrl+Shift+Z
+        self.undo_button = customtkinter.CTkButton(
+            self.button_panel, 
+            text="Undo",
+            fg_color="transparent",
+            border_width=2,
+            border_color=("#3b8ed0", "#1f6aa5"),
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            font=("Arial", 12)
+        )
+        self.undo_button.grid(column=2, row=1, padx=5, pady=5)
+        
+        self.redo_button = customtkinter.CTkButton(
+            self.button_panel, 
+            text="Redo",
+            fg_color="transparent",
+            border_width=2,
+            border_color=("#3b8ed0", "#1f6aa5"),
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            font=("Arial", 12)
+        )
+        self.redo_button.grid(column=3, row=1, padx=5, pady=5)
 
         # Command blocks display area
         self.commands_frame = customtkinter.CTkFrame(self.bottom_part, fg_color="transparent")
@@ -187,294 +238,107 @@ class GUI:
         self.commands_label = customtkinter.CTkLabel(self.commands_frame, text="Command Sequence", font=("Arial", 12, "bold"), anchor="w")
         self.commands_label.pack(side="top", padx=5, pady=(0, 5), fill="x")
         
-        # Scrollable frame for command blocks
-        self.commands_scrollable = customtkinter.CTkScrollableFrame(
+        # Virtualized list of command blocks - only the visible rows are widgets
+        # Drag-to-reorder state, shared with the list view
+        self.drag_data = {"widget": None, "start_y": 0, "original_index": 0}
+        
+        self.command_list = CommandListView(
             self.commands_frame,
-            fg_color=("#e8e8e8", "#2b2b2b"),
-            border_width=2,
-            border_color=("#c0c0c0", "#404040"),
-            corner_radius=8,
+            sequence=sequence,
+            drag_data=self.drag_data,
+            on_change=self._on_sequence_changed,
             height=200
         )
-        self.commands_scrollable.pack(fill="both", side="bottom", expand=True)
-        
-        # Empty state message
-        self.empty_label = customtkinter.CTkLabel(
-            self.commands_scrollable,
-            text="No commands yet. Add a movement or turn command to begin.",
-            font=("Arial", 11, "italic"),
-            text_color=("#888888", "#666666")
-        )
-        self.empty_label.pack(pady=40)
+        self.command_list.pack(fill="both", side="bottom", expand=True)
         
-        # Store command block widgets
-        self.command_blocks = []
-        self.drag_data = {"widget": None, "start_y": 0, "original_index": 0}
+        # Toast notification system - one reused toast, queued messages
+        self.toasts = ToastManager(self.root)
+        self.toast_queue = self.toasts.queue
         
-        # Toast notification system
-        self.toast_queue = []
-        self.toast_showing = False
-        
-        # Current pose data
-        self.current_pose = {"x": 0.0, "y": 0.0}
+        # Current pose data, plus every pose received this session
+        self.current_pose = {"x": 0.0, "y": 0.0, "heading": 90.0}
+        self.pose_history = PoseHistory()
         
         # Setup pose display on right side
         self._setup_pose_display()
 
-    def add_command_block(self, command_data):
-        """Add a visual command block to the display"""
-        # Hide empty state label if visible
-        if self.empty_label.winfo_ismapped():
-            self.empty_label.pack_forget()
-        
-        # Create command block frame
-        block = customtkinter.CTkFrame(
-            self.commands_scrollable,
-            fg_color=("#ffffff", "#1e1e1e"),
-            border_width=2,
-            border_color=("#3b8ed0", "#1f6aa5"),
-            corner_radius=8,
-            height=60
-        )
-        block.pack(fill="x", padx=10, pady=5)
-        
-        # Determine command type and create content
-        if command_data["cmd"] == "move":
-            # Always forward now, so we can simplify the display
-            cmd_type = "MOVE"
-            cmd_color = ("#3b8ed0", "#1f6aa5")
-            cmd_text = f"{command_data['d']}m forward"
-        else:  # turn
-            cmd_type = "TURN"
-            cmd_color = ("#9775fa", "#7950f2")
-            cmd_text = f"{command_data['a']}°"
-        
-        # Command type label (left side)
-        type_label = customtkinter.CTkLabel(
-            block,
-            text=cmd_type,
-            font=("Arial", 11, "bold"),
-            text_color=cmd_color,
-            width=60
-        )
-        type_label.pack(side="left", padx=(15, 10), pady=10)
-        
-        # Command details (center)
-        details_label = customtkinter.CTkLabel(
-            block,
-            text=cmd_text,
-            font=("Arial", 12),
-            anchor="w"
-        )
-        details_label.pack(side="left", padx=10, pady=10, fill="x", expand=True)
-        
-        # ID label (right side)
-        id_label = customtkinter.CTkLabel(
-            block,
-            text=f"#{command_data['id']}",
-            font=("Arial", 10),
-            text_color=("#888888", "#666666"),
-            width=50
-        )
-        id_label.pack(side="right", padx=(10, 5), pady=10)
-        
-        # Up/Down buttons for reordering
-        button_frame = customtkinter.CTkFrame(block, fg_color="transparent", width=60)
-        button_frame.pack(side="right", padx=(0, 10))
-        
-        up_btn = customtkinter.CTkButton(
-            button_frame,
-            text="↑",
-            width=25,
-            height=25,
-            font=("Arial", 14),
-            fg_color="transparent",
-            hover_color=("#d0e8f5", "#2a4a6e"),
-            border_width=1,
-            border_color=("#c0c0c0", "#404040")
-        )
-        up_btn.pack(side="left", padx=2)
-        
-        down_btn = customtkinter.CTkButton(
-            button_frame,
-            text="↓",
-            width=25,
-            height=25,
-            font=("Arial", 14),
-            fg_color="transparent",
-            hover_color=("#d0e8f5", "#2a4a6e"),
-            border_width=1,
-            border_color=("#c0c0c0", "#404040")
-        )
-        down_btn.pack(side="left", padx=2)
-        
-        # Store block reference
-        block.command_data = command_data
-        self.command_blocks.append(block)
-        
-        # Bind reorder buttons
-        index = len(self.command_blocks) - 1
-        up_btn.configure(command=lambda idx=index: self.move_command_up(idx))
-        down_btn.configure(command=lambda idx=index: self.move_command_down(idx))
-        
-        return block
+    def add_command_block(self, command):
+        """Add a command to the end of the sequence"""
+        self.command_list.append(command)
+        return len(self.command_list) - 1
     
     def move_command_up(self, index):
         """Move a command block up in the sequence"""
         if index > 0:
-            # Swap in the list
-            self.command_blocks[index], self.command_blocks[index-1] = \
-                self.command_blocks[index-1], self.command_blocks[index]
-            
-            # Reorder visually
-            self._refresh_command_display()
+            self.command_list.swap(index, index - 1)
     
     def move_command_down(self, index):
         """Move a command block down in the sequence"""
-        if index < len(self.command_blocks) - 1:
-            # Swap in the list
-            self.command_blocks[index], self.command_blocks[index+1] = \
-                self.command_blocks[index+1], self.command_blocks[index]
-            
-            # Reorder visually
-            self._refresh_command_display()
+        if index < len(self.command_list) - 1:
+            self.command_list.swap(index, index + 1)
     
     def remove_last_command_block(self):
         """Remove the last command block"""
-        if self.command_blocks:
-            block = self.command_blocks.pop()
-            block.destroy()
-            
-            # Show empty state if no commands left
-            if not self.command_blocks:
-                self.empty_label.pack(pady=40)
+        if len(self.command_list):
+            self.command_list.pop()
     
     def clear_all_command_blocks(self):
         """Clear all command blocks"""
-        for block in self.command_blocks:
-            block.destroy()
-        self.command_blocks.clear()
-        self.empty_label.pack(pady=40)
+        self.command_list.clear()
+    
+    def undo_edit(self):
+        """Undo the last edit of the command list, returns whether there was one"""
+        return self.command_list.undo()
+    
+    def redo_edit(self):
+        return self.command_list.redo()
+    
+    def ask_command_value(self, command):
+        """Ask for a new distance or angle for a command, None if cancelled"""
+        if command.is_move:
+            text = f"New distance for {command.id} (meters):"
+        else:
+            text = f"New angle for {command.id} (degrees, 90 is straight ahead):"
+        dialog = customtkinter.CTkInputDialog(text=text, title="Edit Command")
+        value = dialog.get_input()
+        return value.strip() if value and value.strip() else None
     
     def get_command_sequence(self):
         """Get the ordered list of commands"""
-        return [block.command_data for block in self.command_blocks]
-    
-    def _refresh_command_display(self):
-        """Refresh the visual order of command blocks"""
-        for block in self.command_blocks:
-            block.pack_forget()
-        
-        for i, block in enumerate(self.command_blocks):
-            block.pack(fill="x", padx=10, pady=5)
-            
-            # Update button commands with new indices
-            button_frame = None
-            for child in block.winfo_children():
-                if isinstance(child, customtkinter.CTkFrame):
-                    for btn_child in child.winfo_children():
-                        if isinstance(btn_child, customtkinter.CTkButton):
-                            if not button_frame:
-                                button_frame = child
-                                up_btn = btn_child
-                            else:
-                                down_btn = btn_child
-            
-            if button_frame:
-                up_btn.configure(command=lambda idx=i: self.move_command_up(idx))
-                down_btn.configure(command=lambda idx=i: self.move_command_down(idx))
+        return list(self.command_list.items)
     
-    def show_toast(self, message, toast_type="error"):
+    def show_toast(self, message, toast_type="error", key=None):
         """Show a toast notification
         toast_type: 'error', 'success', 'info', 'warning'
+        Toasts with the same key replace each other instead of queueing
         """
-        # Color schemes for different toast types
-        colors = {
-            "error": {"bg": ("#ff6b6b", "#c92a2a"), "text": "#ffffff"},
-            "success": {"bg": ("#51cf66", "#2f9e44"), "text": "#ffffff"},
-            "info": {"bg": ("#3b8ed0", "#1f6aa5"), "text": "#ffffff"},
-            "warning": {"bg": ("#ffa94d", "#fd7e14"), "text": "#000000"}
-        }
-        
-        color_scheme = colors.get(toast_type, colors["error"])
-        
-        # Create toast frame
-        toast = customtkinter.CTkFrame(
-            self.root,
-            fg_color=color_scheme["bg"],
-            corner_radius=8,
-            border_width=0
-        )
+        self.toasts.show(message, toast_type, key)
+    
+    @property
+    def toast_showing(self):
+        return self.toasts.showing
+    
+    def load_car_image(self):
+        """Load and resize the car.svg image for display on the grid.
+        The render is cached on disk, so cairosvg only runs on first launch.
+        PIL is imported here rather than at startup"""
+        from SpriteCache import load_svg_image, RotatedSprites
         
-        # Create message label
-        label = customtkinter.CTkLabel(
-            toast,
-            text=message,
-            font=("Arial", 12, "bold"),
-            text_color=color_scheme["text"]
-        )
-        label.pack(padx=20, pady=12)
-        
-        # Position toast at bottom center
-        toast.place(relx=0.5, rely=1.0, y=100, anchor="s")
-        
-        # Animate in
-        self._animate_toast_in(toast)
-        
-        # Schedule hide after 3 seconds
-        self.root.after(1000, lambda: self._animate_toast_out(toast))
-    
-    def _animate_toast_in(self, toast):
-        """Animate toast sliding up from bottom"""
-        target_y = -20
-        current_y = 100
-        step = 8
-        
-        def slide():
-            nonlocal current_y
-            if current_y > target_y:
-                current_y -= step
-                toast.place(relx=0.5, rely=1.0, y=current_y, anchor="s")
-                self.root.after(10, slide)
-            else:
-                toast.place(relx=0.5, rely=1.0, y=target_y, anchor="s")
-        
-        slide()
-    
-    def _animate_toast_out(self, toast):
-        """Animate toast sliding down and destroy"""
-        current_y = -20
-        target_y = 100
-        step = 8
-        
-        def slide():
-            nonlocal current_y
-            if current_y < target_y:
-                current_y += step
-                toast.place(relx=0.5, rely=1.0, y=current_y, anchor="s")
-                self.root.after(10, slide)
-            else:
-                toast.destroy()
-        
-        slide()
-    
-    def _load_car_image(self):
-        """Load and resize the car.svg image for display on the grid"""
-        try:
-            # Get the directory where GUI.py is located
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            car_svg_path = os.path.join(current_dir, "car.svg")
-
-            import cairosvg
-            from io import BytesIO
-                    
-                    # Convert SVG to PNG in memory
-            png_data = cairosvg.svg2png(url=car_svg_path, output_width=30, output_height=30)
-            self.car_image = Image.open(BytesIO(png_data))
+        # Get the directory where GUI.py is located
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        car_svg_path = os.path.join(current_dir, "car.svg")
+        
+        self.car_image = load_svg_image(car_svg_path, 30, 30)
+        if self.car_image:
+            self.car_sprites = RotatedSprites(self.car_image, step=5)
             print("✅ Car SVG loaded successfully")
-        except ImportError:
-                print("⚠️  SVG libraries not found, will use default icon")
-                self.car_image = None
+            
+            # Swap the default icon for the car
+            self.pose_canvas.delete("robot")
+            self._create_robot_items()
+            self._draw_robot_position()
+        else:
+            print("⚠️  SVG libraries not found, will use default icon")
     
     def _setup_pose_display(self):
         """Setup the pose display panel on the right side"""
@@ -488,6 +352,7 @@ class GUI:
         )
         pose_container.pack(fill="both", expand=True, padx=5, pady=5)
         pose_container.pack_propagate(False)
+        self.pose_container = pose_container
         
         # Title
         title_label = customtkinter.CTkLabel(
@@ -508,6 +373,15 @@ class GUI:
         )
         self.update_pose_button.pack(pady=(0, 10))
         
+        # Live pose feed toggle
+        self.live_pose_switch = customtkinter.CTkSwitch(
+            pose_container,
+            text="Live",
+            font=("Arial", 11),
+            progress_color=("#3b8ed0", "#1f6aa5")
+        )
+        self.live_pose_switch.pack(pady=(0, 10))
+        
         # Pose coordinates display
         coords_frame = customtkinter.CTkFrame(pose_container, fg_color="transparent")
         coords_frame.pack(pady=(0, 10))
@@ -529,26 +403,112 @@ class GUI:
         self.y_label.pack(side="right", padx=15)
         
         # Canvas for grid display
+        self.pose_canvas_size = 320
+        self.pose_grid_size = 20  # pixels per grid unit
         self.pose_canvas = customtkinter.CTkCanvas(
             pose_container,
-            width=320,
-            height=320,
+            width=self.pose_canvas_size,
+            height=self.pose_canvas_size,
             bg="#ffffff",
             highlightthickness=0
         )
-        self.pose_canvas.pack(pady=(10, 15))
+        self.pose_canvas.pack(pady=(10, 5))
+        
+        # Route planning on the map - click waypoints, paint obstacles
+        map_controls = customtkinter.CTkFrame(pose_container, fg_color="transparent")
+        map_controls.pack(pady=(0, 10))
+        
+        self.canvas_mode = customtkinter.CTkSegmentedButton(
+            map_controls,
+            values=["View", "Waypoints", "Obstacles"],
+            font=("Arial", 11),
+            width=150
+        )
+        self.canvas_mode.set("View")
+        self.canvas_mode.pack(side="left", padx=(0, 5))
+        
+        self.plan_route_button = customtkinter.CTkButton(
+            map_controls,
+            text="Plan Route",
+            fg_color=("#51cf66", "#2f9e44"),
+            hover_color=("#40c057", "#26803b"),
+            font=("Arial", 11),
+            width=75
+        )
+        self.plan_route_button.pack(side="left", padx=2)
+        
+        self.clear_map_button = customtkinter.CTkButton(
+            map_controls,
+            text="Clear Map",
+            fg_color="transparent",
+            border_width=2,
+            border_color=("#3b8ed0", "#1f6aa5"),
+            hover_color=("#d0e8f5", "#2a4a6e"),
+            font=("Arial", 11),
+            width=70
+        )
+        self.clear_map_button.pack(side="left", padx=2)
+        
+        # Obstacle map for route planning, covering the whole canvas
+        half_width = self.pose_canvas_size / 2 / self.pose_grid_size
+        self.occupancy = OccupancyGrid(500, 500, 2 * half_width / 500, -half_width, -half_width)
+        self.obstacle_brush_m = 0.15  # half the side of the square obstacle brush
+        self.waypoints = []  # (x, y) in meters, in the order they were clicked
+        
+        self.pose_canvas.bind("<Button-1>", self._on_map_click)
+        self.pose_canvas.bind("<B1-Motion>", lambda event: self._on_map_paint(event, True))
+        self.pose_canvas.bind("<Button-3>", lambda event: self._on_map_paint(event, False))
+        self.pose_canvas.bind("<B3-Motion>", lambda event: self._on_map_paint(event, False))
+        
+        # Retained canvas items - the grid is drawn once, the robot is moved
+        self.robot_canvas_pos = None  # where the robot items currently sit
+        
+        # Trail - decimated so long sessions stay at a few hundred canvas items
+        self.trail_min_px = 3  # extend the trail once the robot moved this far
+        self.trail_max_items = 300  # simplify the trail beyond this many items
+        self.trail_points = []  # canvas points of the drawn trail
+        self.trail_items = 0
+        self.trail_line = []  # canvas points of the compacted part of the trail
+        self.trail_since = None  # time of the last pose sample in trail_line
+        
+        # Other cars of the fleet, name -> (marker, label, canvas position)
+        self.fleet_markers = {}
+        self.fleet_checkboxes = {}
+        
+        # Predicted path overlay, created on the first edit of the sequence
+        self.path_simulator = None
+        self.prediction_redraw_id = None
+        self.prediction_max_points = 2000  # simplify longer tracks before drawing
+        self.prediction_paused = False  # while a path file loads
         
         # Draw initial grid
         self._draw_pose_grid()
     
+    def _pose_to_canvas(self, x, y):
+        """Convert pose coordinates (meters) to canvas pixels"""
+        center = self.pose_canvas_size // 2
+        # Note: Canvas Y is inverted (0 at top), so we flip it
+        return center + x * self.pose_grid_size, center - y * self.pose_grid_size
+    
+    def _canvas_to_pose(self, canvas_x, canvas_y):
+        """Convert canvas pixels to pose coordinates (meters)"""
+        center = self.pose_canvas_size // 2
+        return (canvas_x - center) / self.pose_grid_size, (center - canvas_y) / self.pose_grid_size
+    
     def _draw_pose_grid(self):
-        """Draw the grid and robot position"""
+        """Draw the static grid layer and create the robot items.
+        Only runs once, pose updates move the existing items"""
         self.pose_canvas.delete("all")
+        self.robot_canvas_pos = None
+        self.fleet_markers = {}
+        self.trail_points = []
+        self.trail_items = 0
+        self.trail_line = []
         
         # Grid parameters
-        width = 320
-        height = 320
-        grid_size = 20  # pixels per grid unit
+        width = self.pose_canvas_size
+        height = self.pose_canvas_size
+        grid_size = self.pose_grid_size
         center_x = width // 2
         center_y = height // 2
         
@@ -556,59 +516,61 @@ class GUI:
         for i in range(0, width, grid_size):
             # Vertical lines
             color = "#999999" if i == center_x else "#dddddd"
-            self.pose_canvas.create_line(i, 0, i, height, fill=color, width=1)
+            self.pose_canvas.create_line(i, 0, i, height, fill=color, width=1, tags="grid")
         
         for i in range(0, height, grid_size):
             # Horizontal lines
             color = "#999999" if i == center_y else "#dddddd"
-            self.pose_canvas.create_line(0, i, width, i, fill=color, width=1)
+            self.pose_canvas.create_line(0, i, width, i, fill=color, width=1, tags="grid")
         
         # Draw axes labels
-        self.pose_canvas.create_text(center_x + 5, 10, text="Y+", fill="#333333", anchor="nw", font=("Arial", 10))
-        self.pose_canvas.create_text(width - 20, center_y - 5, text="X+", fill="#333333", anchor="se", font=("Arial", 10))
+        self.pose_canvas.create_text(center_x + 5, 10, text="Y+", fill="#333333", anchor="nw", font=("Arial", 10), tags="grid")
+        self.pose_canvas.create_text(width - 20, center_y - 5, text="X+", fill="#333333", anchor="se", font=("Arial", 10), tags="grid")
         
         # Draw origin
         self.pose_canvas.create_oval(
             center_x - 3, center_y - 3,
             center_x + 3, center_y + 3,
-            fill="#999999", outline="#666666"
+            fill="#999999", outline="#666666",
+            tags="grid"
+        )
+        
+        # Painted obstacles - one image over the grid, recoloured pixel by pixel
+        self.obstacle_image = tkinter.PhotoImage(width=width, height=height)
+        self.pose_canvas.create_image(0, 0, image=self.obstacle_image, anchor="nw", tags="obstacles")
+        
+        # Predicted path overlay - hidden until there are commands
+        self.prediction_line = self.pose_canvas.create_line(
+            0, 0, 0, 0,
+            fill="#fd7e14", width=2, dash=(6, 3),
+            state="hidden", tags="prediction"
+        )
+        self.prediction_end = self.pose_canvas.create_oval(
+            0, 0, 0, 0,
+            outline="#fd7e14", width=2,
+            state="hidden", tags="prediction"
         )
         
         # Draw robot position
+        self._create_robot_items()
         self._draw_robot_position()
     
-    def _draw_robot_position(self):
-        """Draw the robot's current position on the grid"""
-        width = 320
-        height = 320
-        center_x = width // 2
-        center_y = height // 2
-        grid_size = 20  # pixels per grid unit
-        
-        # Convert pose coordinates to canvas coordinates
-        # Note: Canvas Y is inverted (0 at top), so we flip it
-        robot_x = center_x + (self.current_pose["x"] * grid_size)
-        robot_y = center_y - (self.current_pose["y"] * grid_size)
-        
-        # Position trail (small dot) - draw first so car appears on top
-        self.pose_canvas.create_oval(
-            robot_x - 2, robot_y - 2,
-            robot_x + 2, robot_y + 2,
-            fill="#51cf66", outline="",
-            tags="trail"
-        )
+    def _create_robot_items(self):
+        """Create the robot's canvas items at the origin"""
+        robot_x, robot_y = self._pose_to_canvas(0, 0)
+        heading = self.current_pose["heading"]
+        self.robot_canvas_pos = (robot_x, robot_y)
+        self.robot_heading_bucket = None
         
         # Draw robot using car image if available, otherwise use default icon
-        if self.car_image:
-            # Convert PIL image to PhotoImage for canvas
-            self.car_photo = ImageTk.PhotoImage(self.car_image)
-            
+        if self.car_sprites:
             # Draw the car image centered on the robot position
-            self.pose_canvas.create_image(
+            self.robot_item = self.pose_canvas.create_image(
                 robot_x, robot_y,
-                image=self.car_photo,
+                image=self.car_sprites.get(heading),
                 tags="robot"
             )
+            self.robot_heading_bucket = self.car_sprites.bucket(heading)
         else:
             # Fallback: Draw robot as a square with direction indicator
             robot_size = 10
@@ -621,27 +583,283 @@ class GUI:
                 tags="robot"
             )
             
-            # Direction indicator (small triangle pointing up/forward)
-            self.pose_canvas.create_polygon(
-                robot_x, robot_y - robot_size,  # top point
-                robot_x - 5, robot_y - robot_size + 8,  # bottom left
-                robot_x + 5, robot_y - robot_size + 8,  # bottom right
+            # Direction indicator (small triangle pointing forward)
+            self.robot_item = self.pose_canvas.create_polygon(
+                *self._direction_triangle(robot_x, robot_y, heading),
                 fill="#ffffff", outline="",
                 tags="robot"
             )
+            self.robot_heading_bucket = round(heading)
     
-    def update_pose_display(self, x, y):
-        """Update the pose display with new coordinates"""
+    def _direction_triangle(self, robot_x, robot_y, heading):
+        """Canvas coords of the fallback direction triangle at a heading"""
+        # Triangle pointing up (heading 90): top point, bottom left, bottom right
+        points = ((0, -10), (-5, -2), (5, -2))
+        angle = math.radians(heading - 90)
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        coords = []
+        for dx, dy in points:
+            # Canvas Y points down, so counter-clockwise flips the sin terms
+            coords.append(robot_x + dx * cos_a + dy * sin_a)
+            coords.append(robot_y - dx * sin_a + dy * cos_a)
+        return coords
+    
+    def _draw_robot_position(self):
+        """Move and turn the robot to its current pose and extend the trail"""
+        robot_x, robot_y = self._pose_to_canvas(self.current_pose["x"], self.current_pose["y"])
+        heading = self.current_pose["heading"]
+        
+        self._extend_trail(robot_x, robot_y)
+        
+        # Shift the robot items by the change in position
+        old_x, old_y = self.robot_canvas_pos
+        if robot_x != old_x or robot_y != old_y:
+            self.pose_canvas.move("robot", robot_x - old_x, robot_y - old_y)
+            self.robot_canvas_pos = (robot_x, robot_y)
+        
+        # Swap in the pre-rotated sprite only when the heading step changes
+        if self.car_sprites:
+            bucket = self.car_sprites.bucket(heading)
+            if bucket != self.robot_heading_bucket:
+                self.pose_canvas.itemconfigure(self.robot_item, image=self.car_sprites.get(heading))
+                self.robot_heading_bucket = bucket
+        elif round(heading) != self.robot_heading_bucket:
+            self.pose_canvas.coords(self.robot_item, *self._direction_triangle(robot_x, robot_y, heading))
+            self.robot_heading_bucket = round(heading)
+    
+    def _extend_trail(self, robot_x, robot_y):
+        """Add a trail segment once the robot has moved far enough"""
+        if not self.trail_points:
+            self.trail_points.append((robot_x, robot_y))
+            return
+        
+        last_x, last_y = self.trail_points[-1]
+        if abs(robot_x - last_x) < self.trail_min_px and abs(robot_y - last_y) < self.trail_min_px:
+            return
+        
+        segment = self.pose_canvas.create_line(
+            last_x, last_y, robot_x, robot_y,
+            fill="#51cf66", width=3, capstyle="round",
+            tags="trail"
+        )
+        # Keep the car on top of the trail
+        self.pose_canvas.tag_lower(segment, "robot")
+        self.trail_points.append((robot_x, robot_y))
+        self.trail_items += 1
+        
+        if self.trail_items > self.trail_max_items:
+            self._compact_trail()
+    
+    def _compact_trail(self):
+        """Replace the trail segments with one simplified polyline.
+        The samples since the last compaction come decimated from the pose
+        history and are joined onto the line drawn then, so a compaction
+        only walks the newest samples, not the whole session"""
+        scale = self.pose_grid_size
+        recent = self.pose_history.decimated(self.trail_min_px / scale, 1.0 / scale, since=self.trail_since)
+        points = self.trail_line + [self._pose_to_canvas(x, y) for x, y in recent]
+        tolerance = 1.0  # pixels
+        while len(points) > self.trail_max_items // 2:
+            tolerance *= 2
+            points = douglas_peucker(points, tolerance)
+        
+        self.pose_canvas.delete("trail")
+        line = self.pose_canvas.create_line(
+            *[coord for point in points for coord in point],
+            fill="#51cf66", width=3, capstyle="round", joinstyle="round",
+            tags="trail"
+        )
+        self.pose_canvas.tag_lower(line, "robot")
+        self.trail_points = list(points)
+        self.trail_items = 1
+        self.trail_line = points
+        self.trail_since = self.pose_history.last()[0]
+    
+    def clear_trail(self):
+        """Remove the position trail, keeping grid, robot and pose history"""
+        self.pose_canvas.delete("trail")
+        self.trail_points = []
+        self.trail_items = 0
+        self.trail_line = []
+        last = self.pose_history.last()
+        self.trail_since = last[0] if last else None
+    
+    def setup_fleet(self, robots, on_toggle=None):
+        """Add a checkbox per robot to pick which cars Send uploads to.
+        robots is a list of (name, color, selected)"""
+        fleet_frame = customtkinter.CTkScrollableFrame(
+            self.pose_container,
+            orientation="horizontal",
+            fg_color="transparent",
+            height=30
+        )
+        fleet_frame.pack(fill="x", padx=10, before=self.pose_canvas)
+        
+        for name, color, selected in robots:
+            checkbox = customtkinter.CTkCheckBox(
+                fleet_frame,
+                text=name,
+                font=("Arial", 11, "bold"),
+                text_color=color,
+                fg_color=color,
+                width=20,
+                command=on_toggle and (lambda n=name: on_toggle(n, bool(self.fleet_checkboxes[n].get())))
+            )
+            if selected:
+                checkbox.select()
+            checkbox.pack(side="left", padx=(0, 10))
+            self.fleet_checkboxes[name] = checkbox
+    
+    def update_fleet_pose(self, name, x, y, color="#e8590c"):
+        """Plot another car of the fleet as a labelled dot"""
+        canvas_x, canvas_y = self._pose_to_canvas(x, y)
+        marker = self.fleet_markers.get(name)
+        if marker is None:
+            dot = self.pose_canvas.create_oval(
+                canvas_x - 6, canvas_y - 6, canvas_x + 6, canvas_y + 6,
+                fill=color, outline="#ffffff", width=2,
+                tags=("fleet", f"fleet:{name}")
+            )
+            label = self.pose_canvas.create_text(
+                canvas_x + 9, canvas_y - 9,
+                text=name, fill=color, anchor="sw", font=("Arial", 9, "bold"),
+                tags=("fleet", f"fleet:{name}")
+            )
+            self.fleet_markers[name] = (dot, label, (canvas_x, canvas_y))
+            return
+        
+        dot, label, (old_x, old_y) = marker
+        if canvas_x != old_x or canvas_y != old_y:
+            self.pose_canvas.move(f"fleet:{name}", canvas_x - old_x, canvas_y - old_y)
+            self.fleet_markers[name] = (dot, label, (canvas_x, canvas_y))
+    
+    def _on_map_click(self, event):
+        """Add a waypoint, or start painting obstacles, depending on the map mode"""
+        mode = self.canvas_mode.get()
+        if mode == "Waypoints":
+            self.add_waypoint(*self._canvas_to_pose(event.x, event.y))
+        elif mode == "Obstacles":
+            self._on_map_paint(event, True)
+    
+    def _on_map_paint(self, event, blocked):
+        """Paint (or erase) obstacles under the pointer"""
+        if self.canvas_mode.get() != "Obstacles":
+            return
+        x, y = self._canvas_to_pose(event.x, event.y)
+        self.occupancy.paint(x, y, self.obstacle_brush_m, blocked)
+        
+        # The same square on the overlay, clipped to the canvas
+        reach = round(self.obstacle_brush_m * self.pose_grid_size)
+        size = self.pose_canvas_size
+        x0, y0 = max(0, event.x - reach), max(0, event.y - reach)
+        x1, y1 = min(size, event.x + reach + 1), min(size, event.y + reach + 1)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if blocked:
+            self.obstacle_image.put("#495057", to=(x0, y0, x1, y1))
+        else:
+            for pixel_y in range(y0, y1):
+                for pixel_x in range(x0, x1):
+                    self.obstacle_image.transparency_set(pixel_x, pixel_y, True)
+    
+    def add_waypoint(self, x, y):
+        """Add a route waypoint (meters) and mark it on the map"""
+        self.waypoints.append((x, y))
+        canvas_x, canvas_y = self._pose_to_canvas(x, y)
+        self.pose_canvas.create_oval(
+            canvas_x - 5, canvas_y - 5, canvas_x + 5, canvas_y + 5,
+            fill="#845ef7", outline="#ffffff", width=1,
+            tags="waypoint"
+        )
+        self.pose_canvas.create_text(
+            canvas_x + 7, canvas_y - 7,
+            text=str(len(self.waypoints)), fill="#6741d9", anchor="sw", font=("Arial", 9, "bold"),
+            tags="waypoint"
+        )
+    
+    def clear_waypoints(self):
+        self.waypoints = []
+        self.pose_canvas.delete("waypoint")
+    
+    def clear_map(self):
+        """Remove the waypoints and every painted obstacle"""
+        self.clear_waypoints()
+        self.occupancy.clear()
+        self.obstacle_image.blank()
+    
+    def predicted_end_pose(self):
+        """Where the command sequence leaves the robot, as (x, y, heading)
+        from its current pose - new route commands start from here"""
+        x, y, heading = self.current_pose["x"], self.current_pose["y"], self.current_pose["heading"]
+        if self.path_simulator is None or not len(self.command_list):
+            return x, y, heading
+        end_x, end_y, end_heading = self.path_simulator.end_pose()
+        # The simulator starts at the origin facing 90, rotate onto the current pose
+        angle = math.radians(heading - 90)
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+        return (x + end_x * cos_a - end_y * sin_a,
+                y + end_x * sin_a + end_y * cos_a,
+                (end_heading + heading - 90) % 360)
+    
+    def update_pose_display(self, x, y, heading=None):
+        """Update the pose display with new coordinates.
+        Without a heading, the direction of travel is used"""
+        self.pose_history.append(x, y, heading)
         self.current_pose["x"] = x
         self.current_pose["y"] = y
+        self.current_pose["heading"] = self.pose_history.last()[3]
         
         # Update labels
         self.x_label.configure(text=f"X: {x:.2f} m")
         self.y_label.configure(text=f"Y: {y:.2f} m")
         
-        # Redraw grid with new position
-        self._draw_pose_grid()
+        # Move the robot - the grid stays as it is
+        self._draw_robot_position()
+        
+        # The predicted path starts wherever the robot is now
+        self._schedule_prediction()
+    
+    def _on_sequence_changed(self, index):
+        """Recompute the predicted path from the first changed command"""
+        if self.path_simulator is None:
+            # NumPy loads on the first edit rather than at startup
+            from PathSimulator import PathSimulator
+            self.path_simulator = PathSimulator(self.command_list.sequence)
+        self.path_simulator.invalidate(index)
+        self._schedule_prediction()
+    
+    def _schedule_prediction(self):
+        """Coalesce overlay redraws into one per idle pass"""
+        if self.path_simulator is not None and self.prediction_redraw_id is None and not self.prediction_paused:
+            self.prediction_redraw_id = self.root.after_idle(self._draw_prediction)
+    
+    def pause_prediction(self, paused=True):
+        """Hold off redrawing the predicted path during a bulk edit (loading a
+        path file), unpausing draws it once for the result"""
+        self.prediction_paused = paused
+        if not paused:
+            self._schedule_prediction()
+    
+    def _draw_prediction(self):
+        """Draw the predicted track of the command sequence from the robot's pose"""
+        self.prediction_redraw_id = None
+        
+        # Projected and thinned in one go, on NumPy arrays
+        coords = self.path_simulator.canvas_coords(
+            self.current_pose["x"], self.current_pose["y"], self.current_pose["heading"],
+            self.pose_canvas_size // 2, self.pose_grid_size, self.prediction_max_points)
+        if len(coords) < 4:
+            self.pose_canvas.itemconfigure("prediction", state="hidden")
+            return
+        
+        self.pose_canvas.coords(self.prediction_line, *coords)
+        end_x, end_y = coords[-2:]
+        self.pose_canvas.coords(self.prediction_end, end_x - 4, end_y - 4, end_x + 4, end_y + 4)
+        self.pose_canvas.itemconfigure("prediction", state="normal")
 
 if __name__ == "__main__":
     gui = GUI()
+    gui.root.after(0, gui.load_car_image)
     gui.root.mainloop()
@@ -0,0 +1,117 @@
+import queue
+import threading
+
+class Job:
+    """Handle for a piece of work running on the network worker"""
+
+    def __init__(self, fn, args, on_done, on_error, on_progress):
+        self.fn = fn
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.done = False
+        self._cancelled = threading.Event()
+        self._results = None  # set by the worker that accepts the job
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Ask the job to stop - long jobs check this between requests.
+        Callbacks of a cancelled job are never run"""
+        self._cancelled.set()
+
+    def report(self, progress):
+        """Called from the worker thread, delivered to on_progress on the Tk thread"""
+        if not self.cancelled:
+            self._results.put((self, "progress", progress))
+
+
+class NetworkWorker:
+    """Runs blocking network calls off the Tk thread.
+    Jobs go in through a bounded queue, results come back to the UI by
+    polling with root.after so Tk is only ever touched from its own thread"""
+
+    def __init__(self, root, workers=2, max_pending=16, poll_ms=20):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.results = queue.Queue()
+        self.running = True
+
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"network-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        self._poll_id = self.root.after(self.poll_ms, self._drain)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None):
+        """Queue fn(job, *args) on a worker thread.
+        Returns the Job, or None when the queue is full"""
+        job = Job(fn, args, on_done, on_error, on_progress)
+        job._results = self.results
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            return None
+        return job
+
+    def cancel_all(self):
+        """Cancel every queued job that hasn't started yet"""
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            job.cancel()
+
+    def stop(self):
+        """Cancel pending work and stop polling"""
+        self.running = False
+        self.cancel_all()
+        for _ in self.threads:
+            self.jobs.put(None)
+        if self._poll_id:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _work(self):
+        while self.running:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                job.done = True
+                continue
+            try:
+                result = job.fn(job, *job.args)
+                self.results.put((job, "done", result))
+            except Exception as e:
+                self.results.put((job, "error", e))
+
+    def _drain(self):
+        """Deliver finished results to their callbacks on the Tk thread"""
+        while True:
+            try:
+                job, kind, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind != "progress":
+                job.done = True
+            if job.cancelled:
+                continue
+
+            callback = {"done": job.on_done, "error": job.on_error, "progress": job.on_progress}[kind]
+            if callback:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"Error in network callback: {e}")
+
+        if self.running:
+            self._poll_id = self.root.after(self.poll_ms, self._drain)
@@ -0,0 +1,165 @@
+from Commands import Command, format_number
+import csv
+import json
+import os
+import time
+
+# Path files, picked by extension:
+#   .jsonl  one command per line in the robot's format, {"cmd": "move", "d": "0.2", "dir": 1, "id": "m1"}
+#   .csv    a header row, then cmd,value,dir,id per command
+#   .json   a single JSON list of commands (read whole - use .jsonl for big routes)
+# Commands without an id get a fresh one when they are added to a sequence
+FORMATS = {".jsonl": "jsonl", ".csv": "csv", ".json": "json"}
+CSV_COLUMNS = ["cmd", "value", "dir", "id"]
+
+class PathFileError(ValueError):
+    """A path file entry that isn't a valid command, with where it is"""
+
+    def __init__(self, path, line, message):
+        super().__init__(f"{os.path.basename(path)}, line {line}: {message}")
+        self.path = path
+        self.line = line
+
+
+def path_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown path file type {extension or path!r}, use {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def _command(row):
+    """One CSV row -> Command"""
+    cmd = (row.get("cmd") or "").strip()
+    return Command(cmd, row.get("value"), row.get("id") or None, row.get("dir") or 1)
+
+
+def iter_commands(path):
+    """Read a path file one command at a time, validating each as it goes.
+    Raises PathFileError at the first bad entry, naming its line"""
+    kind = path_format(path)
+    with open(path, encoding="utf-8", newline="" if kind == "csv" else None) as f:
+        if kind == "json":
+            data = json.load(f)
+            if not isinstance(data, list):
+                raise PathFileError(path, 1, "expected a list of commands")
+            entries = ((i + 1, entry) for i, entry in enumerate(data))
+        elif kind == "csv":
+            reader = csv.DictReader(f)
+            missing = {"cmd", "value"} - set(reader.fieldnames or ())
+            if missing:
+                raise PathFileError(path, 1, f"missing column {', '.join(sorted(missing))}")
+            entries = ((reader.line_num, row) for row in reader)
+        else:
+            entries = enumerate(f, 1)
+
+        for line, entry in entries:
+            try:
+                if kind == "csv":
+                    yield _command(entry)
+                    continue
+                if kind == "jsonl":
+                    if not entry.strip():
+                        continue
+                    entry = json.loads(entry)
+                if not isinstance(entry, dict):
+                    raise ValueError("expected a command object")
+                yield Command.from_dict(entry)
+            except (ValueError, TypeError) as e:
+                raise PathFileError(path, line, e) from None
+
+
+def write_commands(path, commands):
+    """Write commands to a path file, streaming - returns how many.
+    Numbers are written in their shortest exact form, so loading the file
+    gives back the same commands"""
+    kind = path_format(path)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="" if kind == "csv" else None) as f:
+        if kind == "csv":
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for command in commands:
+                writer.writerow([command.cmd, format_number(command.value), command.dir, command.id])
+                count += 1
+        elif kind == "jsonl":
+            for command in commands:
+                f.write(json.dumps(command.to_dict()) + "\n")
+                count += 1
+        else:
+            encoded = [command.to_dict() for command in commands]
+            json.dump(encoded, f)
+            count = len(encoded)
+    return count
+
+
+class ChunkedLoader:
+    """Feeds a path file into the app a slice at a time from root.after,
+    so even a huge route never blocks the mainloop. Each tick parses for at
+    most budget_ms and hands the commands to on_chunk(list); on_done(count)
+    or on_error(exception) runs at the end"""
+
+    def __init__(self, root, path, on_chunk, on_done=None, on_error=None, budget_ms=8, max_chunk=5000):
+        self.root = root
+        self.path = path
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.budget_ms = budget_ms
+        self.max_chunk = max_chunk
+
+        self.commands = None
+        self.count = 0
+        self.timer_id = None
+        self.running = False
+
+    def start(self):
+        self.commands = iter_commands(self.path)
+        self.running = True
+        self.timer_id = self.root.after(0, self._tick)
+
+    def cancel(self):
+        self.running = False
+        if self.timer_id:
+            self.root.after_cancel(self.timer_id)
+            self.timer_id = None
+        if self.commands is not None:
+            self.commands.close()
+
+    def _tick(self):
+        self.timer_id = None
+        if not self.running:
+            return
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        chunk = []
+        finished = False
+        error = None
+        try:
+            while len(chunk) < self.max_chunk:
+                chunk.append(next(self.commands))
+                # Checking the clock costs more than parsing one command
+                if len(chunk) % 64 == 0 and time.perf_counter() > deadline:
+                    break
+        except StopIteration:
+            finished = True
+        except Exception as e:
+            error = e
+
+        # Whatever parsed before a bad entry is still delivered
+        try:
+            if chunk:
+                self.on_chunk(chunk)
+                self.count += len(chunk)
+        except Exception as e:
+            error = error or e
+
+        if error is not None:
+            self.running = False
+            if self.on_error:
+                self.on_error(error)
+        elif finished:
+            self.running = False
+            if self.on_done:
+                self.on_done(self.count)
+        else:
+            self.timer_id = self.root.after(1, self._tick)
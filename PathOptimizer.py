@@ -0,0 +1,98 @@
+from Commands import Command
+
+# Rough robot timings for estimating how long a path takes to run
+COMMAND_OVERHEAD_S = 0.25  # parse, accelerate and settle, per command
+MOVE_SPEED = 0.2  # meters per second
+TURN_RATE = 90.0  # degrees per second
+
+def estimate_seconds(commands):
+    """Estimated time for the robot to execute a list of commands"""
+    total = 0.0
+    for command in commands:
+        total += COMMAND_OVERHEAD_S
+        if command.is_move:
+            total += command.value / MOVE_SPEED
+        else:
+            total += abs(command.value - 90.0) / TURN_RATE
+    return total
+
+def _normalize_turn(delta):
+    """Turn amount in degrees folded into (-180, 180]"""
+    delta = round(delta % 360.0, 9)
+    return delta - 360.0 if delta > 180.0 else delta
+
+
+class OptimizeResult:
+    """Outcome of optimize(): the rewritten commands and what it saved"""
+
+    def __init__(self, original, commands, sources):
+        self.commands = commands
+        self.sources = sources  # new command id -> ids of the commands it stands in for
+        self.original_count = len(original)
+        self.saved_requests = len(original) - len(commands)
+        self.original_seconds = estimate_seconds(original)
+        self.saved_seconds = self.original_seconds - estimate_seconds(commands)
+
+    def summary(self):
+        return (f"Optimized {self.original_count} -> {len(self.commands)} commands: "
+                f"{self.saved_requests} fewer requests, ~{self.saved_seconds:.1f}s less driving")
+
+
+def optimize(commands, min_angle=0.0, max_angle=180.0):
+    """Rewrite a command list into the shortest equivalent one.
+    Consecutive moves are added together and consecutive turns are combined,
+    turns that cancel out are dropped (which can let the moves around them
+    merge too). Combined turns outside [min_angle, max_angle] are split into
+    steps the robot accepts. A merged command keeps the id of the first
+    command it replaces; dropped turns count among the sources of the
+    command after them, so every original id is delivered with something"""
+    # Each entry: [cmd, amount, direction, source ids] - a turn's amount is
+    # its change of heading, so turns can simply be added
+    merged = []
+    dropped = []  # ids of turns that cancelled out, waiting for the next command
+    for command in commands:
+        ids = dropped + [command.id]
+        dropped = []
+        if command.is_move:
+            last = merged[-1] if merged else None
+            if last and last[0] == "move" and last[2] == command.dir:
+                last[1] += command.value
+                last[3].extend(ids)
+            else:
+                merged.append(["move", command.value, command.dir, ids])
+        else:
+            delta = command.value - 90.0
+            if merged and merged[-1][0] == "turn":
+                merged[-1][1] += delta
+                merged[-1][3].extend(ids)
+            else:
+                merged.append(["turn", delta, 0, ids])
+
+            if _normalize_turn(merged[-1][1]) == 0:
+                # Turns cancel out - drop them, the next move then merges
+                # with the one before
+                dropped = merged.pop()[3]
+    if dropped and merged:
+        # Nothing after them - they go with the last command instead
+        merged[-1][3].extend(dropped)
+
+    optimized = []
+    sources = {}
+    max_step = min(max_angle - 90.0, 90.0 - min_angle)
+    for cmd, amount, direction, ids in merged:
+        if cmd == "move":
+            command = Command("move", round(amount, 9), ids[0], direction)
+            optimized.append(command)
+            sources[command.id] = ids
+            continue
+
+        # Split big turns into steps of at most max_step each way
+        delta = _normalize_turn(amount)
+        steps = max(1, int(-(-abs(delta) // max_step)))
+        for k in range(steps):
+            command_id = ids[0] if k == 0 else f"{ids[0]}.{k}"
+            command = Command("turn", round(90.0 + delta / steps, 9), command_id)
+            optimized.append(command)
+            sources[command_id] = ids
+
+    return OptimizeResult(commands, optimized, sources)
@@ -1,110 +1,295 @@
+import StartupTimer
+import FrameProfiler
 from GUI import GUI
-import json
-import requests
+StartupTimer.mark("import GUI (customtkinter)")
+from RobotClient import error_kind
+from NetworkWorker import NetworkWorker
+from Fleet import Fleet, FleetDispatcher
+from PoseFeed import PoseFeed
+from Commands import Command
+from Planner import Planner, DEFAULT_ADDRESS, CLIENT_OPTIONS
+from PipelinedSender import ACKED, QUEUED
+from PathFile import ChunkedLoader, FORMATS
+import WaypointPlanner
+import os
+import sys
+StartupTimer.mark("import planner modules")
 
-api_address = "http://192.168.4.1/api/path" # standin for now
-pose_api_address = "http://192.168.4.1/api/pose"  # Will be set based on api_address
+robot_address = DEFAULT_ADDRESS # standin for now
 
-gui = GUI()
+# Fleet mode - pass --fleet=cars.json (a list of {"name", "address"}) to drive several cars
+fleet_file = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--fleet=")), None)
 
-commands = [] # holds user's commands
-moveID = 1
-turnID = 1
+# Every car gets its own keep-alive client - every request to it goes through that
+client_options = dict(CLIENT_OPTIONS)
+fleet = Fleet.load(fleet_file, client_options) if fleet_file else Fleet.single(robot_address, client_options)
+robot = fleet.primary.client  # the car the pose panel follows
+
+# The headless core holds the path and the upload settings, the GUI drives it
+planner = Planner(
+    fleet,
+    optimize_paths=True,  # merge redundant moves and turns before upload - the list in the GUI is left as built
+    batch_size=0,  # commands per batched request, 0 sends the whole path in one request
+    pipeline_window=8  # pipelined uploads - up to this many commands in flight, if the robot can buffer them
+)
+commands = planner.commands # holds user's commands, in the order shown
+
+gui = GUI(commands)
+StartupTimer.mark("build window")
+
+# Frame profiling - run with --profile-frames for the debug overlay
+profiler = None
+if FrameProfiler.enabled:
+    profiler = FrameProfiler.FrameProfiler(gui.root)
+    FrameProfiler.instrument_gui(profiler, gui)
+    profiler.start()
+    FrameProfiler.DebugOverlay(profiler)
+
+# All robot I/O runs here so the mainloop never blocks on the network -
+# a long-polled pose feed holds a worker, so there is one per car plus one spare
+network = NetworkWorker(gui.root, workers=len(fleet) + 1, max_pending=16 + len(fleet))
+pose_job = None
+
+# Uploads run on their own workers, all selected cars in parallel
+dispatcher = FleetDispatcher(gui.root, fleet)
+tracked_robot = None  # the car whose upload progress the command blocks show
+send_results = {}  # car name -> None once sent, or the error that stopped it
+path_loader = None  # the path file being read in, if any
+
+# Live pose feeds - poll fast while a path runs, slowly otherwise
+pose_feeds = {}
+for car in fleet:
+    pose_feeds[car.name] = PoseFeed(
+        gui.root, network, car.client,
+        on_pose=lambda x, y, car=car: on_fleet_pose(car, x, y),
+        on_error=lambda e, car=car: on_fleet_pose_error(car, e),
+        fast_ms=100,
+        idle_ms=1000
+    )
+pose_feed = pose_feeds[fleet.primary.name]
+
+# network functions - these run on a worker thread and must not touch the GUI
+def fetch_pose(job, robot):
+    """Request the current pose from a robot's client, returns (x, y)"""
+    x, y, version = robot.read_pose()
+    return x, y
 
 # button functions
 def update_pose():
     """Request current pose from robot and update display"""
-    global pose_api_address
-    
-    # Set pose API address if not set
-    if not pose_api_address and api_address:
-        # Extract base URL from api_address and add /api/pose
-        pose_api_address = api_address.replace('/api/', '/api/pose')
+    global pose_job
     
-    if not pose_api_address:
+    if not robot_address:
         gui.show_toast("API address not configured", "error")
         return
     
-    try:
-        response = requests.get(pose_api_address, timeout=2)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Parse response format: {"H":"...", "pose":{"x":..., "y":...}}
-            if "pose" in data:
-                x = float(data["pose"]["x"])
-                y = float(data["pose"]["y"])
-                
-                # Update the display
-                gui.update_pose_display(x, y)
-                gui.show_toast(f"Pose updated: ({x:.2f}, {y:.2f})", "success")
-            else:
-                gui.show_toast("Invalid pose data format", "error")
-        else:
-            gui.show_toast(f"Failed to get pose: {response.status_code}", "error")
-            
-    except requests.exceptions.Timeout:
-        gui.show_toast("Pose request timed out", "error")
-    except requests.exceptions.ConnectionError:
-        gui.show_toast("Cannot connect to robot", "error")
-    except Exception as e:
-        gui.show_toast(f"Error getting pose: {str(e)}", "error")
+    # Ignore repeat clicks while a request is already out
+    if pose_job and not pose_job.done:
+        return
+    
+    pose_job = network.submit(fetch_pose, robot, on_done=on_pose, on_error=on_pose_error)
+    if pose_job is None:
+        gui.show_toast("Network busy, try again", "warning")
+        return
+    
+    # The rest of the fleet only updates its markers
+    for car in fleet.robots[1:]:
+        network.submit(
+            fetch_pose, car.client,
+            on_done=lambda pose, car=car: on_fleet_pose(car, *pose),
+            on_error=lambda e, car=car: on_fleet_pose_error(car, e)
+        )
+
+def toggle_live_pose():
+    if gui.live_pose_switch.get():
+        for feed in pose_feeds.values():
+            feed.start()
+        gui.update_pose_button.configure(state="disabled")
+    else:
+        for feed in pose_feeds.values():
+            feed.stop()
+        gui.update_pose_button.configure(state="normal")
+
+def on_fleet_pose(car, x, y):
+    if car is fleet.primary:
+        gui.update_pose_display(x, y)
+    else:
+        gui.update_fleet_pose(car.name, x, y, car.color)
+
+def on_fleet_pose_error(car, e):
+    if car is fleet.primary:
+        on_pose_error(e)
+    else:
+        # A toast per unreachable car would bury the screen, log it instead
+        print(f"{car.name}: pose error ({error_kind(e)}): {e}")
+
+def on_fleet_toggle(name, selected):
+    fleet[name].selected = selected
+
+def on_pose(pose):
+    x, y = pose
+    
+    # Update the display
+    gui.update_pose_display(x, y)
+    gui.show_toast(f"Pose updated: ({x:.2f}, {y:.2f})", "success", key="pose")
+
+def on_pose_error(e):
+    kind = error_kind(e)
+    if kind == "timeout":
+        gui.show_toast("Pose request timed out", "error", key="pose")
+    elif kind == "connection":
+        gui.show_toast("Cannot connect to robot", "error", key="pose")
+    elif kind == "robot":
+        gui.show_toast(str(e), "error", key="pose")
+    else:
+        gui.show_toast(f"Error getting pose: {str(e)}", "error", key="pose")
         print(f"Pose error: {e}")
 
 def clear_all():
-    global commands
-    commands.clear()
+    cancel_load()
+    gui.clear_all_command_blocks()
+
+def path_file_types():
+    return [("Path files", " ".join(f"*{extension}" for extension in FORMATS))] + \
+           [(f"{kind.upper()} path", f"*{extension}") for extension, kind in FORMATS.items()]
+
+def load_path():
+    """Replace the command list with a path file, read in slices so the window stays live"""
+    global path_loader
+    if dispatcher.busy:
+        gui.show_toast("Can't load a path while sending", "warning")
+        return
+    from tkinter import filedialog
+    path = filedialog.askopenfilename(title="Load path", filetypes=path_file_types())
+    if not path:
+        return
+    
+    # Clearing and loading undo as one step
+    cancel_load()
+    commands.history.begin_group()
     gui.clear_all_command_blocks()
+    # The predicted path is drawn once the whole file is in
+    gui.pause_prediction()
+    path_loader = ChunkedLoader(
+        gui.root, path,
+        on_chunk=on_path_chunk,
+        on_done=lambda count: on_path_loaded(path, count),
+        on_error=on_path_load_error
+    )
+    path_loader.start()
+
+def on_path_chunk(chunk):
+    gui.command_list.extend(chunk)
+    gui.show_toast(f"Loading path... {len(commands)} commands", "info", key="load")
+
+def on_path_loaded(path, count):
+    global path_loader
+    path_loader = None
+    commands.history.end_group()
+    gui.pause_prediction(False)
+    gui.show_toast(f"Loaded {count} commands from {os.path.basename(path)}", "success", key="load")
+
+def on_path_load_error(e):
+    global path_loader
+    path_loader = None
+    commands.history.end_group()
+    gui.pause_prediction(False)
+    print(f"Path load stopped: {e}")
+    gui.show_toast(f"{e} - kept the {len(commands)} commands before it", "error", key="load")
+
+def cancel_load():
+    global path_loader
+    if path_loader:
+        path_loader.cancel()
+        path_loader = None
+        commands.history.end_group()
+        gui.pause_prediction(False)
+
+def save_path():
+    if len(commands) == 0:
+        gui.show_toast("No commands to save", "warning")
+        return
+    from tkinter import filedialog
+    path = filedialog.asksaveasfilename(title="Save path", defaultextension=".jsonl", filetypes=path_file_types())
+    if not path:
+        return
+    try:
+        count = planner.save(path)
+    except (OSError, ValueError) as e:
+        gui.show_toast(f"Cannot save path: {e}", "error")
+        return
+    gui.show_toast(f"Saved {count} commands to {os.path.basename(path)}", "success")
+
+def plan_route():
+    """Append the commands that drive from the end of the path through the clicked waypoints"""
+    if not gui.waypoints:
+        gui.show_toast("Click waypoints on the map first", "warning")
+        return
+    if path_loader:
+        gui.show_toast("Wait for the path to finish loading", "warning")
+        return
+    try:
+        route = WaypointPlanner.plan_route(gui.occupancy, gui.predicted_end_pose(), gui.waypoints)
+    except WaypointPlanner.NoRouteError as e:
+        gui.show_toast(str(e), "error", key="route")
+        return
+    gui.command_list.extend([
+        commands.new_move(value) if cmd == "move" else commands.new_turn(value)
+        for cmd, value in route.commands
+    ])
+    gui.clear_waypoints()
+    gui.show_toast(route.summary(), "success", key="route")
+
+def undo():
+    cancel_load()
+    if not gui.undo_edit():
+        gui.show_toast("Nothing to undo", "info", key="undo")
+
+def redo():
+    cancel_load()
+    if not gui.redo_edit():
+        gui.show_toast("Nothing to redo", "info", key="undo")
+
+def edit_command(command_id):
+    """Change the distance or angle of a command, keeping its id"""
+    if path_loader:
+        return
+    old = commands[commands.index_of(command_id)]
+    value = gui.ask_command_value(old)
+    if value is None or command_id not in commands.positions:
+        return
+    try:
+        command = Command(old.cmd, value, old.id, old.dir)
+    except ValueError as e:
+        gui.show_toast(str(e), "error")
+        return
+    gui.command_list.replace(commands.index_of(command_id), command)
+    gui.show_toast(f"{command.id} is now {command.describe()}", "success", key="added")
 
 def list_all():
     """Debug function - prints to console"""
     if (len(commands) == 0):
         print("No commands")
-    for i in range(len(commands)):
-        entry = commands[i]
-        if entry["cmd"] == "move":
-            print(f"{{ cmd: move d: {entry['d']} dir: {entry['dir']} id: {entry['id']} }}")
-        else:
-            print(f"{{ cmd: turn direction: {entry['a']} id: {entry['id']} }}")
+    for command in commands:
+        print(command)
 
 def remove_last():
     if len(commands):
-        commands.pop(-1)
         gui.remove_last_command_block()
 
 def add_preset_move(distance):
     """Add a movement command with preset distance"""
-    global moveID, commands
-    
-    move_command = {
-        "cmd" : "move",
-        "d" : distance,
-        "dir" : 1,  # Always forward
-        "id" : f"m{moveID}"
-    }
-    moveID += 1
-    commands.append(move_command)
+    move_command = commands.new_move(distance)
     gui.add_command_block(move_command)
-    gui.show_toast(f"Move {distance}m added", "success")
+    gui.show_toast(f"Move {distance}m added", "success", key="added")
 
 def add_preset_turn(angle):
     """Add a turn command with preset angle"""
-    global turnID, commands
-    
-    turn_command = {
-        "cmd" : "turn",
-        "a" : angle,
-        "id" : f"t{turnID}"
-    }
-    turnID += 1
-    commands.append(turn_command)
+    turn_command = commands.new_turn(angle)
     gui.add_command_block(turn_command)
-    gui.show_toast(f"Turn {angle}° added", "success")
+    gui.show_toast(f"Turn {angle}° added", "success", key="added")
 
 def add_command():
-    global moveID, turnID, commands
-    
     # Check which tab is currently active
     active_tab = gui.command_tabs.get()
     
@@ -115,18 +300,16 @@ def add_command():
         if not distance:
             gui.show_toast("Please enter a distance", "error")
             return
-            
-        move_command = {
-            "cmd" : "move",
-            "d" : distance,
-            "dir" : 1,  # Always forward
-            "id" : f"m{moveID}"
-        }
-        moveID += 1
-        commands.append(move_command)
+        
+        # Validated once here - everything downstream trusts the numbers
+        try:
+            move_command = commands.new_move(distance)
+        except ValueError as e:
+            gui.show_toast(str(e), "error")
+            return
         gui.add_command_block(move_command)
         gui.dist_entry.delete(0, "end")
-        gui.show_toast("Movement command added", "success")
+        gui.show_toast("Movement command added", "success", key="added")
         
     elif active_tab == "Turn":
         # Process custom turn command
@@ -135,47 +318,205 @@ def add_command():
         if not direction:
             gui.show_toast("Please enter an angle", "error")
             return
-            
-        turn_command = {
-            "cmd" : "turn",
-            "a" : direction,
-            "id" : f"t{turnID}"
-        }
-        turnID += 1
-        commands.append(turn_command)
+        
+        try:
+            turn_command = commands.new_turn(direction)
+        except ValueError as e:
+            gui.show_toast(str(e), "error")
+            return
         gui.add_command_block(turn_command)
         gui.direction_entry.delete(0, "end")
-        gui.show_toast("Turn command added", "success")
+        gui.show_toast("Turn command added", "success", key="added")
 
 
 
 def send_commands():
-    global commands, api_address
+    """Start sending the path to the selected cars, or cancel the sends in progress"""
+    global tracked_robot, send_results
     
-    # Get the current sequence order from GUI
-    commands = gui.get_command_sequence()
+    if dispatcher.busy:
+        # Each upload closes its journal itself once its last request is
+        # back, so acks still in flight are recorded
+        dispatcher.cancel()
+        finish_send(resumable=True)
+        gui.show_toast("Send cancelled", "warning", key="send")
+        return
+    
+    if path_loader:
+        gui.show_toast("Wait for the path to finish loading", "warning")
+        return
+    
+    if dispatcher.stopping():
+        gui.show_toast("Still stopping the last send, try again in a moment", "warning", key="send")
+        return
     
     if len(commands) == 0:
         gui.show_toast("No commands to send", "warning")
         return
     
+    targets = fleet.selected()
+    if not targets:
+        gui.show_toast("No robots selected", "warning")
+        return
+    
     print("Final command sequence to send:")
     list_all()
-    print(f"Sending {len(commands)} commands...")
+    # Encoded once for the whole path - the workers only see plain dicts.
+    # blocks says which blocks in the list each uploaded command stands for
+    payload, blocks, result = planner.plan()
+    if result is not None and result.saved_requests:
+        print(result.summary())
+    if not payload:
+        # The moves and turns cancel out - the robot would end up where it is
+        gui.show_toast("The path cancels out, nothing to send", "warning")
+        return
+    print(f"Sending {len(payload)} commands to {', '.join(car.name for car in targets)}...")
+    total = len(payload)
+    
+    # The command blocks show the progress of the first car
+    tracked_robot = targets[0]
+    send_results = {}
+    gui.command_list.reset_states(QUEUED)
+    
+    source = commands.encode()
+    started = 0
+    for car in targets:
+        if start_upload(car, payload, blocks, total, source):
+            started += 1
+    if not started:
+        gui.show_toast("Network busy, try again", "warning")
+        return
     
-    gui.show_toast(f"Sending {len(commands)} commands...", "info")
+    if len(targets) > 1:
+        gui.show_toast(f"Sending {total} commands to {started} robots...", "info", key="send")
+    gui.send_button.configure(text="Cancel Send")
+    for car in targets:
+        pose_feeds[car.name].set_busy(True)
+
+def start_upload(car, payload, blocks, total, source):
+    """Queue the upload to one car, resuming its unfinished upload of the same path.
+    The worker keeps the car's journal, see Planner.send_to"""
+    checkpoint = planner.checkpoint(car, payload)
+    resuming = checkpoint is not None
+    
+    job = dispatcher.submit(
+        car, lambda job: planner.send_to(car, payload, blocks, job, source=source),
+        on_done=on_send_done,
+        on_error=on_send_error,
+        on_progress=lambda car, progress: show_send_progress(car, progress, total, blocks)
+    )
+    if job is None:
+        return False
+    
+    if car is tracked_robot:
+        if resuming:
+            show_acked(checkpoint)
+            gui.show_toast(f"Resuming from command {checkpoint.first_pending() + 1} of {total}", "info", key="send")
+        else:
+            gui.show_toast(f"Sending {total} commands...", "info", key="send")
+    return True
+
+def show_send_progress(car, progress, total, blocks):
+    sent, changes = progress
+    if car is not tracked_robot:
+        return
+    gui.send_button.configure(text=f"Cancel ({sent}/{total})")
+    for command_id, state in changes.items():
+        gui.command_list.set_state(blocks.get(command_id, ()), state)
+
+def show_acked(checkpoint):
+    for command_id in checkpoint.acked:
+        gui.command_list.set_state(checkpoint.blocks.get(command_id, ()), ACKED)
+
+def finish_send(resumable=False):
+    gui.send_button.configure(text="Resume Send" if resumable else "Send Commands")
+    for feed in pose_feeds.values():
+        feed.set_busy(False)
+
+def on_send_done(car, result):
+    mode, elapsed = result
+    pose_feeds[car.name].set_busy(False)
+    print(f"{car.name}: sent path in {elapsed:.3f}s ({mode})")
+    send_results[car.name] = None
+    finish_fleet_send()
+
+def on_send_error(car, e):
+    print(f"{car.name}: {e}: {e.__cause__ or ''}")
+    send_results[car.name] = e
+    if len(fleet) > 1:
+        gui.show_toast(f"{car.name}: {e}", "error")
+    finish_fleet_send()
+
+def finish_fleet_send():
+    """Once every car's upload has ended, sum up"""
+    if dispatcher.busy:
+        return
     
-    for i in range(len(commands)):
+    failed = [name for name, error in send_results.items() if error is not None]
+    finish_send(resumable=bool(failed))
+    if failed and len(send_results) > 1:
+        # Only the cars that failed should get the path again
+        for name, error in send_results.items():
+            if error is None:
+                fleet[name].selected = False
+                if name in gui.fleet_checkboxes:
+                    gui.fleet_checkboxes[name].deselect()
+    if not failed:
+        gui.show_toast("All commands sent successfully!", "success", key="send")
+    elif len(send_results) == 1:
+        gui.show_toast(f"{send_results[failed[0]]} - press Resume Send to continue from there", "error", key="send")
+    else:
+        gui.show_toast(f"Send failed for {', '.join(failed)} - press Resume Send to retry those", "error", key="send")
+
+def restore_checkpoint():
+    """Reload a path whose upload was interrupted by a crash, ready to resume"""
+    if len(commands):
+        return
+    for car in fleet:
+        checkpoint = car.journal.load()
+        if checkpoint is not None and checkpoint.robot == car.address:
+            break
+    else:
+        return
+    
+    for data in checkpoint.source:
         try:
-            response = requests.post(api_address, json=commands[i])
-            print(api_address)
-            print(f"Sent command {i+1}/{len(commands)} - Status: {response.status_code}")
-        except Exception as e:
-            print(f"Error sending command {i+1}: {e}")
-            gui.show_toast(f"Error sending command {i+1}", "error")
-            return
+            gui.add_command_block(Command.from_dict(data))
+        except ValueError as e:
+            print(f"Skipping journal entry {data}: {e}")
+    commands.history.clear()  # the restored path is where undo stops
+    show_acked(checkpoint)
+    gui.send_button.configure(text="Resume Send")
+    gui.show_toast(f"Restored an interrupted upload, {checkpoint.remaining} commands left", "warning")
+
+def on_first_frame():
+    """Runs once the window is on screen - do the deferred startup work here"""
+    StartupTimer.mark("first frame")
+    if StartupTimer.enabled:
+        print(f"First frame: {StartupTimer.elapsed_ms():.1f} ms")
+    
+    # Rasterizing the car and importing requests aren't needed to show the window
+    gui.load_car_image()
+    StartupTimer.mark("car sprite (deferred)")
+    restore_checkpoint()
+    for car in fleet:
+        network.submit(lambda job, client=car.client: client.warm_up())
     
-    gui.show_toast("All commands sent successfully!", "success")
+    if StartupTimer.enabled:
+        StartupTimer.report()
+    if "--exit-after-first-frame" in sys.argv:
+        on_close()
+
+def on_close():
+    if profiler:
+        print(f"Frame trace written to {profiler.dump_trace()}")
+    cancel_load()
+    for feed in pose_feeds.values():
+        feed.stop()
+    dispatcher.stop()
+    network.stop()
+    planner.close()
+    gui.root.destroy()
 
 
 
@@ -183,8 +524,24 @@ gui.clear_all_button.configure(command=clear_all)
 gui.remove_last_button.configure(command=remove_last)
 gui.add_point_button.configure(command=add_command)
 gui.send_button.configure(command=send_commands)
+gui.load_path_button.configure(command=load_path)
+gui.save_path_button.configure(command=save_path)
+gui.plan_route_button.configure(command=plan_route)
+gui.clear_map_button.configure(command=gui.clear_map)
+gui.undo_button.configure(command=undo)
+gui.redo_button.configure(command=redo)
+gui.command_list.on_edit = edit_command
+
+gui.root.bind("<Control-z>", lambda event: undo())
+gui.root.bind("<Control-y>", lambda event: redo())
+gui.root.bind("<Control-Z>", lambda event: redo())  # Ctrl+Shift+Z
 
 gui.update_pose_button.configure(command=update_pose)
+gui.live_pose_switch.configure(command=toggle_live_pose)
+
+# Fleet mode - pick which cars Send uploads to
+if len(fleet) > 1:
+    gui.setup_fleet([(car.name, car.color, car.selected) for car in fleet], on_fleet_toggle)
 
 # Configure preset distance buttons
 preset_distances = ["0.1", "0.15", "0.2", "0.25"]
@@ -196,4 +553,7 @@ preset_angles = ["10", "45", "90", "180"]
 for i, btn in enumerate(gui.preset_angle_buttons):
     btn.configure(command=lambda a=preset_angles[i]: add_preset_turn(a))
 
+gui.root.protocol("WM_DELETE_WINDOW", on_close)
+# after_idle lets Tk draw the window before on_first_frame runs
+gui.root.after_idle(lambda: gui.root.after(0, on_first_frame))
 gui.root.mainloop()
@@ -0,0 +1,159 @@
+import math
+
+# NumPy makes long paths fast but isn't required
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+START_HEADING = 90.0  # degrees, the robot starts facing +Y ("90° is straight ahead")
+
+class PathSimulator:
+    """Predicts where the robot ends up after each command of a sequence.
+    Turns add (angle - 90) degrees to the heading, moves travel along the
+    current heading. Headings and positions are cumulative sums, computed
+    vectorized with NumPy. After an edit only the poses from the first
+    changed command onward are recomputed.
+
+    Poses are relative to the robot's pose before the path starts: it sits
+    at (0, 0) facing heading 90"""
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.valid = 0  # poses up to and including this command index are current
+        self.capacity = 0
+        self._grow(64)
+
+    def _grow(self, capacity):
+        """Reallocate the pose buffers, keeping what has been computed"""
+        old = self.capacity
+        self.capacity = capacity
+        if np is not None:
+            for name in ("x", "y", "heading", "moves"):
+                dtype = bool if name == "moves" else float
+                buffer = np.zeros(capacity + 1, dtype=dtype)
+                if old:
+                    buffer[:old + 1] = getattr(self, name)
+                setattr(self, name, buffer)
+        else:
+            for name in ("x", "y", "heading", "moves"):
+                buffer = [False if name == "moves" else 0.0] * (capacity + 1)
+                if old:
+                    buffer[:old + 1] = getattr(self, name)
+                setattr(self, name, buffer)
+        self.heading[0] = START_HEADING
+
+    def invalidate(self, index=0):
+        """Commands from `index` on changed (added, removed or reordered)"""
+        self.valid = min(self.valid, index)
+
+    def poses(self):
+        """Pose after each command as (x, y, heading, moves) arrays of
+        length n + 1 - entry 0 is the start pose, moves[i] marks entries
+        that follow a move"""
+        n = len(self.sequence)
+        if n > self.capacity:
+            self._grow(max(n, self.capacity * 2))
+
+        start = min(self.valid, n)
+        if start < n:
+            if np is not None:
+                self._integrate_numpy(start, n)
+            else:
+                self._integrate_python(start, n)
+        self.valid = n
+        return self.x[:n + 1], self.y[:n + 1], self.heading[:n + 1], self.moves[:n + 1]
+
+    def _integrate_numpy(self, start, n):
+        items = self.sequence.items
+        count = n - start
+        values = np.fromiter((items[i].value for i in range(start, n)), float, count)
+        moves = np.fromiter((items[i].cmd == "move" for i in range(start, n)), bool, count)
+
+        headings = self.heading[start] + np.cumsum(np.where(moves, 0.0, values - 90.0))
+        radians = np.radians(headings)
+        distances = np.where(moves, values, 0.0)
+
+        self.heading[start + 1:n + 1] = headings
+        self.x[start + 1:n + 1] = self.x[start] + np.cumsum(distances * np.cos(radians))
+        self.y[start + 1:n + 1] = self.y[start] + np.cumsum(distances * np.sin(radians))
+        self.moves[start + 1:n + 1] = moves
+
+    def _integrate_python(self, start, n):
+        x = self.x[start]
+        y = self.y[start]
+        heading = self.heading[start]
+        for i in range(start, n):
+            command = self.sequence.items[i]
+            if command.cmd == "move":
+                x += command.value * math.cos(math.radians(heading))
+                y += command.value * math.sin(math.radians(heading))
+            else:
+                heading += command.value - 90.0
+            self.x[i + 1] = x
+            self.y[i + 1] = y
+            self.heading[i + 1] = heading
+            self.moves[i + 1] = command.cmd == "move"
+
+    def end_pose(self):
+        """Predicted (x, y, heading) after the whole path"""
+        x, y, heading, _ = self.poses()
+        return float(x[-1]), float(y[-1]), float(heading[-1]) % 360
+
+    def track(self, origin_x=0.0, origin_y=0.0, origin_heading=START_HEADING):
+        """Predicted positions as a list of (x, y) corners, placed as if the
+        path starts from the given pose. Turns don't move the robot, so only
+        the start and the end of each move are included"""
+        track_x, track_y = self._track(origin_x, origin_y, origin_heading)
+        if np is not None:
+            return list(zip(track_x.tolist(), track_y.tolist()))
+        return list(zip(track_x, track_y))
+
+    def canvas_coords(self, origin_x, origin_y, origin_heading, center, scale, max_points=2000):
+        """The track in canvas pixels (Y pointing down, `scale` pixels per
+        meter) as the flat [x0, y0, x1, y1, ...] list Canvas.coords takes.
+        Corners are snapped to whole pixels and repeats of the same pixel
+        dropped, longer tracks are then thinned to about max_points by
+        stride - the ends are always kept"""
+        track_x, track_y = self._track(origin_x, origin_y, origin_heading)
+
+        if np is not None:
+            points = np.empty((len(track_x), 2))
+            points[:, 0] = np.rint(center + track_x * scale)
+            points[:, 1] = np.rint(center - track_y * scale)
+            if len(points) > 2:
+                moved = np.any(points[1:] != points[:-1], axis=1)
+                moved[-1] = True
+                points = points[np.concatenate(([True], moved))]
+            if len(points) > max_points:
+                stride = -(-len(points) // max_points)
+                points = np.concatenate((points[:-1:stride], points[-1:]))
+            return points.ravel().tolist()
+
+        points = [(round(center + x * scale), round(center - y * scale)) for x, y in zip(track_x, track_y)]
+        points = [point for i, point in enumerate(points)
+                  if i == 0 or i == len(points) - 1 or point != points[i - 1]]
+        if len(points) > max_points:
+            stride = -(-len(points) // max_points)
+            points = points[:-1:stride] + points[-1:]
+        return [coord for point in points for coord in point]
+
+    def _track(self, origin_x, origin_y, origin_heading):
+        """Track x and y as NumPy arrays, or lists without NumPy"""
+        x, y, _, moves = self.poses()
+
+        # Rotate the relative track onto the origin heading, then shift it
+        angle = math.radians(origin_heading - START_HEADING)
+        cos_a = math.cos(angle)
+        sin_a = math.sin(angle)
+
+        if np is not None:
+            keep = moves.copy()
+            keep[0] = True
+            xs = x[keep]
+            ys = y[keep]
+            return origin_x + xs * cos_a - ys * sin_a, origin_y + xs * sin_a + ys * cos_a
+
+        corners = [i for i in range(len(x)) if i == 0 or moves[i]]
+        return ([origin_x + x[i] * cos_a - y[i] * sin_a for i in corners],
+                [origin_y + x[i] * sin_a + y[i] * cos_a for i in corners])
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from RobotClient import RobotError
+import itertools
+import time
+
+# Per-command upload states, shown on the command blocks
+QUEUED = "queued"
+SENT = "sent"
+ACKED = "acked"
+FAILED = "failed"
+
+_upload_ids = itertools.count(int(time.time()) % 100000)
+
+def new_upload_id():
+    """Number identifying one upload - the robot resets its buffer when it changes"""
+    return next(_upload_ids)
+
+def check_ack(robot, response, command_id, count=None):
+    """None when a response acknowledges command_id (the last of `count`
+    commands, for a batch), else the RobotError saying why it doesn't"""
+    if response.status_code != 200:
+        return RobotError(f"Robot answered {response.status_code}")
+    try:
+        ack = robot.decode(response)
+    except ValueError:
+        return RobotError("Unreadable acknowledgement")
+    if ack.get("H") != command_id:
+        return RobotError(f"Acknowledged {ack.get('H')} instead of {command_id}")
+    if count is not None and ack.get("count", count) != count:
+        return RobotError(f"Acknowledged {ack['count']} of {count} commands")
+    return None
+
+class PipelinedSender:
+    """Sliding-window upload of a path, one command per request.
+    Up to `window` commands are in flight at once, so the whole path costs
+    about one round trip plus transfer time instead of one round trip per
+    command. Each command carries its position ("seq") and an upload
+    number, the robot buffers out-of-order arrivals and runs them in seq
+    order. A command counts as delivered when the robot echoes its id back
+    in "H"; anything not acknowledged is retransmitted on its own, the
+    robot ignores duplicates.
+
+    The window slides: a command is only sent while it is fewer than
+    `window` places past the oldest unacknowledged one, which bounds how
+    much the robot has to buffer.
+
+    A lost request only counts against a command's max_attempts when no
+    other command got through while it was out - on a lossy link that is
+    still delivering, a long path would otherwise fail on bad luck alone.
+    Every free retry needs a new ack, so the upload still ends"""
+
+    def __init__(self, robot, window=8, max_attempts=3):
+        self.robot = robot
+        self.window = max(1, window)
+        self.max_attempts = max_attempts
+        self.stats = {"requests": 0, "retransmits": 0}
+
+    def _post(self, upload, seq, command):
+        """Send one command, returns None when acknowledged, else the reason it wasn't"""
+        body = dict(command, seq=seq, upload=upload)
+        try:
+            response = self.robot.post_commands(body)
+        except Exception as e:
+            return e
+        return check_ack(self.robot, response, command["id"])
+
+    def _settle(self, job, in_flight, commands, acked, acked_count):
+        """Wait for the requests still in flight and report the ones the
+        robot acknowledged - it runs those whatever happens to the upload,
+        so the journal has to hear about them. Returns the new acked count"""
+        if not in_flight:
+            return acked_count
+        wait(in_flight)
+        changes = {}
+        for future, seq in in_flight.items():
+            if future.result() is None and not acked[seq]:
+                acked[seq] = True
+                acked_count += 1
+                changes[commands[seq]["id"]] = ACKED
+        in_flight.clear()
+        if changes:
+            job.report((acked_count, changes))
+        return acked_count
+
+    def send(self, job, commands, upload=None, already_acked=()):
+        """Upload a list of command dicts. Progress goes to job.report() as
+        (acked count, {id: state}) with only the states that changed.
+        To resume an upload pass its number and the ids already acknowledged,
+        the rest keep their original seq so the robot can spot repeats.
+        Raises RobotError when a command can't be delivered"""
+        if upload is None:
+            upload = new_upload_id()
+        attempts = [0] * len(commands)
+        strikes = [0] * len(commands)  # failed attempts while nothing else got through
+        sent_at = [0] * len(commands)  # acked count when each command last went out
+        acked = [command["id"] in already_acked for command in commands]
+        acked_count = sum(acked)
+        base = 0  # oldest unacknowledged command
+        while base < len(commands) and acked[base]:
+            base += 1
+        next_seq = base  # next command that has never been sent
+        retransmit = []  # commands to send again, oldest first
+        in_flight = {}
+
+        pool = ThreadPoolExecutor(max_workers=self.window, thread_name_prefix="pipeline")
+        try:
+            while base < len(commands):
+                if job.cancelled:
+                    return self._settle(job, in_flight, commands, acked, acked_count)
+
+                changes = {}
+                # Fill the window - retransmits first so the robot can drain its buffer
+                while len(in_flight) < self.window:
+                    if retransmit:
+                        seq = retransmit.pop(0)
+                        self.stats["retransmits"] += 1
+                    elif next_seq < len(commands) and next_seq < base + self.window:
+                        seq = next_seq
+                        next_seq += 1
+                        if acked[seq]:
+                            continue
+                    else:
+                        break
+                    attempts[seq] += 1
+                    sent_at[seq] = acked_count
+                    self.stats["requests"] += 1
+                    in_flight[pool.submit(self._post, upload, seq, commands[seq])] = seq
+                    changes[commands[seq]["id"]] = SENT
+                if changes:
+                    job.report((acked_count, changes))
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                changes = {}
+                for future in finished:
+                    seq = in_flight.pop(future)
+                    error = future.result()
+                    command_id = commands[seq]["id"]
+                    if error is None:
+                        acked[seq] = True
+                        acked_count += 1
+                        changes[command_id] = ACKED
+                        continue
+                    if acked_count == sent_at[seq]:
+                        strikes[seq] += 1
+                    if strikes[seq] >= self.max_attempts:
+                        changes[command_id] = FAILED
+                        job.report((acked_count, changes))
+                        self._settle(job, in_flight, commands, acked, acked_count)
+                        raise RobotError(f"Command {command_id} not acknowledged after "
+                                         f"{attempts[seq]} attempts") from error
+                    print(f"No ack for {command_id} ({error}), retransmitting")
+                    retransmit.append(seq)
+                    changes[command_id] = QUEUED
+                retransmit.sort()
+
+                while base < len(commands) and acked[base]:
+                    base += 1
+                job.report((acked_count, changes))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return acked_count
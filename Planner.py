@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Headless path planning - build or load a path, upload it to one robot or
+a fleet, and read poses, without Tk. PathPlanner.py puts the GUI on top
+of this; scripts and CI can use it directly:
+
+    from Planner import Planner
+    with Planner.connect("http://192.168.4.1") as planner:
+        planner.move(0.2)
+        planner.turn(45)
+        planner.send()
+
+or from the command line:
+
+    python Planner.py send PATH.json [--robot=URL | --fleet=cars.json] [--mode=auto]
+                                     [--format=auto] [--no-optimize] [--no-resume]
+    python Planner.py check PATH.json    validate a path and show what would be sent
+    python Planner.py pose [--robot=URL | --fleet=cars.json] [--watch=SECONDS]
+
+A path file is JSON Lines with one command per line in the robot's format,
+{"cmd": "move", "d": "0.2", "dir": 1, "id": "m1"}; CSV with cmd,value,dir,id
+columns; or a JSON list of commands (see PathFile.py).
+send exits with status 1 if any robot did not get the whole path; run it
+again to resume from where it stopped.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import sys
+import time
+
+from Commands import CommandSequence
+from CommandHistory import CommandHistory
+from PathFile import iter_commands, write_commands
+from WaypointPlanner import OccupancyGrid, plan_route
+from PathOptimizer import optimize
+from CommandUpload import upload_commands, UPLOAD_MODES
+from PipelinedSender import new_upload_id, ACKED
+from Fleet import Fleet
+
+DEFAULT_ADDRESS = "http://192.168.4.1"
+
+# Every car gets its own keep-alive client - every request to it goes through that
+CLIENT_OPTIONS = {
+    "pool_size": 8,
+    "retries": 2,
+    "backoff": 0.2,
+    "timeouts": {"path": (2.0, 5.0), "pose": (1.0, 2.0)},
+    "wire_format": "auto"  # compact binary commands/poses when the robot supports them, or "json"
+}
+
+class UploadJob:
+    """Job handle for an upload run directly on the calling thread,
+    the headless stand-in for a NetworkWorker job"""
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, progress):
+        if self.on_progress:
+            self.on_progress(progress)
+
+
+class Planner:
+    """A path and the robots it goes to.
+    Owns the command sequence and the upload settings; sending checkpoints
+    to each car's journal, so an interrupted upload of the same path resumes
+    where it stopped"""
+
+    def __init__(self, fleet, optimize_paths=True, mode="auto", batch_size=0, pipeline_window=8):
+        if mode not in UPLOAD_MODES:
+            raise ValueError(f"Unknown upload mode {mode!r}, choose from {', '.join(UPLOAD_MODES)}")
+        self.fleet = fleet
+        self.commands = CommandSequence(CommandHistory())  # the path, in the order it runs, with undo
+
+        # Merge redundant moves and turns before upload - the sequence itself is left as built
+        self.optimize_paths = optimize_paths
+        self.mode = mode
+        # Batched uploads - commands per request, 0 sends the whole path in one request
+        self.batch_size = batch_size
+        # Pipelined uploads - up to this many commands in flight, if the robot can buffer them
+        self.pipeline_window = pipeline_window
+
+    @classmethod
+    def connect(cls, address=DEFAULT_ADDRESS, client_options=None, **settings):
+        """Planner for a single robot"""
+        return cls(Fleet.single(address, client_options or CLIENT_OPTIONS), **settings)
+
+    @classmethod
+    def connect_fleet(cls, path, client_options=None, **settings):
+        """Planner for the robots listed in a fleet file"""
+        return cls(Fleet.load(path, client_options or CLIENT_OPTIONS), **settings)
+
+    @property
+    def robot(self):
+        """The primary robot's client"""
+        return self.fleet.primary.client
+
+    # ----- building the path -----
+
+    def move(self, distance):
+        """Validate and append a forward move, returns the Command"""
+        command = self.commands.new_move(distance)
+        self.commands.append(command)
+        return command
+
+    def turn(self, angle):
+        """Validate and append a turn, returns the Command"""
+        command = self.commands.new_turn(angle)
+        self.commands.append(command)
+        return command
+
+    def route(self, waypoints, grid=None):
+        """Append the commands that drive from the end of the path through
+        waypoints [(x, y) in meters, from where the path starts], around the
+        obstacles of an OccupancyGrid. Returns the Route, raises NoRouteError"""
+        # NumPy loads only when a route is planned, not with the module
+        from PathSimulator import PathSimulator, START_HEADING
+        start = (0.0, 0.0, START_HEADING)
+        if len(self.commands):
+            start = PathSimulator(self.commands).end_pose()
+        route = plan_route(OccupancyGrid() if grid is None else grid, start, waypoints)
+        self.commands.extend([
+            self.commands.new_move(value) if cmd == "move" else self.commands.new_turn(value)
+            for cmd, value in route.commands
+        ])
+        return route
+
+    def load(self, path):
+        """Append the commands of a path file (.jsonl, .csv or .json), streaming.
+        Returns how many, raises PathFileError naming the first invalid entry"""
+        count = 0
+        with self.commands.history.group():
+            for command in iter_commands(path):
+                try:
+                    self.commands.append(command)
+                except ValueError as e:  # a repeated id
+                    raise ValueError(f"{path}, command {count + 1}: {e}") from None
+                count += 1
+        return count
+
+    def undo(self):
+        """Revert the last edit of the path, returns whether there was one"""
+        return self.commands.undo() is not None
+
+    def redo(self):
+        return self.commands.redo() is not None
+
+    def save(self, path):
+        """Write the path to a file, its type picked by extension - returns how many commands"""
+        return write_commands(path, self.commands)
+
+    def plan(self):
+        """What an upload sends: (wire dicts, blocks, OptimizeResult or None).
+        blocks maps each sent id to the ids of the commands it stands for"""
+        to_send = list(self.commands)
+        blocks = {command.id: [command.id] for command in to_send}
+        result = None
+        if self.optimize_paths:
+            result = optimize(to_send)
+            to_send = result.commands
+            blocks = result.sources
+        return [command.to_dict() for command in to_send], blocks, result
+
+    # ----- sending -----
+
+    def upload(self, job, robot, payload, upload=None, already_acked=()):
+        """Upload wire dicts to one robot's client with these settings, on the
+        calling thread. Returns (mode, seconds taken)"""
+        return upload_commands(job, robot, payload, upload, already_acked, mode=self.mode,
+                               batch_size=self.batch_size, pipeline_window=self.pipeline_window)
+
+    def checkpoint(self, car, payload):
+        """The car's unfinished upload of exactly this payload, or None"""
+        checkpoint = car.journal.load()
+        if checkpoint is not None and checkpoint.matches(car.address, payload):
+            return checkpoint
+        return None
+
+    def send_to(self, car, payload=None, blocks=None, job=None, resume=True, source=None):
+        """Upload the path to one car, journaling progress as it goes.
+        The journal is written only from here, on the uploading thread, and
+        closed once the last request is back - even after a cancel, acks
+        that still arrive are recorded. source is the encoded command list
+        to journal, taken from the sequence when not given.
+        Returns (mode, seconds taken), raises RobotError when it stops"""
+        if payload is None:
+            payload, blocks, _ = self.plan()
+        job = job or UploadJob()
+        checkpoint = self.checkpoint(car, payload) if resume else None
+        if checkpoint is not None:
+            upload, already_acked = checkpoint.upload, checkpoint.acked
+            car.journal.resume()
+        else:
+            upload, already_acked = new_upload_id(), set()
+            source = self.commands.encode() if source is None else source
+            car.journal.start(car.address, upload, payload, blocks, source)
+
+        report = job.report
+        def journaled(progress):
+            sent, changes = progress
+            car.journal.record([command_id for command_id, state in changes.items() if state == ACKED])
+            report(progress)
+        job.report = journaled
+
+        try:
+            result = self.upload(job, car.client, payload, upload, already_acked)
+        except Exception:
+            car.journal.close()
+            raise
+        if job.cancelled:
+            car.journal.close()
+        else:
+            car.journal.finish()
+        return result
+
+    def send(self, targets=None, resume=True, on_progress=None):
+        """Upload the path to the selected cars (or `targets`), in parallel.
+        on_progress(car, (delivered, {id: state})) runs on the upload threads.
+        Returns {car name: (mode, seconds) or the exception that stopped it}"""
+        targets = self.fleet.selected() if targets is None else targets
+        payload, blocks, _ = self.plan()
+        if not payload:
+            raise ValueError("No commands to send")
+
+        def send_one(car):
+            job = UploadJob(on_progress and (lambda progress: on_progress(car, progress)))
+            try:
+                return self.send_to(car, payload, blocks, job, resume)
+            except Exception as e:
+                return e
+
+        if len(targets) == 1:
+            return {targets[0].name: send_one(targets[0])}
+        with ThreadPoolExecutor(max_workers=min(32, len(targets))) as pool:
+            return dict(zip((car.name for car in targets), pool.map(send_one, targets)))
+
+    # ----- poses -----
+
+    def pose(self, car=None):
+        """One pose reading (x, y) from a car, the primary one by default"""
+        client = (car or self.fleet.primary).client
+        x, y, version = client.read_pose()
+        return x, y
+
+    def poses(self, car=None, interval_s=0.1, longpoll_wait_ms=1000):
+        """Endless (x, y) readings - each new pose as soon as it exists on
+        robots that long-poll, otherwise one every interval_s"""
+        client = (car or self.fleet.primary).client
+        longpoll = client.supports_pose_longpoll()
+        version = None
+        while True:
+            if longpoll and version is not None:
+                x, y, new_version = client.read_pose(version, longpoll_wait_ms)
+                if new_version == version:
+                    continue  # the wait ran out with no new pose
+                version = new_version
+            else:
+                x, y, version = client.read_pose()
+                if version is None:
+                    longpoll = False  # unnumbered poses can't be waited on
+            yield x, y
+            if not longpoll:
+                time.sleep(interval_s)
+
+    def close(self):
+        for car in self.fleet:
+            car.journal.close()
+        self.fleet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {"robot": DEFAULT_ADDRESS, "fleet": "", "mode": "auto", "format": "auto", "watch": "0"}
+    flags = set()
+    positional = []
+    for arg in argv:
+        if not arg.startswith("--"):
+            positional.append(arg)
+            continue
+        name, has_value, value = arg[2:].partition("=")
+        if name in ("no-optimize", "no-resume") and not has_value:
+            flags.add(name)
+        elif name in options and has_value:
+            options[name] = value
+        else:
+            sys.exit(f"Unknown option {arg}\n{__doc__}")
+
+    if not positional or positional[0] not in ("send", "check", "pose"):
+        sys.exit(__doc__)
+    action = positional[0]
+    if action in ("send", "check") and len(positional) != 2:
+        sys.exit(f"{action} needs a path file\n{__doc__}")
+
+    client_options = dict(CLIENT_OPTIONS, wire_format=options["format"])
+    settings = {"optimize_paths": "no-optimize" not in flags, "mode": options["mode"]}
+    try:
+        if options["fleet"]:
+            planner = Planner.connect_fleet(options["fleet"], client_options, **settings)
+        else:
+            planner = Planner.connect(options["robot"], client_options, **settings)
+    except (OSError, ValueError, KeyError) as e:
+        sys.exit(f"Cannot set up robots: {e}")
+
+    with planner:
+        if action == "pose":
+            return watch_poses(planner, float(options["watch"]))
+
+        try:
+            planner.load(positional[1])
+        except (OSError, ValueError) as e:
+            sys.exit(str(e))
+        payload, blocks, result = planner.plan()
+        print(f"{len(planner.commands)} commands, {len(payload)} to send", file=sys.stderr)
+        if result is not None and result.saved_requests:
+            print(result.summary(), file=sys.stderr)
+        if action == "check":
+            print(json.dumps(payload))
+            return 0
+
+        # One status line for all cars, redrawn when a count changes
+        delivered = {}
+        def progress(car, update):
+            if delivered.get(car.name) != update[0]:
+                delivered[car.name] = update[0]
+                status = "  ".join(f"{name}: {count}/{len(payload)}" for name, count in delivered.items())
+                print(f"\rSent {status}", end="", file=sys.stderr)
+
+        results = planner.send(resume="no-resume" not in flags, on_progress=progress)
+        print(file=sys.stderr)
+        failed = 0
+        for name, outcome in results.items():
+            if isinstance(outcome, Exception):
+                failed += 1
+                cause = f" ({outcome.__cause__})" if outcome.__cause__ else ""
+                print(f"{name}: failed: {outcome}{cause}", file=sys.stderr)
+            else:
+                mode, elapsed = outcome
+                print(f"{name}: sent {len(payload)} commands in {elapsed:.3f}s ({mode})", file=sys.stderr)
+        return 1 if failed else 0
+
+
+def watch_poses(planner, seconds):
+    """Print poses as JSON lines - one reading, or all readings for `seconds`"""
+    cars = planner.fleet.selected()
+    try:
+        if seconds <= 0:
+            for car in cars:
+                x, y = planner.pose(car)
+                print(json.dumps({"robot": car.name, "x": round(x, 4), "y": round(y, 4)}))
+            return 0
+
+        # One car at a time; a fleet is read round-robin, one pose each
+        feeds = [(car, planner.poses(car)) for car in cars]
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for car, feed in feeds:
+                x, y = next(feed)
+                print(json.dumps({"robot": car.name, "x": round(x, 4), "y": round(y, 4), "t": round(time.time(), 3)}),
+                      flush=True)
+        return 0
+    except Exception as e:
+        print(f"Pose error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
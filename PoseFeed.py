@@ -0,0 +1,174 @@
+from RobotClient import error_kind
+import time
+
+class PoseFeed:
+    """Keeps the pose display live by polling the robot.
+    Polls fast while a path is being sent or the robot is moving, slowly
+    when idle, and backs off while the robot isn't answering. Robots that
+    support it are long-polled instead, so a new pose arrives as soon as it
+    exists. Out-of-date responses are dropped and redraws are coalesced so
+    on_pose runs at most once per frame"""
+
+    def __init__(self, root, network, robot, on_pose, on_error=None,
+                 fast_ms=100, idle_ms=1000, max_backoff_ms=5000,
+                 settle_s=2.0, longpoll_wait_ms=1000, frame_ms=16):
+        self.root = root
+        self.network = network
+        self.robot = robot
+        self.on_pose = on_pose
+        self.on_error = on_error
+
+        self.fast_ms = fast_ms
+        self.idle_ms = idle_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.settle_s = settle_s  # stay fast this long after the robot last moved
+        self.longpoll_wait_ms = longpoll_wait_ms
+        self.frame_ms = frame_ms
+
+        self.running = False
+        self.busy = False
+        self.longpoll = False
+        self.failures = 0
+
+        self.job = None
+        self.timer_id = None
+        self.redraw_id = None
+
+        # Stale response detection
+        self.sent_seq = 0
+        self.applied_seq = 0
+        self.version = None
+
+        self.last_pose = None
+        self.last_motion = 0.0
+        self.pending_pose = None
+
+        self.stats = {"received": 0, "dropped": 0, "drawn": 0, "errors": 0, "restarts": 0}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.failures = 0
+        self.longpoll = None  # undecided until the robot has answered once
+        self.version = None  # the robot may have restarted while we weren't looking
+        self._schedule(0)
+
+    def stop(self):
+        self.running = False
+        if self.timer_id:
+            self.root.after_cancel(self.timer_id)
+            self.timer_id = None
+        if self.job:
+            self.job.cancel()
+            self.job = None
+
+    def set_busy(self, busy):
+        """Poll fast while commands are going out to the robot"""
+        self.busy = busy
+        if busy and self.running and self.timer_id:
+            # Don't wait out a long idle interval
+            self.root.after_cancel(self.timer_id)
+            self._schedule(0)
+
+    def interval_ms(self):
+        """Delay before the next poll"""
+        moving = time.monotonic() - self.last_motion < self.settle_s
+        interval = self.fast_ms if self.busy or moving else self.idle_ms
+        if self.failures:
+            interval = min(interval * 2 ** self.failures, self.max_backoff_ms)
+        return interval
+
+    def _schedule(self, delay_ms):
+        if self.running:
+            self.timer_id = self.root.after(int(delay_ms), self._tick)
+
+    def _tick(self):
+        self.timer_id = None
+        if not self.running:
+            return
+
+        # Only one request out at a time
+        if self.job and not self.job.done:
+            self._schedule(self.interval_ms())
+            return
+
+        self.sent_seq += 1
+        self.job = self.network.submit(
+            self._fetch, self.sent_seq, self.version if self.longpoll else None, self.longpoll,
+            on_done=self._on_result,
+            on_error=self._on_error
+        )
+        if self.job is None:
+            # Worker queue full, try again later
+            self._schedule(self.interval_ms())
+
+    def _fetch(self, job, seq, since, longpoll):
+        """Worker thread: returns (seq, x, y, version, longpoll).
+        Whether to long-poll is asked once the robot has answered a plain
+        poll - asking first would cost a capability request per poll while
+        it is down. longpoll stays None when that check fails too"""
+        if since is not None:
+            x, y, version = self.robot.read_pose(since, self.longpoll_wait_ms)
+        else:
+            x, y, version = self.robot.read_pose()
+        if longpoll is None:
+            supported = self.robot.supports_pose_longpoll()
+            longpoll = supported if self.robot.capabilities is not None else None
+        return seq, x, y, version, longpoll
+
+    def _on_result(self, result):
+        seq, x, y, version, longpoll = result
+        self.job = None
+        self.failures = 0
+        self.longpoll = longpoll
+        self.stats["received"] += 1
+
+        # Only one request is out at a time, so an older version in answer
+        # to a newer request means the robot restarted and counts from 0 again
+        if seq <= self.applied_seq:
+            self.stats["dropped"] += 1
+        else:
+            if version is not None and self.version is not None and version < self.version:
+                self.stats["restarts"] += 1
+            self.applied_seq = seq
+            if version is not None:
+                self.version = version
+            self._apply(x, y)
+
+        # A long-poll returns when there is news, so ask again straight away
+        self._schedule(0 if self.longpoll else self.interval_ms())
+
+    def _on_error(self, e):
+        self.job = None
+        self.stats["errors"] += 1
+
+        if error_kind(e) in ("timeout", "connection"):
+            self.failures += 1
+        else:
+            self.failures = max(self.failures, 1)
+
+        # Only report the first error of a streak
+        if self.failures == 1 and self.on_error:
+            self.on_error(e)
+
+        self._schedule(self.interval_ms())
+
+    def _apply(self, x, y):
+        if self.last_pose is None or abs(x - self.last_pose[0]) > 1e-3 or abs(y - self.last_pose[1]) > 1e-3:
+            self.last_motion = time.monotonic()
+        self.last_pose = (x, y)
+
+        # Keep only the newest pose until the next frame
+        self.pending_pose = (x, y)
+        if self.redraw_id is None:
+            self.redraw_id = self.root.after(self.frame_ms, self._redraw)
+
+    def _redraw(self):
+        self.redraw_id = None
+        if self.pending_pose is None:
+            return
+        x, y = self.pending_pose
+        self.pending_pose = None
+        self.stats["drawn"] += 1
+        self.on_pose(x, y)
@@ -0,0 +1,160 @@
+from array import array
+import bisect
+import csv
+import math
+import time
+
+class PoseHistory:
+    """Fixed-capacity ring buffer of timestamped pose samples.
+    Samples live in flat float arrays (time, x, y, heading), so appending is
+    amortized O(1). The arrays start small and double as samples arrive, up
+    to 32 bytes per sample of capacity - about 9 MB for the default four
+    hours. Once full, the oldest samples are overwritten"""
+
+    def __init__(self, capacity=20 * 60 * 60 * 4, initial=1024):  # four hours at 20 Hz
+        self.capacity = capacity
+        size = min(initial, capacity)
+        self.t = array("d", [0.0]) * size
+        self.x = array("d", [0.0]) * size
+        self.y = array("d", [0.0]) * size
+        self.heading = array("d", [0.0]) * size
+        self.start = 0  # index of the oldest sample
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x, y, heading=None, t=None):
+        """Add a sample. Without a heading, the direction of travel since the
+        previous sample is used (degrees, 90 is +Y like the turn commands)"""
+        if t is None:
+            t = time.time()
+        if heading is None:
+            heading = self._travel_heading(x, y)
+
+        if self.count == len(self.t) < self.capacity:
+            self._grow()
+        i = (self.start + self.count) % self.capacity
+        self.t[i] = t
+        self.x[i] = x
+        self.y[i] = y
+        self.heading[i] = heading
+
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def _grow(self):
+        """Double the arrays, up to capacity. Only happens before the buffer
+        first wraps, so the samples are still in order from index 0"""
+        extra = min(len(self.t), self.capacity - len(self.t))
+        for column in (self.t, self.x, self.y, self.heading):
+            column.extend(array("d", [0.0]) * extra)
+
+    def _travel_heading(self, x, y):
+        last = self.last()
+        if last is None:
+            return 90.0
+        _, last_x, last_y, last_heading = last
+        if abs(x - last_x) < 1e-6 and abs(y - last_y) < 1e-6:
+            return last_heading
+        return math.degrees(math.atan2(y - last_y, x - last_x))
+
+    def last(self):
+        """Newest sample as (t, x, y, heading), or None"""
+        if not self.count:
+            return None
+        i = (self.start + self.count - 1) % self.capacity
+        return self.t[i], self.x[i], self.y[i], self.heading[i]
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+
+    def _ordered(self, column):
+        """Copy of one column, oldest sample first"""
+        end = self.start + self.count
+        if end <= self.capacity:
+            return column[self.start:end]
+        return column[self.start:] + column[:end - self.capacity]
+
+    def as_arrays(self):
+        """Export (t, x, y, heading) as float arrays, oldest first"""
+        return (self._ordered(self.t), self._ordered(self.x),
+                self._ordered(self.y), self._ordered(self.heading))
+
+    def __iter__(self):
+        """Iterate samples as (t, x, y, heading), oldest first"""
+        for n in range(self.count):
+            i = (self.start + n) % self.capacity
+            yield self.t[i], self.x[i], self.y[i], self.heading[i]
+
+    def export_csv(self, path):
+        """Write the history to a CSV file for post-run analysis"""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["t", "x", "y", "heading"])
+            writer.writerows(self)
+
+    def decimated(self, min_distance=0.05, tolerance=0.02, since=None, max_points=None):
+        """The path as a short list of (x, y) points for drawing.
+        Drops samples closer than min_distance to the last kept one, then
+        simplifies what's left with Douglas-Peucker. Only samples from time
+        `since` on are used when given. With max_points the tolerance is
+        doubled until no more than that many points remain"""
+        t, xs, ys, _ = self.as_arrays()
+        first = bisect.bisect_left(t, since) if since is not None else 0
+
+        points = []
+        last_x = last_y = math.inf
+        min_squared = min_distance * min_distance
+        for x, y in zip(xs[first:], ys[first:]):
+            if (x - last_x) ** 2 + (y - last_y) ** 2 >= min_squared:
+                points.append((x, y))
+                last_x, last_y = x, y
+
+        points = douglas_peucker(points, tolerance)
+        while max_points is not None and len(points) > max(max_points, 2):
+            tolerance *= 2
+            points = douglas_peucker(points, tolerance)
+        return points
+
+
+def douglas_peucker(points, tolerance):
+    """Simplify a polyline, keeping every point further than `tolerance`
+    from the simplified line. Iterative, so long paths don't hit the
+    recursion limit"""
+    if len(points) < 3:
+        return list(points)
+
+    keep = bytearray(len(points))
+    keep[0] = keep[-1] = 1
+    stack = [(0, len(points) - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        x2, y2 = points[last]
+        dx = x2 - x1
+        dy = y2 - y1
+        length = math.hypot(dx, dy)
+
+        max_dist = 0.0
+        max_index = first
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if length:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / length
+            else:
+                dist = math.hypot(px - x1, py - y1)
+            if dist > max_dist:
+                max_dist = dist
+                max_index = i
+
+        if max_dist > tolerance:
+            keep[max_index] = 1
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+
+    return [p for p, k in zip(points, keep) if k]
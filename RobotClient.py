@@ -0,0 +1,219 @@
+import WireFormat
+
+# requests is imported on first use - it is slow to import and the GUI
+# should be on screen before anything touches the network
+
+# Per-endpoint (connect, read) timeouts in seconds
+DEFAULT_TIMEOUTS = {
+    "path": (2.0, 5.0),
+    "pose": (1.0, 2.0),
+    "capabilities": (1.0, 2.0),
+}
+
+ENDPOINTS = {
+    "path": "/api/path",
+    "pose": "/api/pose",
+    "capabilities": "/api/capabilities",
+}
+
+class RobotError(Exception):
+    """The robot answered, but not with what we expected"""
+    pass
+
+def error_kind(e):
+    """Classify a request failure as "timeout", "connection", "robot" or "other" """
+    if isinstance(e, RobotError):
+        return "robot"
+    import requests
+    if isinstance(e, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return "connection"
+    return "other"
+
+class RobotClient:
+    """Shared HTTP client for one robot car.
+    Keeps a pooled keep-alive session so repeated requests reuse the same
+    TCP connection instead of paying a handshake per command"""
+
+    def __init__(self, base_url, pool_size=4, retries=2, backoff=0.2, timeouts=None, wire_format="auto"):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        # Capabilities are negotiated once per robot
+        self.capabilities = None
+        self.batch_supported = None
+        self.max_batch = 0
+
+        # "auto" uses the binary wire format when the robot supports it,
+        # "json" never does, "binary" skips asking (for benchmarks)
+        self.wire_format = wire_format
+        self.binary_supported = {"json": False, "binary": True}.get(wire_format)
+
+        self._session = None
+
+    @property
+    def session(self):
+        """The pooled session, created (and requests imported) on first use"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            # GETs are retried on any failure, POSTs only when the connection never
+            # opened - a retried move that already reached the robot would run twice
+            retry = Retry(
+                total=self.retries,
+                connect=self.retries,
+                read=self.retries,
+                status=self.retries,
+                backoff_factor=self.backoff,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def url(self, endpoint):
+        """Full URL for a named endpoint"""
+        return self.base_url + ENDPOINTS[endpoint]
+
+    def get(self, endpoint, params=None, extra_wait=0.0):
+        connect, read = self.timeouts[endpoint]
+        headers = None if self.wire_format == "json" else {"Accept": WireFormat.BINARY_TYPE}
+        return self.session.get(self.url(endpoint), params=params, headers=headers,
+                                timeout=(connect, read + extra_wait))
+
+    def post(self, endpoint, payload):
+        """POST a JSON payload, or an already encoded binary body"""
+        if isinstance(payload, bytes):
+            headers = {"Content-Type": WireFormat.BINARY_TYPE}
+            return self.session.post(self.url(endpoint), data=payload, headers=headers,
+                                     timeout=self.timeouts[endpoint])
+        return self.session.post(self.url(endpoint), json=payload, timeout=self.timeouts[endpoint])
+
+    def decode(self, response):
+        """A response body as a dict, whichever format the robot answered in"""
+        if WireFormat.is_binary(response):
+            return WireFormat.decode_ack(response.content)
+        return response.json()
+
+    def get_pose(self, since=None, wait_ms=0):
+        """Request the robot's current pose.
+        With since/wait_ms the robot holds the request until it has a pose
+        newer than version `since` (long-poll)"""
+        if since is None:
+            return self.get("pose")
+        params = {"since": since, "wait": wait_ms}
+        return self.get("pose", params=params, extra_wait=wait_ms / 1000)
+
+    def read_pose(self, since=None, wait_ms=0):
+        """Request and parse the pose, returns (x, y, version).
+        version is None for robots that don't number their poses"""
+        response = self.get_pose(since, wait_ms)
+
+        if response.status_code != 200:
+            raise RobotError(f"Failed to get pose: {response.status_code}")
+
+        if WireFormat.is_binary(response):
+            try:
+                return WireFormat.decode_pose(response.content)
+            except ValueError as e:
+                raise RobotError(f"Invalid pose data: {e}") from None
+
+        data = response.json()
+
+        # Parse response format: {"H":"...", "pose":{"x":..., "y":...}, "v":...}
+        if "pose" not in data:
+            raise RobotError("Invalid pose data format")
+
+        return float(data["pose"]["x"]), float(data["pose"]["y"]), data.get("v")
+
+    def post_commands(self, payload):
+        """Send one command dict, or a list of commands when batching.
+        Goes out in the binary format when the robot takes it"""
+        if self.supports_binary():
+            try:
+                body = WireFormat.encode_commands(payload)
+            except ValueError:
+                body = None  # ids the binary format can't carry - send this one as JSON
+            if body is not None:
+                response = self.post("path", body)
+                if response.status_code != 415:
+                    return response
+                print("Robot rejected the binary format, using JSON")
+                self.binary_supported = False
+        return self.post("path", payload)
+
+    def get_capabilities(self):
+        """Ask the robot which optional features it supports.
+        The answer is cached, robots without the endpoint report none"""
+        if self.capabilities is not None:
+            return self.capabilities
+
+        try:
+            response = self.get("capabilities")
+            # Older firmware has no capabilities endpoint
+            self.capabilities = response.json() if response.status_code == 200 else {}
+        except Exception as e:
+            # Don't cache - the robot may just not be reachable yet
+            print(f"Capability check failed: {e}")
+            return {}
+
+        print(f"Robot capabilities: {self.capabilities or 'none'}")
+        return self.capabilities
+
+    def supports_batch(self):
+        """Whether the robot accepts batched command uploads"""
+        if self.batch_supported is None:
+            capabilities = self.get_capabilities()
+            if self.capabilities is None:
+                return False
+            self.batch_supported = bool(capabilities.get("batch", False))
+            self.max_batch = int(capabilities.get("max_batch", 0))
+        return self.batch_supported
+
+    def supports_binary(self):
+        """Whether commands go out in the compact binary wire format"""
+        if self.binary_supported is None:
+            capabilities = self.get_capabilities()
+            if self.capabilities is None:
+                return False
+            self.binary_supported = capabilities.get("binary") == 1
+        return self.binary_supported
+
+    def pipeline_window(self):
+        """How many unacknowledged commands the robot will buffer for a
+        pipelined upload, 0 when it only takes them one at a time"""
+        return int(self.get_capabilities().get("window", 0))
+
+    def supports_pose_longpoll(self):
+        """Whether /api/pose can hold a request until the pose changes"""
+        return bool(self.get_capabilities().get("pose_longpoll", False))
+
+    def warm_up(self):
+        """Import requests and build the session ahead of the first request"""
+        return self.session is not None
+
+    def close(self):
+        """Close all pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
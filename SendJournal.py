@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+
+# The upload in progress is checkpointed here, so it survives a crash
+JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "robot-car-pathing", "journal")
+
+def journal_path(robot):
+    """Journal file for one robot's uploads"""
+    key = hashlib.sha1(robot.encode()).hexdigest()[:12]
+    return os.path.join(JOURNAL_DIR, f"send-{key}.jsonl")
+
+class Checkpoint:
+    """A path that was not completely uploaded, as read back from the journal"""
+
+    def __init__(self, header, acked):
+        self.robot = header["robot"]
+        self.upload = header["upload"]
+        self.commands = header["commands"]  # wire dicts, as sent
+        self.blocks = header["blocks"]  # sent id -> ids of the blocks it stands for
+        self.source = header["source"]  # the command list as the operator built it
+        self.acked = acked  # ids of the sent commands the robot acknowledged
+
+    @property
+    def remaining(self):
+        return len(self.commands) - len(self.acked)
+
+    def first_pending(self):
+        """Position of the first command the robot hasn't acknowledged"""
+        for i, command in enumerate(self.commands):
+            if command["id"] not in self.acked:
+                return i
+        return len(self.commands)
+
+    def matches(self, robot, commands):
+        """Whether this checkpoint is for sending `commands` to `robot`"""
+        return self.robot == robot and self.commands == commands
+
+
+class SendJournal:
+    """Append-only log of one upload.
+    The first line holds the path being sent, each following line lists ids
+    the robot acknowledged. Appending a line per progress update is cheap
+    and a torn last line (from a crash mid-write) is simply ignored.
+    The file is removed once the whole path is delivered"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def start(self, robot, upload, commands, blocks, source):
+        """Begin a new upload, replacing any older checkpoint"""
+        self.close()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        header = {"robot": robot, "upload": upload, "commands": commands, "blocks": blocks, "source": source}
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(json.dumps(header) + "\n")
+        self._file.flush()
+
+    def resume(self):
+        """Keep appending to the existing journal"""
+        self.close()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, command_ids):
+        """Checkpoint commands the robot acknowledged"""
+        if self._file and command_ids:
+            self._file.write(json.dumps({"acked": list(command_ids)}) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """The path was delivered, nothing left to resume"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def load(self):
+        """The unfinished upload in the journal, or None"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+
+        acked = set()
+        for line in lines[1:]:
+            try:
+                acked.update(json.loads(line)["acked"])
+            except (ValueError, KeyError):
+                break  # torn write from a crash, everything before it is good
+
+        checkpoint = Checkpoint(header, acked)
+        return checkpoint if checkpoint.remaining else None
@@ -0,0 +1,78 @@
+from PIL import Image, ImageTk
+from io import BytesIO
+import hashlib
+import os
+
+# Rendered PNGs are kept here between launches
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "robot-car-pathing", "sprites")
+
+def load_svg_image(svg_path, width, height, cache_dir=CACHE_DIR):
+    """Rasterize an SVG to a PIL image, reusing an earlier render if possible.
+    Renders are cached on disk keyed by the SVG's content hash and size, so
+    cairosvg only runs the first time (or after the SVG changes).
+    Returns None when there is no cached render and cairosvg isn't installed"""
+    with open(svg_path, "rb") as f:
+        svg_data = f.read()
+
+    key = hashlib.sha1(svg_data).hexdigest()[:16]
+    png_path = os.path.join(cache_dir, f"{key}_{width}x{height}.png")
+
+    if os.path.exists(png_path):
+        try:
+            image = Image.open(png_path)
+            image.load()
+            return image
+        except OSError:
+            pass  # Corrupt cache file, render again
+
+    try:
+        import cairosvg
+    except ImportError:
+        return None
+
+    png_data = cairosvg.svg2png(bytestring=svg_data, output_width=width, output_height=height)
+    image = Image.open(BytesIO(png_data))
+    image.load()
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so a crash never leaves half a PNG behind
+        tmp_path = png_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png_data)
+        os.replace(tmp_path, png_path)
+    except OSError as e:
+        print(f"Could not cache sprite: {e}")
+
+    return image
+
+
+class RotatedSprites:
+    """PhotoImages of one sprite, pre-rotated at fixed heading steps.
+    Each rotation is made once on first use and kept, so drawing the robot
+    at a heading is a dictionary lookup. The sprite should point along
+    heading 90 (up the canvas, matching "90° is straight ahead")"""
+
+    def __init__(self, image, step=5):
+        self.image = image.convert("RGBA")
+        self.step = step
+        self.photos = {}
+
+    def bucket(self, heading):
+        """Snap a heading in degrees to the nearest cached step"""
+        return int(round(heading / self.step) * self.step) % 360
+
+    def get(self, heading):
+        bucket = self.bucket(heading)
+        photo = self.photos.get(bucket)
+        if photo is None:
+            # PIL rotates counter-clockwise, same as heading
+            rotated = self.image.rotate(bucket - 90, resample=Image.BICUBIC, expand=True)
+            photo = ImageTk.PhotoImage(rotated)
+            self.photos[bucket] = photo
+        return photo
+
+    def prerender(self):
+        """Fill the cache for every heading step up front"""
+        for heading in range(0, 360, self.step):
+            self.get(heading)
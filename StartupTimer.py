@@ -0,0 +1,29 @@
+import sys
+import time
+
+# Startup budget mode: run with --profile-startup to print where launch time goes
+enabled = "--profile-startup" in sys.argv
+budget_ms = 1000  # warn when the first frame takes longer than this
+
+_start = time.perf_counter()
+_marks = []
+
+def mark(label):
+    """Record that a startup step just finished"""
+    _marks.append((label, time.perf_counter()))
+
+def elapsed_ms():
+    return (time.perf_counter() - _start) * 1000
+
+def report():
+    """Print the time taken by each step and the running total"""
+    print("Startup timing:")
+    previous = _start
+    for label, at in _marks:
+        print(f"  {label:<32} {(at - previous) * 1000:8.1f} ms  {(at - _start) * 1000:8.1f} ms total")
+        previous = at
+
+    if _marks:
+        total = (_marks[-1][1] - _start) * 1000
+        if total > budget_ms:
+            print(f"⚠️  Startup took {total:.0f} ms, over the {budget_ms} ms budget")
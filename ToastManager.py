@@ -0,0 +1,158 @@
+import customtkinter
+import time
+
+# Color schemes for the toast types
+TOAST_COLORS = {
+    "error": {"bg": ("#ff6b6b", "#c92a2a"), "text": "#ffffff"},
+    "success": {"bg": ("#51cf66", "#2f9e44"), "text": "#ffffff"},
+    "info": {"bg": ("#3b8ed0", "#1f6aa5"), "text": "#ffffff"},
+    "warning": {"bg": ("#ffa94d", "#fd7e14"), "text": "#000000"}
+}
+
+HIDDEN_Y = 100  # below the bottom edge of the window
+SHOWN_Y = -20
+
+class ToastManager:
+    """Toast notifications through one reusable widget.
+    Messages wait in a queue and are shown one after another; while others
+    are waiting each is shown for less time. A message with the same key
+    as one already showing or queued replaces it instead of queueing
+    ("Sent 40/80" then "Sent 41/80"), and exact repeats are counted
+    ("Cannot connect to robot (×3)"). All animation runs from a single
+    frame timer that stops while nothing is on screen, so a burst of
+    toasts costs no more than one"""
+
+    def __init__(self, root, display_ms=1000, min_display_ms=400, max_queue=5,
+                 frame_ms=16, slide_ms=150):
+        self.root = root
+        self.display_ms = display_ms
+        self.min_display_ms = min_display_ms  # when more messages are waiting
+        self.max_queue = max_queue
+        self.frame_ms = frame_ms
+        self.slide_ms = slide_ms
+
+        # Each toast: {"message", "type", "key", "count"}
+        self.queue = []
+        self.current = None
+        self.state = "hidden"  # hidden -> in -> shown -> out -> hidden
+        self.state_since = 0.0
+        self.y = HIDDEN_Y
+        self.timer_id = None
+        self.shown_type = None
+
+        self.frame = customtkinter.CTkFrame(root, corner_radius=8, border_width=0)
+        self.label = customtkinter.CTkLabel(self.frame, text="", font=("Arial", 12, "bold"))
+        self.label.pack(padx=20, pady=12)
+
+    @property
+    def showing(self):
+        return self.state != "hidden"
+
+    def show(self, message, toast_type="error", key=None):
+        """Queue a toast. Toasts with the same key replace each other"""
+        toast = {"message": message, "type": toast_type, "key": key, "count": 1}
+
+        if self._coalesce(toast):
+            return
+
+        self.queue.append(toast)
+        if len(self.queue) > self.max_queue:
+            # Falling behind - drop the oldest waiting message, errors last
+            dropped = next((i for i, waiting in enumerate(self.queue) if waiting["type"] != "error"), 0)
+            self.queue.pop(dropped)
+
+        if self.state == "hidden":
+            self._next()
+
+    def _same(self, a, b):
+        if a["key"] is not None or b["key"] is not None:
+            return a["key"] == b["key"]
+        return a["message"] == b["message"] and a["type"] == b["type"]
+
+    def _coalesce(self, toast):
+        """Merge into the showing or a waiting toast, True if it was"""
+        if self.current and self.state in ("in", "shown") and self._same(self.current, toast):
+            self._merge(self.current, toast)
+            self._draw()
+            if self.state == "shown":
+                self.state_since = time.monotonic()  # show the update for a full period
+            return True
+        for waiting in self.queue:
+            if self._same(waiting, toast):
+                self._merge(waiting, toast)
+                return True
+        return False
+
+    def _merge(self, into, toast):
+        if toast["key"] is not None:
+            into["message"] = toast["message"]
+        else:
+            into["count"] += 1
+        into["type"] = toast["type"]
+
+    def _next(self):
+        """Put the next queued toast on the widget"""
+        self.current = self.queue.pop(0)
+        self._draw()
+        if self.state == "hidden":
+            self._set_state("in")
+            self.frame.lift()
+            self._schedule()
+        else:
+            # Already on screen - swap the text in place
+            self._set_state("shown")
+
+    def _draw(self):
+        toast = self.current
+        text = toast["message"] if toast["count"] == 1 else f"{toast['message']} (×{toast['count']})"
+        self.label.configure(text=text)
+        if toast["type"] != self.shown_type:
+            colors = TOAST_COLORS.get(toast["type"], TOAST_COLORS["error"])
+            self.frame.configure(fg_color=colors["bg"])
+            self.label.configure(text_color=colors["text"])
+            self.shown_type = toast["type"]
+
+    def _set_state(self, state):
+        self.state = state
+        self.state_since = time.monotonic()
+
+    def _schedule(self):
+        if self.timer_id is None:
+            self.timer_id = self.root.after(self.frame_ms, self._tick)
+
+    def _place(self, y):
+        y = round(y)
+        if y != self.y:
+            self.y = y
+            self.frame.place(relx=0.5, rely=1.0, y=y, anchor="s")
+
+    def _tick(self):
+        """The one frame timer - slides, holds and swaps the toast"""
+        self.timer_id = None
+        elapsed_ms = (time.monotonic() - self.state_since) * 1000
+        progress = min(1.0, elapsed_ms / self.slide_ms)
+
+        if self.state == "in":
+            self._place(HIDDEN_Y + (SHOWN_Y - HIDDEN_Y) * progress)
+            if progress >= 1.0:
+                self._set_state("shown")
+        elif self.state == "shown":
+            hold_ms = self.min_display_ms if self.queue else self.display_ms
+            if elapsed_ms >= hold_ms:
+                if self.queue:
+                    self._next()
+                else:
+                    self._set_state("out")
+        elif self.state == "out":
+            self._place(SHOWN_Y + (HIDDEN_Y - SHOWN_Y) * progress)
+            if progress >= 1.0:
+                self.frame.place_forget()
+                self.y = HIDDEN_Y
+                self.current = None
+                self.state = "hidden"
+                if self.queue:
+                    self._next()
+                return
+
+        if self.state != "hidden":
+            self._schedule()
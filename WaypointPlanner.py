@@ -0,0 +1,545 @@
+from array import array
+from collections import deque
+import heapq
+import math
+import time
+
+SQRT2 = math.sqrt(2)
+# Nodes of the coarse graph are coarse cell * COMPONENTS + component, so a
+# coarse cell may hold up to 255 components - enough for factor 16
+COMPONENT_BITS = 8
+COMPONENTS = 1 << COMPONENT_BITS
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+class NoRouteError(ValueError):
+    """No obstacle-free route between two points"""
+    pass
+
+
+class OccupancyGrid:
+    """Obstacle map for route planning, one byte per cell in a flat
+    bytearray. The array has a blocked border one cell wide, so the search
+    never has to bounds-check a neighbour: cell (column, row) lives at
+    (row + 1) * stride + column + 1, row 0 at the bottom.
+
+    World coordinates are meters, like poses; cell (0, 0) has its lower
+    left corner at (origin_x, origin_y).
+
+    The grid is also split into coarse cells of factor x factor (at most
+    16). Each knows its connected pieces of free space ("components",
+    numbered in `labels`) and which components of the neighbouring coarse
+    cells they touch, in `links`; a node of that graph is coarse cell *
+    COMPONENTS + component. The graph is exact - a chain of components can
+    always be driven cell by cell - and a 500 x 500 grid has about a
+    thousand coarse cells, so routes are searched there. fill() and paint()
+    keep it up to date, relabelling only the coarse cells they touch"""
+
+    def __init__(self, width=500, height=500, cell_size=0.032, origin_x=-8.0, origin_y=-8.0, coarse_factor=16):
+        self.width = width
+        self.height = height
+        self.stride = width + 2
+        self.cell_size = cell_size
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.coarse_factor = coarse_factor
+        self.coarse_width = -(-width // coarse_factor)
+        self.coarse_height = -(-height // coarse_factor)
+        self.clear()
+
+    def clear(self):
+        """Remove every obstacle"""
+        self.cells = bytearray(self.stride * (self.height + 2))
+        self.cells[:self.stride] = b"\x01" * self.stride
+        self.cells[-self.stride:] = b"\x01" * self.stride
+        self.cells[self.stride - 1::self.stride] = b"\x01" * (self.height + 2)
+        self.cells[::self.stride] = b"\x01" * (self.height + 2)
+
+        # Every coarse cell is one free component, and the border none
+        size = self.coarse_width * self.coarse_height
+        self.labels = bytearray(len(self.cells))
+        for row in range(self.height):
+            start = self.index(0, row)
+            self.labels[start:start + self.width] = b"\x01" * self.width
+        self.blocked_counts = array("H", bytes(2 * size))
+        # coarse cell -> [(label here, neighbour node)], None on open ground all round
+        self.links = [None] * size
+        self.dirty = set()  # coarse cells filled since they were labelled
+
+    def index(self, column, row):
+        return (row + 1) * self.stride + column + 1
+
+    def cell_of(self, x, y):
+        """(column, row) of the cell containing a world point, None outside the grid"""
+        column = math.floor((x - self.origin_x) / self.cell_size)
+        row = math.floor((y - self.origin_y) / self.cell_size)
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return column, row
+        return None
+
+    def center_of(self, column, row):
+        """World coordinates of a cell's center"""
+        return (self.origin_x + (column + 0.5) * self.cell_size,
+                self.origin_y + (row + 0.5) * self.cell_size)
+
+    def blocked(self, column, row):
+        return self.cells[self.index(column, row)] == 1
+
+    def fill(self, column0, row0, column1, row1, blocked=True):
+        """Mark a rectangle of cells (inclusive, clipped to the grid)"""
+        column0, column1 = max(0, min(column0, column1)), min(self.width - 1, max(column0, column1))
+        row0, row1 = max(0, min(row0, row1)), min(self.height - 1, max(row0, row1))
+        if column0 > column1 or row0 > row1:
+            return
+        value = 1 if blocked else 0
+        change = 1 if blocked else -1
+        cells = self.cells
+        factor = self.coarse_factor
+        for row in range(row0, row1 + 1):
+            start = self.index(column0, row)
+            coarse_row = row // factor * self.coarse_width
+            # Only cells that actually change count
+            for column in range(column0, column1 + 1):
+                if cells[start + column - column0] != value:
+                    k = coarse_row + column // factor
+                    self.blocked_counts[k] += change
+                    self.dirty.add(k)
+            cells[start:start + column1 - column0 + 1] = bytes([value]) * (column1 - column0 + 1)
+        self.refresh()
+
+    def paint(self, x, y, radius, blocked=True):
+        """Mark the cells within `radius` meters of a world point (a square brush)"""
+        reach = int(radius / self.cell_size)
+        column = math.floor((x - self.origin_x) / self.cell_size)
+        row = math.floor((y - self.origin_y) / self.cell_size)
+        self.fill(column - reach, row - reach, column + reach, row + reach, blocked)
+
+    # ----- coarse graph -----
+
+    def coarse_cell(self, column, row):
+        """Number of the coarse cell a cell is in"""
+        return row // self.coarse_factor * self.coarse_width + column // self.coarse_factor
+
+    def node(self, column, row):
+        """Coarse graph node of a free cell: its coarse cell and component"""
+        return self.coarse_cell(column, row) * COMPONENTS + self.labels[self.index(column, row)]
+
+    def cell_ranges(self, k):
+        """(columns, rows) of the cells in coarse cell k - the last row and
+        column of coarse cells may hang over the grid's edge"""
+        factor = self.coarse_factor
+        coarse_row, coarse_column = divmod(k, self.coarse_width)
+        return (range(coarse_column * factor, min(self.width, (coarse_column + 1) * factor)),
+                range(coarse_row * factor, min(self.height, (coarse_row + 1) * factor)))
+
+    def refresh(self):
+        """Relabel the coarse cells filled since the last refresh. Links
+        only depend on the labels along cell edges, so only cells whose edge
+        changed are relinked, with the cells beside them (a diagonal link
+        between two of those passes a corner of the changed cell) and the
+        links of the cells diagonal to them that lead into them"""
+        changed = set()
+        for k in self.dirty:
+            edge = self._edge(k)
+            self._label(k)
+            if self._edge(k) != edge:
+                changed.add(k)
+        self.dirty.clear()
+
+        width = self.coarse_width
+        relink = set(changed)
+        corners = []
+        for k in changed:
+            coarse_row, coarse_column = divmod(k, width)
+            for d_column, d_row in DIRECTIONS:
+                row, column = coarse_row + d_row, coarse_column + d_column
+                if 0 <= row < self.coarse_height and 0 <= column < width:
+                    if d_column and d_row:
+                        corners.append((row * width + column, k, -d_column, -d_row))
+                    else:
+                        relink.add(row * width + column)
+        for k in relink:
+            self.links[k] = self._link(k)
+        labels = self.labels
+        for other, k, d_column, d_row in corners:
+            if other not in relink:
+                links = [link for link in self.links_of(other) if link[1] >> COMPONENT_BITS != k]
+                links.extend({(labels[i], k * COMPONENTS + labels[j]) for i, j in self.crossings(other, d_column, d_row)})
+                self.links[other] = links
+
+    def links_of(self, k):
+        """[(component here, neighbour node)] for coarse cell k"""
+        links = self.links[k]
+        if links is None:
+            # Never near an obstacle - one component touching one in every cell around
+            width = self.coarse_width
+            coarse_row, coarse_column = divmod(k, width)
+            links = self.links[k] = [
+                (1, (row * width + column) * COMPONENTS + 1)
+                for row in range(max(0, coarse_row - 1), min(self.coarse_height, coarse_row + 2))
+                for column in range(max(0, coarse_column - 1), min(width, coarse_column + 2))
+                if row != coarse_row or column != coarse_column
+            ]
+        return links
+
+    def _edge(self, k):
+        """The labels around the edge of coarse cell k"""
+        labels = self.labels
+        columns, rows = self.cell_ranges(k)
+        bottom = self.index(columns[0], rows[0])
+        top = self.index(columns[0], rows[-1])
+        return (labels[bottom:bottom + len(columns)] + labels[top:top + len(columns)]
+                + labels[bottom:top + 1:self.stride] + labels[bottom + len(columns) - 1:top + len(columns):self.stride])
+
+    def _label(self, k):
+        """Number the connected pieces of free space in one coarse cell, with
+        the same moves as the search: 8-connected, no cutting corners"""
+        cells, labels, stride = self.cells, self.labels, self.stride
+        columns, rows = self.cell_ranges(k)
+        if self.blocked_counts[k] in (0, len(columns) * len(rows)):
+            # All free or all blocked - the usual case, no flood needed
+            value = b"\x00" if self.blocked_counts[k] else b"\x01"
+            for row in rows:
+                start = self.index(columns[0], row)
+                labels[start:start + len(columns)] = value * len(columns)
+            return
+
+        # Flood a copy of the cell with its own blocked border, then copy the labels back
+        width = len(columns) + 2
+        local = bytearray(b"\x01") * (width * (len(rows) + 2))
+        for offset, row in enumerate(rows, 1):
+            start = self.index(columns[0], row)
+            local[offset * width + 1:offset * width + width - 1] = cells[start:start + len(columns)]
+        found = bytearray(len(local))
+        straight = (1, -1, width, -width)
+        diagonal = ((width + 1, 1, width), (width - 1, -1, width), (1 - width, 1, -width), (-1 - width, -1, -width))
+        count = 0
+        for seed in range(len(local)):
+            if local[seed] or found[seed]:
+                continue
+            count += 1
+            found[seed] = count
+            stack = [seed]
+            while stack:
+                i = stack.pop()
+                for step in straight:
+                    j = i + step
+                    if not local[j] and not found[j]:
+                        found[j] = count
+                        stack.append(j)
+                for step, side_x, side_y in diagonal:
+                    j = i + step
+                    if not local[j] and not found[j] and not local[i + side_x] and not local[i + side_y]:
+                        found[j] = count
+                        stack.append(j)
+        for offset, row in enumerate(rows, 1):
+            start = self.index(columns[0], row)
+            labels[start:start + len(columns)] = found[offset * width + 1:offset * width + width - 1]
+
+    def crossings(self, k, d_column, d_row):
+        """(index here, index there) of every step from coarse cell k into
+        the one in direction (d_column, d_row) the robot can take. Diagonal
+        steps across a side add nothing - each comes with a straight one"""
+        labels, stride = self.labels, self.stride
+        columns, rows = self.cell_ranges(k)
+        step = d_column + d_row * stride
+        edge_column = columns[-1] if d_column > 0 else columns[0]
+        edge_row = rows[-1] if d_row > 0 else rows[0]
+        if d_column and d_row:
+            # Corner to corner, past two free side cells
+            i = self.index(edge_column, edge_row)
+            if labels[i] and labels[i + step] and labels[i + d_column] and labels[i + d_row * stride]:
+                return [(i, i + step)]
+            return []
+        edge = ([self.index(edge_column, row) for row in rows] if d_column else
+                [self.index(column, edge_row) for column in columns])
+        return [(i, i + step) for i in edge if labels[i] and labels[i + step]]
+
+    def _link(self, k):
+        """[(component here, neighbour node)] for coarse cell k - which
+        components of the cells around it each of its components touches"""
+        labels = self.labels
+        blocked_counts = self.blocked_counts
+        width = self.coarse_width
+        coarse_row, coarse_column = divmod(k, width)
+        found = set()
+        for d_column, d_row in DIRECTIONS:
+            row, column = coarse_row + d_row, coarse_column + d_column
+            if not (0 <= row < self.coarse_height and 0 <= column < width):
+                continue
+            other = row * width + column
+            if not (d_column and d_row) and not blocked_counts[k] and not blocked_counts[other]:
+                found.add((1, other * COMPONENTS + 1))  # open ground on both sides
+                continue
+            for i, j in self.crossings(k, d_column, d_row):
+                found.add((labels[i], other * COMPONENTS + labels[j]))
+        return list(found)
+
+    def line_of_sight(self, start, end):
+        """Whether the straight segment between two cell centers crosses no
+        blocked cell - every cell the segment touches is checked"""
+        cells = self.cells
+        stride = self.stride
+        (column0, row0), (column1, row1) = start, end
+        dx = abs(column1 - column0)
+        dy = abs(row1 - row0)
+        step_x = 1 if column1 > column0 else -1
+        step_y = stride if row1 > row0 else -stride
+        index = self.index(column0, row0)
+        end_index = self.index(column1, row1)
+        error = dx - dy
+        for _ in range(dx + dy):
+            if cells[index]:
+                return False
+            e2 = 2 * error
+            if -dy < e2 < dx:
+                # Passes exactly through a corner - both side cells count
+                if cells[index + step_x] or cells[index + step_y]:
+                    return False
+                error += dx - dy
+                index += step_x + step_y
+            elif e2 > -dy:
+                error -= dy
+                index += step_x
+            else:
+                error += dx
+                index += step_y
+            if index == end_index:
+                break
+        return not cells[index]
+
+
+def straighten(grid, points):
+    """String-pull a chain of cells: skip every point the robot can drive
+    past in a straight line, so the route has as few turns as the
+    obstacles allow"""
+    if len(points) < 3:
+        return list(points)
+    kept = [points[0]]
+    anchor = 0
+    while anchor < len(points) - 1:
+        # Gallop ahead while the points stay in sight, then narrow down - a
+        # long open stretch costs a few checks, not one per point
+        reach = anchor + 1
+        step = 1
+        while reach + step < len(points) and grid.line_of_sight(points[anchor], points[reach + step]):
+            reach += step
+            step *= 2
+        while step > 1:
+            step //= 2
+            if reach + step < len(points) and grid.line_of_sight(points[anchor], points[reach + step]):
+                reach += step
+        kept.append(points[reach])
+        anchor = reach
+    return kept
+
+
+def find_chain(grid, start, goal):
+    """A* over the coarse graph from the component holding start to the one
+    holding goal. Returns (nodes along the chain, number of nodes expanded);
+    NoRouteError when there is none, and then there is no route"""
+    links_of = grid.links_of
+    start_node = grid.node(*start)
+    goal_node = grid.node(*goal)
+    width = grid.coarse_width
+    goal_row, goal_column = divmod(goal_node >> COMPONENT_BITS, width)
+
+    # Flat arrays indexed by node, like the fine search used
+    size = grid.coarse_width * grid.coarse_height * COMPONENTS
+    g_score = array("d", [math.inf]) * size
+    parent = array("l", [-1]) * size
+    closed = bytearray(size)
+    g_score[start_node] = 0.0
+    octile = SQRT2 - 2
+    heap = [(0.0, 0.0, start_node)]
+    expanded = 0
+    push, pop = heapq.heappush, heapq.heappop
+    while heap:
+        _, negative_g, node = pop(heap)
+        if closed[node]:
+            continue
+        if node == goal_node:
+            break
+        closed[node] = 1
+        expanded += 1
+        g = -negative_g
+        k, label = node >> COMPONENT_BITS, node & (COMPONENTS - 1)
+        row, column = divmod(k, width)
+        for here, neighbour in links_of(k):
+            if here != label or closed[neighbour]:
+                continue
+            next_row, next_column = divmod(neighbour >> COMPONENT_BITS, width)
+            cost = g + (1.0 if next_row == row or next_column == column else SQRT2)
+            if cost < g_score[neighbour]:
+                g_score[neighbour] = cost
+                parent[neighbour] = node
+                dx = next_column - goal_column if next_column > goal_column else goal_column - next_column
+                dy = next_row - goal_row if next_row > goal_row else goal_row - next_row
+                push(heap, (cost + dx + dy + octile * (dx if dx < dy else dy), -cost, neighbour))
+    else:
+        raise NoRouteError("No route around the obstacles")
+
+    chain = []
+    node = goal_node
+    while node != -1:
+        chain.append(node)
+        node = parent[node]
+    chain.reverse()
+    return chain, expanded
+
+
+def _hop(grid, k, start, goal):
+    """Cell indices from start to goal inside coarse cell k (the same
+    component), breadth first - at most factor x factor cells"""
+    cells, stride = grid.cells, grid.stride
+    columns, rows = grid.cell_ranges(k)
+    inside = {grid.index(column, row) for row in rows for column in columns}
+    parent = {start: None}
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        if i == goal:
+            break
+        for step, side_x, side_y in ((1, 0, 0), (-1, 0, 0), (stride, 0, 0), (-stride, 0, 0),
+                                     (stride + 1, 1, stride), (stride - 1, -1, stride),
+                                     (1 - stride, 1, -stride), (-1 - stride, -1, -stride)):
+            j = i + step
+            if (j in inside and j not in parent and not cells[j]
+                    and not (side_x and (cells[i + side_x] or cells[i + side_y]))):
+                parent[j] = i
+                queue.append(j)
+    path = []
+    while goal is not None:
+        path.append(goal)
+        goal = parent[goal]
+    path.reverse()
+    return path
+
+
+def thread(grid, chain, start, goal):
+    """Cells from start to goal through the components of chain, each in
+    line of sight of the one before. Crosses into every next coarse cell at
+    the crossing nearest the last cell, and joins the crossings within a
+    cell by a straight line, or a walk inside the cell where there is none"""
+    stride = grid.stride
+    width = grid.coarse_width
+
+    def cell(i):
+        row, column = divmod(i, stride)
+        return column - 1, row - 1
+
+    points = [start]
+    last = grid.index(*start)
+
+    def reach(k, i):
+        if i == last:
+            return
+        if grid.line_of_sight(points[-1], cell(i)):
+            points.append(cell(i))
+        else:
+            points.extend(cell(j) for j in _hop(grid, k, last, i)[1:])
+
+    labels = grid.labels
+    for node, following in zip(chain, chain[1:]):
+        k, label = node >> COMPONENT_BITS, node & (COMPONENTS - 1)
+        row, column = divmod(k, width)
+        next_row, next_column = divmod(following >> COMPONENT_BITS, width)
+        x, y = points[-1]
+        here, there = min(((i, j) for i, j in grid.crossings(k, next_column - column, next_row - row)
+                           if labels[i] == label and labels[j] == following & (COMPONENTS - 1)),
+                          key=lambda crossing: (cell(crossing[0])[0] - x) ** 2 + (cell(crossing[0])[1] - y) ** 2)
+        reach(k, here)
+        points.append(cell(there))
+        last = there
+    reach(chain[-1] >> COMPONENT_BITS, grid.index(*goal))
+    return points
+
+
+def route_cells(grid, start, goal):
+    """The cells a route from start to goal turns at, both ends included.
+    Returns (cells, number of coarse nodes the search expanded).
+
+    The route is found on the coarse graph, which has a node per piece of
+    free space in a factor x factor block, then threaded through the chain
+    of blocks cell by cell and straightened. The fine grid is never
+    searched, so the time depends on the coarse map, not on how far a gap
+    is from the straight line"""
+    if grid.blocked(*start):
+        raise NoRouteError("The start is inside an obstacle")
+    if grid.blocked(*goal):
+        raise NoRouteError("The target is inside an obstacle")
+    if grid.line_of_sight(start, goal):
+        return [start, goal], 0
+    chain, expanded = find_chain(grid, start, goal)
+    return straighten(grid, thread(grid, chain, start, goal)), expanded
+
+
+def _normalize(delta):
+    """Heading change into (-180, 180]"""
+    delta = math.fmod(delta, 360.0)
+    if delta > 180.0:
+        delta -= 360.0
+    elif delta <= -180.0:
+        delta += 360.0
+    return delta
+
+
+class Route:
+    """A planned route: the commands that drive it, plus how it was found"""
+
+    def __init__(self, commands, points, expanded, seconds):
+        self.commands = commands  # [("move", meters) or ("turn", angle)]
+        self.points = points  # world (x, y) corners the robot drives through
+        self.expanded = expanded  # coarse nodes the search expanded, all legs together
+        self.seconds = seconds
+
+    def summary(self):
+        moves = sum(1 for cmd, _ in self.commands if cmd == "move")
+        return (f"Route of {moves} moves and {len(self.commands) - moves} turns, "
+                f"{self.expanded} map blocks searched in {self.seconds * 1000:.1f} ms")
+
+
+def plan_route(grid, start, waypoints, max_turn=90.0):
+    """Commands that drive from start = (x, y, heading) through every
+    waypoint (x, y) in order, around the grid's obstacles. Turns use the
+    robot's convention - angle 90 goes straight on, a turn changes the
+    heading by (angle - 90) - and are split into steps of at most
+    max_turn degrees. Raises NoRouteError when a waypoint can't be reached"""
+    began = time.perf_counter()
+    x, y, heading = start
+    current = grid.cell_of(x, y)
+    if current is None:
+        raise NoRouteError("The start is outside the map")
+
+    commands = []
+    points = [(x, y)]
+    expanded = 0
+    for number, (target_x, target_y) in enumerate(waypoints, 1):
+        goal = grid.cell_of(target_x, target_y)
+        if goal is None:
+            raise NoRouteError(f"Waypoint {number} is outside the map")
+        try:
+            cells, searched = route_cells(grid, current, goal)
+        except NoRouteError as e:
+            raise NoRouteError(f"Waypoint {number}: {e}") from None
+        expanded += searched
+
+        # Drive from the exact start point to the exact waypoint, through the cell centers between
+        for leg_x, leg_y in [grid.center_of(*cell) for cell in cells[1:-1]] + [(target_x, target_y)]:
+            distance = round(math.hypot(leg_x - x, leg_y - y), 3)
+            if distance <= 0:
+                continue
+            delta = _normalize(math.degrees(math.atan2(leg_y - y, leg_x - x)) - heading)
+            if abs(delta) >= 0.01:
+                steps = max(1, math.ceil(abs(delta) / max_turn - 1e-9))
+                for _ in range(steps):
+                    angle = round(90.0 + delta / steps, 2)
+                    commands.append(("turn", angle))
+                    heading += angle - 90.0
+            commands.append(("move", distance))
+            # Follow the rounded commands, so later legs correct their error
+            x += distance * math.cos(math.radians(heading))
+            y += distance * math.sin(math.radians(heading))
+            points.append((x, y))
+        current = goal
+
+    return Route(commands, points, expanded, time.perf_counter() - began)
@@ -0,0 +1,117 @@
+import functools
+import struct
+
+# Compact binary encoding of commands, acknowledgements and poses, for
+# robots that advertise "binary" in their capabilities. Every record is a
+# fixed-size little-endian struct, so the car can read a packet straight
+# into a C struct instead of parsing JSON text.
+#
+#   command  20 bytes  cmd u8, dir i8, id letter u8, id piece u8, id number u32,
+#                      value f32, seq u32, upload u32 (NO_SEQ when not pipelined)
+#   ack       8 bytes  id letter u8, id piece u8, status u8, pad, id number u32
+#   pose     12 bytes  x f32, y f32, version u32 (NO_VERSION when unnumbered)
+#
+# A request body holds one or more command records back to back; more
+# than one is a batch. Command ids are a letter plus a number ("m12"),
+# optionally with a piece number for optimizer-split turns ("t3.1").
+
+# Binary requests get binary answers; GETs ask for them with Accept.
+# Robots that don't know the format ignore the header and answer in JSON
+JSON_TYPE = "application/json"
+BINARY_TYPE = "application/vnd.robot-car.v1"
+
+COMMAND = struct.Struct("<BbBBIfII")
+ACK = struct.Struct("<BBBxI")
+POSE = struct.Struct("<ffI")
+
+NO_SEQ = 0xFFFFFFFF
+NO_VERSION = 0xFFFFFFFF
+
+CMD_CODES = {"move": 1, "turn": 2}
+CMD_NAMES = {code: cmd for cmd, code in CMD_CODES.items()}
+
+ACK_STATUS = {"success": 0, "queued": 1}
+ACK_STATUS_NAMES = {code: status for status, code in ACK_STATUS.items()}
+
+def is_binary(response):
+    """Whether a response (or request headers dict) carries the binary format"""
+    headers = getattr(response, "headers", response)
+    return headers.get("Content-Type", "").split(";")[0].strip() == BINARY_TYPE
+
+@functools.lru_cache(maxsize=4096)
+def split_id(command_id):
+    """"m12" -> (ord("m"), 0, 12), "t3.1" -> (ord("t"), 1, 3).
+    Raises ValueError for ids the binary format can't carry"""
+    text = str(command_id)
+    number, _, piece = text[1:].partition(".")
+    if not text[:1].isalpha() or not text[:1].isascii() or not number.isdigit() or (piece and not piece.isdigit()):
+        raise ValueError(f"Command id {command_id!r} has no binary encoding")
+    number, piece = int(number), int(piece or 0)
+    if number > 0xFFFFFFFF or piece > 0xFF:
+        raise ValueError(f"Command id {command_id!r} is out of range")
+    return ord(text[0]), piece, number
+
+def join_id(letter, piece, number):
+    return f"{chr(letter)}{number}.{piece}" if piece else f"{chr(letter)}{number}"
+
+def encode_command(command):
+    """One command dict in the robot's JSON format -> 20 bytes"""
+    cmd = command["cmd"]
+    value = command["d"] if cmd == "move" else command["a"]
+    letter, piece, number = split_id(command["id"])
+    seq = command.get("seq")
+    upload = command.get("upload")
+    return COMMAND.pack(
+        CMD_CODES[cmd],
+        int(command.get("dir", 1)) if cmd == "move" else 0,
+        letter, piece, number,
+        float(value),
+        NO_SEQ if seq is None else seq,
+        0 if upload is None else upload
+    )
+
+def encode_commands(payload):
+    """A command dict or a list of them (a batch) -> request body"""
+    if isinstance(payload, dict):
+        return encode_command(payload)
+    return b"".join(encode_command(command) for command in payload)
+
+def decode_commands(body):
+    """Request body -> list of command dicts, as they would have been sent in JSON"""
+    if len(body) % COMMAND.size:
+        raise ValueError(f"Body of {len(body)} bytes is not whole command records")
+    commands = []
+    for cmd, direction, letter, piece, number, value, seq, upload in COMMAND.iter_unpack(body):
+        if cmd not in CMD_NAMES:
+            raise ValueError(f"Unknown command code {cmd}")
+        command_id = join_id(letter, piece, number)
+        if CMD_NAMES[cmd] == "move":
+            command = {"cmd": "move", "d": value, "dir": direction, "id": command_id}
+        else:
+            command = {"cmd": "turn", "a": value, "id": command_id}
+        if seq != NO_SEQ:
+            command["seq"] = seq
+            command["upload"] = upload
+        commands.append(command)
+    return commands
+
+def encode_ack(command_id, status="success"):
+    letter, piece, number = split_id(command_id)
+    return ACK.pack(letter, piece, ACK_STATUS[status], number)
+
+def decode_ack(body):
+    """Ack body -> {"H": id, "status": ...} like the JSON acknowledgement"""
+    if len(body) != ACK.size:
+        raise ValueError(f"Ack of {len(body)} bytes, expected {ACK.size}")
+    letter, piece, status, number = ACK.unpack(body)
+    return {"H": join_id(letter, piece, number), "status": ACK_STATUS_NAMES.get(status, "unknown")}
+
+def encode_pose(x, y, version=None):
+    return POSE.pack(x, y, NO_VERSION if version is None else version)
+
+def decode_pose(body):
+    """Pose body -> (x, y, version), version None for unnumbered poses"""
+    if len(body) != POSE.size:
+        raise ValueError(f"Pose of {len(body)} bytes, expected {POSE.size}")
+    x, y, version = POSE.unpack(body)
+    return x, y, None if version == NO_VERSION else version
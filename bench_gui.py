@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark for GUI rendering.
+Builds the planner window, then scripts the operations that make it
+stutter - adding 1k/5k/10k commands, scrolling, reordering, redrawing the
+pose grid and the predicted path, and toasts - and measures what each
+costs per operation, including the Tk redraw it causes. Prints one JSON
+object per line plus a readable summary on stderr. Needs a display.
+
+    python bench_gui.py [--counts=1000,5000,10000] [--trace=gui-trace.json]
+"""
+
+import json
+import sys
+import time
+
+from Commands import CommandSequence
+from GUI import GUI
+import FrameProfiler
+
+def flush(gui):
+    """Let Tk process the redraws an operation queued"""
+    gui.root.update_idletasks()
+    gui.root.update()
+
+
+def timed(gui, fn, repeat=1):
+    """Per-operation cost in ms of fn, including the redraw it causes"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    flush(gui)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def bench_count(gui, profiler, count):
+    """Build a path of `count` commands and time the common operations on it"""
+    results = {}
+    gui.clear_all_command_blocks()
+    flush(gui)
+
+    sequence = gui.command_list.sequence
+    start = time.perf_counter()
+    for i in range(count):
+        command = sequence.new_move(0.1) if i % 2 == 0 else sequence.new_turn(45)
+        gui.add_command_block(command)
+    flush(gui)
+    results["add_command_block"] = (time.perf_counter() - start) * 1000 / count
+
+    # The predicted path is redrawn after idle - measure one full redraw
+    results["predict_path"] = timed(gui, gui._draw_prediction)
+
+    list_view = gui.command_list
+    results["scroll_page"] = timed(gui, lambda: list_view.scroll_to(list_view.offset + list_view.viewport_height), 50)
+    results["scroll_to_end"] = timed(gui, lambda: list_view.scroll_to(list_view.content_height()))
+    results["swap_adjacent"] = timed(gui, lambda: gui.move_command_up(count // 2), 50)
+
+    ids = [command.id for command in sequence.items[count // 4:count // 4 + 20]]
+    results["move_block_20"] = timed(gui, lambda: list_view.move_block(ids, count - 1), 10)
+
+    results["draw_pose_grid"] = timed(gui, gui._draw_pose_grid, 10)
+    results["pose_update"] = timed(gui, lambda: gui.update_pose_display(1.0, 1.0 + time.perf_counter() % 1), 50)
+    results["remove_last"] = timed(gui, gui.remove_last_command_block, 50)
+
+    return {
+        "bench": "gui",
+        "commands": count,
+        "per_op_ms": {name: round(ms, 4) for name, ms in results.items()},
+        "widgets": profiler.widget_count(),
+        "canvas_items": len(gui.pose_canvas.find_all()),
+    }
+
+
+def bench_toasts(gui, profiler, count=20):
+    """Fire a burst of toasts and measure how late the slide callbacks run"""
+    for i in range(count):
+        gui.show_toast(f"Toast {i + 1}", "info")
+    deadline = time.perf_counter() + 3.0
+    while time.perf_counter() < deadline:
+        gui.root.update()
+        time.sleep(0.001)
+
+    slides = {name: stats.summary() for name, stats in profiler.after_delay.items() if "toast" in name.lower()}
+    return {
+        "bench": "toasts",
+        "toasts": count,
+        "slide_delay_ms": slides,
+        "frame_late_ms": profiler.frames.summary(),
+        "widgets": profiler.widget_count(),
+    }
+
+
+def main():
+    counts = [1000, 5000, 10000]
+    trace_path = None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--counts="):
+            counts = [int(n) for n in arg.split("=", 1)[1].split(",") if n]
+        elif arg.startswith("--trace="):
+            trace_path = arg.split("=", 1)[1]
+        else:
+            sys.exit(__doc__)
+
+    gui = GUI(CommandSequence())
+    profiler = FrameProfiler.FrameProfiler(gui.root)
+    FrameProfiler.instrument_gui(profiler, gui)
+    profiler.start()
+    flush(gui)
+
+    records = [bench_count(gui, profiler, count) for count in counts]
+    records.append(bench_toasts(gui, profiler))
+
+    for record in records:
+        print(json.dumps(record))
+        if record["bench"] == "gui":
+            print(f"{record['commands']:>6} commands, {record['widgets']} widgets, "
+                  f"{record['canvas_items']} canvas items", file=sys.stderr)
+            for name, ms in record["per_op_ms"].items():
+                print(f"    {name:<20} {ms:10.3f} ms/op", file=sys.stderr)
+        else:
+            print(f"{record['toasts']} toasts: frame lateness p95 {record['frame_late_ms']['p95_ms']} ms, "
+                  f"max {record['frame_late_ms']['max_ms']} ms", file=sys.stderr)
+
+    if trace_path:
+        print(f"Trace written to {profiler.dump_trace(trace_path)}", file=sys.stderr)
+    profiler.stop()
+    gui.root.destroy()
+
+
+if __name__ == "__main__":
+    main()
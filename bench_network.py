@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Network benchmark for command upload and pose polling.
+Runs the planner's upload and pose feed code headlessly against the mock
+robot from test_pose_api.py, sweeping path length, link profile and send
+mode (and wire format, --formats=json,binary). Each run prints one JSON object per line (to stdout or --output),
+with a readable summary on stderr.
+
+    python bench_network.py [--lengths=10,100,400] [--profiles=lan,wifi,weak-wifi]
+                            [--modes=per-command,batched,pipelined] [--formats=auto]
+                            [--pose-seconds=3]
+                            [--repeat=1] [--port=8180] [--output=results.jsonl]
+
+Upload results: time to complete, commands/s, requests, and client-side
+request latency p50/p95/p99. Pose results: poses/s received and drawn, and
+request latency, for plain polling and long-polling.
+"""
+
+import contextlib
+import heapq
+import io
+import json
+import math
+import sys
+import time
+
+from RobotClient import RobotClient
+from NetworkWorker import NetworkWorker
+from PoseFeed import PoseFeed
+from Commands import CommandSequence
+from CommandUpload import upload_commands
+from PipelinedSender import new_upload_id
+from test_pose_api import LINK_PROFILES, start_servers
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return round(values[rank], 3)
+
+
+class TimedClient(RobotClient):
+    """RobotClient that records how long every request takes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies_ms = []
+
+    def _timed(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return request(*args, **kwargs)
+        finally:
+            self.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+    def get(self, endpoint, params=None, extra_wait=0.0):
+        if endpoint == "capabilities":
+            return super().get(endpoint, params, extra_wait)
+        return self._timed(super().get, endpoint, params, extra_wait)
+
+    def post(self, endpoint, payload):
+        return self._timed(super().post, endpoint, payload)
+
+
+class BenchJob:
+    """Stands in for a NetworkWorker job when calling upload code directly"""
+
+    cancelled = False
+
+    def report(self, progress):
+        pass
+
+
+class HeadlessRoot:
+    """Just enough of Tk's after() scheduling to run NetworkWorker and
+    PoseFeed without a display"""
+
+    def __init__(self):
+        self.timers = []
+        self.counter = 0
+        self.cancelled = set()
+
+    def after(self, delay_ms, callback):
+        self.counter += 1
+        heapq.heappush(self.timers, (time.monotonic() + delay_ms / 1000, self.counter, callback))
+        return self.counter
+
+    def after_cancel(self, timer_id):
+        self.cancelled.add(timer_id)
+
+    def run_for(self, seconds):
+        deadline = time.monotonic() + seconds
+        while self.timers and time.monotonic() < deadline:
+            due, timer_id, callback = self.timers[0]
+            if due > time.monotonic():
+                time.sleep(min(due, deadline) - time.monotonic())
+                continue
+            heapq.heappop(self.timers)
+            if timer_id in self.cancelled:
+                self.cancelled.discard(timer_id)
+                continue
+            callback()
+
+
+def make_path(length):
+    """Alternating moves and turns, so the optimizer couldn't shorten it"""
+    sequence = CommandSequence()
+    for i in range(length):
+        sequence.append(sequence.new_move(0.1) if i % 2 == 0 else sequence.new_turn(45))
+    return sequence.encode()
+
+
+def bench_upload(port, profile, mode, length, wire_format="auto"):
+    """Upload one path, returns the result record"""
+    robot = TimedClient(f"http://localhost:{port}", pool_size=8, retries=2, backoff=0.05, wire_format=wire_format)
+    payload = make_path(length)
+    robot.get_capabilities()
+
+    record = {"bench": "upload", "profile": profile, "mode": mode, "length": length, "format": wire_format}
+    start = time.perf_counter()
+    try:
+        used, _ = upload_commands(BenchJob(), robot, payload, new_upload_id(), mode=mode)
+        record["status"] = "ok"
+        record["used"] = used
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = str(e)
+    elapsed = time.perf_counter() - start
+    robot.close()
+
+    record.update({
+        "time_s": round(elapsed, 4),
+        "throughput_cmd_s": round(length / elapsed, 1) if record["status"] == "ok" else 0.0,
+        "requests": len(robot.latencies_ms),
+        "latency_ms": {
+            "p50": percentile(robot.latencies_ms, 50),
+            "p95": percentile(robot.latencies_ms, 95),
+            "p99": percentile(robot.latencies_ms, 99),
+        }
+    })
+    return record
+
+
+def bench_pose(port, profile, longpoll, seconds, wire_format="auto"):
+    """Run a live pose feed for a while, returns the result record"""
+    root = HeadlessRoot()
+    network = NetworkWorker(root, workers=2, max_pending=16)
+    robot = TimedClient(f"http://localhost:{port}", pool_size=4, wire_format=wire_format)
+    drawn = []
+    feed = PoseFeed(root, network, robot, on_pose=lambda x, y: drawn.append((x, y)))
+    feed.set_busy(True)  # poll at the fast rate, as during a send
+
+    feed.start()
+    root.run_for(seconds)
+    feed.stop()
+    network.stop()
+    robot.close()
+
+    return {
+        "bench": "pose",
+        "profile": profile,
+        "mode": "longpoll" if longpoll else "poll",
+        "format": wire_format,
+        "seconds": seconds,
+        "status": "ok",
+        "received_per_s": round(feed.stats["received"] / seconds, 1),
+        "drawn_per_s": round(feed.stats["drawn"] / seconds, 1),
+        "dropped": feed.stats["dropped"],
+        "errors": feed.stats["errors"],
+        "requests": len(robot.latencies_ms),
+        "latency_ms": {
+            "p50": percentile(robot.latencies_ms, 50),
+            "p95": percentile(robot.latencies_ms, 95),
+            "p99": percentile(robot.latencies_ms, 99),
+        }
+    }
+
+
+def describe(record):
+    latency = record["latency_ms"]
+    if record["bench"] == "upload":
+        result = (f"{record['time_s']:8.3f} s  {record['throughput_cmd_s']:8.1f} cmd/s"
+                  if record["status"] == "ok" else f"FAILED: {record['error']}")
+        head = f"upload {record['profile']:>10} {record['mode']:>12} {record['format']:>6} {record['length']:>6} cmds"
+    else:
+        result = f"{record['received_per_s']:8.1f} poses/s received, {record['drawn_per_s']:.1f}/s drawn"
+        head = f"pose   {record['profile']:>10} {record['mode']:>12} {record['format']:>6} {record['seconds']:>6} s   "
+    return f"{head}  {result}  latency p50 {latency['p50']} / p95 {latency['p95']} / p99 {latency['p99']} ms"
+
+
+def main():
+    options = {
+        "lengths": "10,100,400",
+        "profiles": "lan,wifi,weak-wifi",
+        "modes": "per-command,batched,pipelined",
+        "formats": "auto",
+        "pose-seconds": "3",
+        "repeat": "1",
+        "port": "8180",
+        "output": "",
+    }
+    for arg in sys.argv[1:]:
+        name, _, value = arg.lstrip("-").partition("=")
+        if name not in options:
+            sys.exit(f"Unknown option {arg}\n{__doc__}")
+        options[name] = value
+
+    lengths = [int(n) for n in options["lengths"].split(",") if n]
+    profiles = [p for p in options["profiles"].split(",") if p]
+    modes = [m for m in options["modes"].split(",") if m]
+    formats = [f for f in options["formats"].split(",") if f]
+    pose_seconds = float(options["pose-seconds"])
+    repeat = int(options["repeat"])
+    port = int(options["port"])
+
+    for profile in profiles:
+        if profile not in LINK_PROFILES:
+            sys.exit(f"Unknown profile {profile}, choose from {', '.join(LINK_PROFILES)}")
+
+    out = open(options["output"], "w") if options["output"] else sys.stdout
+    print(f"Benchmarking {len(profiles)} profiles x {len(modes)} modes x {len(formats)} formats x "
+          f"{len(lengths)} lengths", file=sys.stderr)
+
+    # One simulated robot per profile, plus one without long-poll for the pose comparison
+    for profile in profiles:
+        link = LINK_PROFILES[profile]
+        servers = start_servers(port, 2, link, verbose=False)
+        servers[1].robot.longpoll_enabled = False
+
+        runs = [("upload", mode, wire_format, length)
+                for mode in modes for wire_format in formats for length in lengths]
+        if pose_seconds > 0:
+            runs += [("pose", longpoll, wire_format, None) for longpoll in (True, False) for wire_format in formats]
+
+        for kind, mode, wire_format, length in runs * repeat:
+            # The upload code logs every request - keep that out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                if kind == "upload":
+                    record = bench_upload(port, profile, mode, length, wire_format)
+                else:
+                    record = bench_pose(port if mode else port + 1, profile, mode, pose_seconds, wire_format)
+            record["link"] = {"latency_ms": link.latency_ms, "jitter_ms": link.jitter_ms, "loss": link.loss}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            print(describe(record), file=sys.stderr)
+
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()
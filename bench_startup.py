@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark for planner cold start.
+Launches PathPlanner.py repeatedly in startup budget mode and measures
+time-to-first-frame, both from process launch (includes the interpreter
+starting) and from inside the planner. Needs a display.
+
+    python bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+def launch_once(planner_path):
+    """Start the planner, wait for its first frame, return (wall ms, in-process ms)"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-u", planner_path, "--profile-startup", "--exit-after-first-frame"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+
+    wall_ms = None
+    planner_ms = None
+    for line in proc.stdout:
+        if line.startswith("First frame:"):
+            wall_ms = (time.perf_counter() - start) * 1000
+            planner_ms = float(line.split(":")[1].split()[0])
+    proc.wait()
+
+    if wall_ms is None:
+        raise RuntimeError(f"Planner exited with code {proc.returncode} before drawing a frame")
+    return wall_ms, planner_ms
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    planner_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PathPlanner.py")
+
+    wall = []
+    planner = []
+    for i in range(runs):
+        wall_ms, planner_ms = launch_once(planner_path)
+        wall.append(wall_ms)
+        planner.append(planner_ms)
+        print(f"Run {i+1}/{runs}: {wall_ms:.1f} ms to first frame ({planner_ms:.1f} ms in planner)")
+
+    print("-" * 60)
+    print(f"Time to first frame over {runs} runs (ms)")
+    print(f"  from launch:   min {min(wall):7.1f}  median {statistics.median(wall):7.1f}  max {max(wall):7.1f}")
+    print(f"  inside planner: min {min(planner):7.1f}  median {statistics.median(planner):7.1f}  max {max(planner):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the JSON and binary wire formats.
+Times encoding and decoding of single commands, pipelined commands,
+batches and poses in both formats, and measures the bytes each exchange
+puts on the wire (HTTP headers included) against the mock robot from
+test_pose_api.py. Prints one JSON object per line plus a readable summary
+on stderr.
+
+    python bench_wire.py [--batch=64] [--repeat=20000] [--port=8190]
+"""
+
+import json
+import sys
+import time
+
+import WireFormat
+from RobotClient import RobotClient
+from bench_network import make_path
+from test_pose_api import start_servers
+
+def per_op_us(fn, repeat):
+    """Best of three runs, in microseconds per call"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        elapsed = (time.perf_counter() - start) / repeat * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def json_pose(body):
+    """The client's JSON pose parsing, as in RobotClient.read_pose"""
+    data = json.loads(body)
+    return float(data["pose"]["x"]), float(data["pose"]["y"]), data.get("v")
+
+
+def bench_codec(batch, repeat):
+    """Encode/decode cost and body size for each message in both formats"""
+    commands = make_path(batch)
+    command = commands[0]
+    pipelined = dict(command, seq=1234, upload=56789)
+    pose = {"H": "pose_12", "pose": {"x": 1.23, "y": -0.45}, "v": 245}
+
+    messages = {
+        # name: (json encode, binary encode, json decode, binary decode)
+        "command": (
+            lambda: json.dumps(command).encode(),
+            lambda: WireFormat.encode_commands(command),
+            json.loads,
+            WireFormat.decode_commands,
+        ),
+        "pipelined command": (
+            lambda: json.dumps(pipelined).encode(),
+            lambda: WireFormat.encode_commands(pipelined),
+            json.loads,
+            WireFormat.decode_commands,
+        ),
+        f"batch of {batch}": (
+            lambda: json.dumps(commands).encode(),
+            lambda: WireFormat.encode_commands(commands),
+            json.loads,
+            WireFormat.decode_commands,
+        ),
+        "ack": (
+            lambda: json.dumps({"H": command["id"], "status": "success"}).encode(),
+            lambda: WireFormat.encode_ack(command["id"]),
+            json.loads,
+            WireFormat.decode_ack,
+        ),
+        "pose": (
+            lambda: json.dumps(pose).encode(),
+            lambda: WireFormat.encode_pose(pose["pose"]["x"], pose["pose"]["y"], pose["v"]),
+            json_pose,
+            WireFormat.decode_pose,
+        ),
+    }
+
+    records = []
+    for name, (json_encode, binary_encode, json_decode, binary_decode) in messages.items():
+        # Batches are bigger, time fewer of them
+        count = max(100, repeat // batch) if name.startswith("batch") else repeat
+        json_body, binary_body = json_encode(), binary_encode()
+        records.append({
+            "bench": "codec",
+            "message": name,
+            "bytes": {"json": len(json_body), "binary": len(binary_body)},
+            "encode_us": {"json": per_op_us(json_encode, count), "binary": per_op_us(binary_encode, count)},
+            "decode_us": {
+                "json": per_op_us(lambda: json_decode(json_body), count),
+                "binary": per_op_us(lambda: binary_decode(binary_body), count),
+            },
+        })
+    return records
+
+
+def request_bytes(request):
+    """Size of a sent request: request line, headers and body"""
+    head = f"{request.method} {request.path_url} HTTP/1.1\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in request.headers.items()) + "\r\n"
+    return len(head.encode()) + len(request.body or b"")
+
+
+def response_bytes(response):
+    """Size of a received response: status line, headers and body"""
+    head = f"HTTP/1.1 {response.status_code} {response.reason}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in response.headers.items()) + "\r\n"
+    return len(head.encode()) + len(response.content)
+
+
+def bench_exchange(port, batch):
+    """Bytes each real exchange with the mock robot puts on the wire"""
+    commands = make_path(batch)
+    exchanges = {
+        "command": lambda robot: robot.post_commands(commands[0]),
+        "pipelined command": lambda robot: robot.post_commands(dict(commands[1], seq=0, upload=1)),
+        f"batch of {batch}": lambda robot: robot.post_commands(commands),
+        "pose": lambda robot: robot.get_pose(),
+    }
+
+    records = []
+    for name, exchange in exchanges.items():
+        record = {"bench": "exchange", "message": name}
+        for wire_format in ("json", "binary"):
+            robot = RobotClient(f"http://localhost:{port}", wire_format=wire_format)
+            response = exchange(robot)
+            if response.status_code != 200:
+                sys.exit(f"{name} in {wire_format} failed: {response.status_code}")
+            record[wire_format] = {
+                "request_bytes": request_bytes(response.request),
+                "response_bytes": response_bytes(response),
+            }
+            robot.close()
+        records.append(record)
+    return records
+
+
+def describe(record):
+    if record["bench"] == "codec":
+        size, encode, decode = record["bytes"], record["encode_us"], record["decode_us"]
+        return (f"{record['message']:>18}  {size['json']:6} -> {size['binary']:5} bytes   "
+                f"encode {encode['json']:8.2f} / {encode['binary']:7.2f} us   "
+                f"decode {decode['json']:8.2f} / {decode['binary']:7.2f} us")
+    json_total = record["json"]["request_bytes"] + record["json"]["response_bytes"]
+    binary_total = record["binary"]["request_bytes"] + record["binary"]["response_bytes"]
+    return f"{record['message']:>18}  {json_total:6} -> {binary_total:5} bytes per exchange, headers included"
+
+
+def main():
+    options = {"batch": "64", "repeat": "20000", "port": "8190"}
+    for arg in sys.argv[1:]:
+        name, _, value = arg.lstrip("-").partition("=")
+        if name not in options:
+            sys.exit(f"Unknown option {arg}\n{__doc__}")
+        options[name] = value
+    batch, repeat, port = int(options["batch"]), int(options["repeat"]), int(options["port"])
+
+    servers = start_servers(port, 1, verbose=False)
+    try:
+        print("JSON vs binary (json / binary)", file=sys.stderr)
+        for record in bench_codec(batch, repeat) + bench_exchange(port, batch):
+            print(json.dumps(record))
+            print(describe(record), file=sys.stderr)
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
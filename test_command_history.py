@@ -0,0 +1,147 @@
+import random
+
+from CommandHistory import CommandHistory
+from Commands import Command, CommandSequence
+
+def snapshot(sequence):
+    """Everything an undo has to bring back, and a check that positions agree"""
+    assert sequence.positions == {c.id: i for i, c in enumerate(sequence)}
+    return [(c.id, c.cmd, c.value, c.dir) for c in sequence]
+
+
+def random_edit(rng, sequence):
+    """Apply one random edit through the public API"""
+    n = len(sequence)
+    choice = rng.randrange(8)
+    if choice == 0 or n < 2:
+        sequence.append(sequence.new_move(rng.randint(1, 9) / 10) if rng.random() < 0.5 else sequence.new_turn(rng.randint(0, 360)))
+    elif choice == 1:
+        sequence.pop()
+    elif choice == 2:
+        sequence.swap(rng.randrange(n), rng.randrange(n))
+    elif choice == 3:
+        ids = [c.id for c in rng.sample(list(sequence), rng.randint(1, min(4, n)))]
+        sequence.move_block(ids, rng.randint(0, n))
+    elif choice == 4:
+        index = rng.randrange(n)
+        old = sequence[index]
+        sequence.replace(index, Command(old.cmd, old.value + 1, old.id, old.dir))
+    elif choice == 5:
+        index = rng.randint(0, n)
+        count = rng.randint(0, min(3, n - index))
+        sequence.splice(index, count, [sequence.new_turn(rng.randint(0, 360)) for _ in range(rng.randint(0, 3))])
+    elif choice == 6:
+        sequence.extend([sequence.new_move(0.5) for _ in range(rng.randint(1, 5))])
+    elif rng.random() < 0.2:
+        sequence.clear()
+
+
+def test_random_edits_undo_and_redo_exactly():
+    rng = random.Random(11)
+    for _ in range(50):
+        sequence = CommandSequence(CommandHistory())
+        states = [snapshot(sequence)]
+        for _ in range(rng.randint(1, 60)):
+            random_edit(rng, sequence)
+            state = snapshot(sequence)
+            if state != states[-1]:
+                states.append(state)
+            # Every edit that changed something is one step, no-ops are none
+            assert len(sequence.history) == len(states) - 1
+
+        for state in reversed(states[:-1]):
+            assert sequence.undo() is not None
+            assert snapshot(sequence) == state
+        assert sequence.undo() is None
+        for state in states[1:]:
+            assert sequence.redo() is not None
+            assert snapshot(sequence) == state
+        assert sequence.redo() is None
+
+
+def test_an_edit_after_undo_drops_the_redo_steps():
+    sequence = CommandSequence(CommandHistory())
+    sequence.append(sequence.new_move(0.1))
+    sequence.append(sequence.new_move(0.2))
+    sequence.undo()
+    assert sequence.history.can_redo
+    sequence.append(sequence.new_turn(45))
+    assert not sequence.history.can_redo
+    assert sequence.redo() is None
+    assert [c.id for c in sequence] == ["m1", "t1"]
+
+
+def test_groups_undo_as_one_step():
+    sequence = CommandSequence(CommandHistory())
+    sequence.append(sequence.new_move(0.1))
+    with sequence.history.group():
+        sequence.append(sequence.new_move(0.2))
+        with sequence.history.group():
+            sequence.swap(0, 1)
+        sequence.pop()
+    sequence.extend([sequence.new_turn(10), sequence.new_turn(20)])
+    assert len(sequence.history) == 3
+
+    sequence.undo()
+    assert [c.id for c in sequence] == ["m2"]
+    sequence.undo()
+    assert [c.id for c in sequence] == ["m1"]
+    sequence.redo()
+    sequence.redo()
+    assert [c.id for c in sequence] == ["m2", "t1", "t2"]
+
+
+def test_appends_in_a_group_are_one_splice():
+    history = CommandHistory()
+    sequence = CommandSequence(history)
+    with history.group():
+        for _ in range(1000):
+            sequence.append(sequence.new_move(0.1))
+    assert len(history.undo_steps[-1]) == 1
+    sequence.undo()
+    assert len(sequence) == 0 and not sequence.positions
+
+
+def test_undo_closes_a_group_being_recorded():
+    sequence = CommandSequence(CommandHistory())
+    sequence.history.begin_group()
+    sequence.append(sequence.new_move(0.1))
+    sequence.append(sequence.new_move(0.2))
+    assert sequence.history.can_undo
+    sequence.undo()
+    assert len(sequence) == 0
+    sequence.history.end_group()  # a late end is harmless
+    assert sequence.redo() == 0 and len(sequence) == 2
+
+
+def test_oldest_steps_are_dropped_past_the_limit():
+    sequence = CommandSequence(CommandHistory(limit=5))
+    for _ in range(8):
+        sequence.append(sequence.new_move(0.1))
+    while sequence.undo() is not None:
+        pass
+    assert [c.id for c in sequence] == ["m1", "m2", "m3"]
+
+
+def test_clear_makes_the_current_path_the_start():
+    sequence = CommandSequence(CommandHistory())
+    sequence.append(sequence.new_move(0.1))
+    sequence.history.clear()
+    assert sequence.undo() is None
+    assert [c.id for c in sequence] == ["m1"]
+
+
+def test_redo_keeps_the_undone_command_ids():
+    sequence = CommandSequence(CommandHistory())
+    sequence.append(sequence.new_move(0.1))
+    sequence.pop()
+    sequence.undo()
+    # The restored command is the same object, id and all, and its id stays taken
+    assert sequence[0].id == "m1"
+    assert sequence.new_move(0.1).id == "m2"
+
+
+def test_a_sequence_without_history_has_nothing_to_undo():
+    sequence = CommandSequence()
+    sequence.append(sequence.new_move(0.1))
+    assert sequence.undo() is None and sequence.redo() is None
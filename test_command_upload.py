@@ -0,0 +1,230 @@
+import threading
+import time
+
+import pytest
+
+from CommandUpload import upload_commands
+from PipelinedSender import ACKED, PipelinedSender
+from RobotClient import RobotClient, RobotError
+from SendJournal import SendJournal
+from test_pose_api import LinkProfile, start_servers
+
+# Lossy enough that a long upload loses dozens of requests, quick enough for a test
+LOSSY = LinkProfile("lossy", latency_ms=5, jitter_ms=3, loss=0.15)
+
+
+def path(count):
+    return [{"cmd": "move", "d": 0.1, "dir": 1, "id": f"m{i + 1}"} for i in range(count)]
+
+
+class Job:
+    """Collects progress, cancels itself once `cancel_at` commands are acked"""
+
+    def __init__(self, cancel_at=None):
+        self.cancelled = False
+        self.cancel_at = cancel_at
+        self.acked = []
+
+    def report(self, progress):
+        sent, changes = progress
+        self.acked += [command_id for command_id, state in changes.items() if state == ACKED]
+        if self.cancel_at is not None and sent >= self.cancel_at:
+            self.cancelled = True
+
+
+class MockRobot:
+    """A robot and a client talking to it over `link`, the robot records
+    the ids it ran in order"""
+
+    def __init__(self, link=None, wire_format="auto", **features):
+        self.server = start_servers(0, link=link, **features)[0]
+        self.state = self.server.robot
+        self.ran = []
+        execute = self.state.execute_command
+        def record(command):
+            self.ran.append(command["id"])
+            execute(command)
+        self.state.execute_command = record
+        self.client = RobotClient(f"http://127.0.0.1:{self.server.server_address[1]}", wire_format=wire_format)
+
+    def close(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mock_robot():
+    robots = []
+    def make(**options):
+        robots.append(MockRobot(**options))
+        return robots[-1]
+    yield make
+    for robot in robots:
+        robot.close()
+
+
+class Response:
+    def __init__(self, status_code, ack=None):
+        self.status_code = status_code
+        self.ack = ack
+
+
+class FakeRobot:
+    """Answers pipelined commands in-process. fail(seq, attempt) decides
+    which requests go unanswered, delay(seq) how long each one takes"""
+
+    def __init__(self, fail=lambda seq, attempt: False, delay=lambda seq: 0.0):
+        self.fail = fail
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.acked = set()
+        self.spread = 0  # furthest any request got past the oldest unacked command
+
+    def post_commands(self, command):
+        seq = command["seq"]
+        with self.lock:
+            attempt = self.attempts[seq] = self.attempts.get(seq, 0) + 1
+            oldest = min(set(range(seq + 1)) - self.acked)
+            self.spread = max(self.spread, seq - oldest)
+        time.sleep(self.delay(seq))
+        if self.fail(seq, attempt):
+            return Response(503)
+        with self.lock:
+            self.acked.add(seq)
+        return Response(200, {"H": command["id"], "status": "queued"})
+
+    def decode(self, response):
+        return response.ack
+
+
+@pytest.mark.parametrize("wire_format", ["json", "binary"])
+def test_pipelined_upload_survives_a_lossy_link(mock_robot, wire_format):
+    robot = mock_robot(link=LOSSY, wire_format=wire_format)
+    commands = path(200)
+    job = Job()
+    used, _ = upload_commands(job, robot.client, commands, mode="pipelined")
+    assert used.startswith("pipelined") and not used.endswith(" 0 retransmits")
+    # Retransmits fill the gaps in order, and repeats of lost replies don't run twice
+    assert robot.ran == [command["id"] for command in commands]
+    assert sorted(job.acked) == sorted(robot.ran)
+
+
+def test_the_window_slides_over_the_oldest_unacked_command():
+    # Every fourth command needs a retransmit and takes longest
+    robot = FakeRobot(fail=lambda seq, attempt: seq % 4 == 0 and attempt == 1,
+                      delay=lambda seq: 0.01 if seq % 4 == 0 else 0.0)
+    sender = PipelinedSender(robot, window=5)
+    assert sender.send(Job(), path(40)) == 40
+    assert robot.spread < 5
+    assert sender.stats["retransmits"] == 10
+    assert all(robot.attempts[seq] == (2 if seq % 4 == 0 else 1) for seq in range(40))
+
+
+def test_a_command_that_never_gets_through_fails_the_upload():
+    robot = FakeRobot(fail=lambda seq, attempt: seq == 3)
+    job = Job()
+    with pytest.raises(RobotError, match="m4 not acknowledged"):
+        PipelinedSender(robot, window=4, max_attempts=3).send(job, path(10))
+    # It was retried for free while the others got through, then ran out alone
+    assert robot.attempts[3] >= 3
+    assert "m4" not in job.acked and {"m1", "m2", "m3"} <= set(job.acked)
+
+
+def test_a_failed_upload_reports_acks_still_in_flight():
+    # m1 fails at once, the rest are on the way when the upload gives up
+    robot = FakeRobot(fail=lambda seq, attempt: seq == 0, delay=lambda seq: 0.0 if seq == 0 else 0.2)
+    job = Job()
+    with pytest.raises(RobotError):
+        PipelinedSender(robot, window=4).send(job, path(10))
+    assert sorted(job.acked) == ["m2", "m3", "m4"]
+
+
+def test_a_cancelled_upload_reports_acks_still_in_flight():
+    robot = FakeRobot(delay=lambda seq: 0.0 if seq < 2 else 0.2)
+    job = Job(cancel_at=2)
+    acked = PipelinedSender(robot, window=4).send(job, path(20))
+    # The robot ran everything that was sent, the journal has to hear of all of it
+    assert acked == len(robot.acked) == len(job.acked)
+    assert acked > 2 and len(robot.acked) < 20
+
+
+def test_binary_refused_falls_back_to_json(mock_robot):
+    robot = mock_robot(wire_format="binary", binary_enabled=False)
+    commands = path(30)
+    upload_commands(Job(), robot.client, commands, mode="pipelined")
+    assert robot.client.binary_supported is False
+    assert robot.ran == [command["id"] for command in commands]
+
+
+@pytest.mark.parametrize("features, mode, expected", [
+    ({"window": 0}, "auto", "batched"),
+    ({"window": 0, "batch_enabled": False}, "auto", "per-command"),
+    ({}, "per-command", "per-command"),
+    ({}, "batched", "batched"),
+])
+def test_upload_modes_deliver_everything(mock_robot, features, mode, expected):
+    robot = mock_robot(**features)
+    commands = path(150)
+    job = Job()
+    used, _ = upload_commands(job, robot.client, commands, mode=mode, batch_size=40)
+    assert used == expected
+    assert robot.ran == [command["id"] for command in commands]
+    assert sorted(job.acked) == sorted(robot.ran)
+
+
+def test_journal_ignores_a_torn_last_line(tmp_path):
+    journal = SendJournal(str(tmp_path / "send.jsonl"))
+    commands = path(5)
+    journal.start("car", 7, commands, {}, "")
+    journal.record(["m1", "m2"])
+    journal.record([])
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"acked": ["m3"')
+
+    checkpoint = journal.load()
+    assert checkpoint.upload == 7 and checkpoint.acked == {"m1", "m2"}
+    assert checkpoint.remaining == 3 and checkpoint.first_pending() == 2
+    assert checkpoint.matches("car", commands) and not checkpoint.matches("car", commands[:4])
+
+    journal.resume()
+    journal.record(["m3", "m4", "m5"])
+    journal.close()
+    # Lines after a torn one are not trusted
+    assert journal.load().acked == {"m1", "m2"}
+
+
+def test_journal_of_a_delivered_path_has_nothing_to_resume(tmp_path):
+    journal = SendJournal(str(tmp_path / "send.jsonl"))
+    journal.start("car", 1, path(2), {}, "")
+    journal.record(["m1", "m2"])
+    journal.close()
+    assert journal.load() is None
+    journal.finish()
+    assert journal.load() is None
+
+
+def test_an_interrupted_upload_resumes_from_its_checkpoint(mock_robot, tmp_path):
+    robot = mock_robot(link=LinkProfile("lan", latency_ms=1, jitter_ms=0.5))
+    commands = path(60)
+    journal = SendJournal(str(tmp_path / "send.jsonl"))
+    journal.start("car", 42, commands, {}, "")
+
+    job = Job(cancel_at=20)
+    report = job.report
+    def journaled(progress):
+        journal.record([command_id for command_id, state in progress[1].items() if state == ACKED])
+        report(progress)
+    job.report = journaled
+    upload_commands(job, robot.client, commands, upload=42, mode="pipelined")
+    journal.close()
+
+    checkpoint = journal.load()
+    assert checkpoint.acked == set(robot.ran) and checkpoint.remaining > 0
+    job = Job()
+    upload_commands(job, robot.client, checkpoint.commands, checkpoint.upload, checkpoint.acked, mode="pipelined")
+    # Nothing is sent twice and the robot carries on where it stopped
+    assert not set(job.acked) & checkpoint.acked
+    assert robot.ran == [command["id"] for command in commands]
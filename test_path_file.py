@@ -0,0 +1,144 @@
+import json
+import random
+
+import pytest
+
+from Commands import Command, CommandSequence
+from PathFile import ChunkedLoader, PathFileError, iter_commands, write_commands
+
+def random_sequence(rng, count):
+    """CommandSequence with values that need every digit to read back exactly"""
+    sequence = CommandSequence()
+    for _ in range(count):
+        if rng.random() < 0.5:
+            command = sequence.new_move(rng.choice([0.1 + 0.2, 1 / 3, 0.25, 2e-05, rng.uniform(0.01, 5)]))
+            command.dir = rng.choice([1, -1])
+        else:
+            command = sequence.new_turn(rng.choice([0, 90, 1 / 7, 359.99, rng.uniform(0, 360)]))
+        sequence.append(command)
+    return sequence
+
+
+def fields(commands):
+    return [(c.cmd, c.value, c.dir if c.is_move else None, c.id) for c in commands]
+
+
+class ManualRoot:
+    """Runs root.after callbacks when told to, no display needed"""
+
+    def __init__(self):
+        self.timers = {}
+        self.counter = 0
+
+    def after(self, delay_ms, callback):
+        self.counter += 1
+        self.timers[self.counter] = callback
+        return self.counter
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def run(self):
+        while self.timers:
+            self.timers.pop(min(self.timers))()
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".csv", ".json"])
+def test_paths_round_trip(tmp_path, extension):
+    sequence = random_sequence(random.Random(extension), 300)
+    path = str(tmp_path / f"route{extension}")
+    assert write_commands(path, sequence) == 300
+    assert fields(iter_commands(path)) == fields(sequence)
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".csv", ".json"])
+def test_empty_paths_round_trip(tmp_path, extension):
+    path = str(tmp_path / f"empty{extension}")
+    assert write_commands(path, []) == 0
+    assert list(iter_commands(path)) == []
+
+
+def test_commands_without_ids_get_fresh_ones(tmp_path):
+    path = tmp_path / "hand.jsonl"
+    path.write_text('{"cmd": "move", "d": "0.2"}\n\n{"cmd": "turn", "a": 45, "id": "t7"}\n')
+    sequence = CommandSequence()
+    for command in iter_commands(str(path)):
+        sequence.append(command)
+    assert [c.id for c in sequence] == ["m1", "t7"]
+    assert sequence.new_turn(90).id == "t8"
+
+
+def test_jsonl_errors_name_the_line(tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"cmd": "move", "d": 0.2}\n\n{"cmd": "move", "d": -1}\n')
+    with pytest.raises(PathFileError) as error:
+        list(iter_commands(str(path)))
+    assert error.value.line == 3
+    assert "bad.jsonl, line 3" in str(error.value)
+
+    path.write_text('{"cmd": "turn", "a": 10}\n[1, 2]\n')
+    with pytest.raises(PathFileError, match="line 2"):
+        list(iter_commands(str(path)))
+
+    path.write_text('{"cmd": "turn", "a": 10\n')
+    with pytest.raises(PathFileError, match="line 1"):
+        list(iter_commands(str(path)))
+
+
+def test_csv_errors_name_the_line(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("cmd,value,dir,id\nmove,0.2,1,m1\nturn,left,,t1\n")
+    with pytest.raises(PathFileError) as error:
+        list(iter_commands(str(path)))
+    assert error.value.line == 3
+
+
+def test_csv_without_required_columns_is_refused(tmp_path):
+    path = tmp_path / "columns.csv"
+    path.write_text("cmd,dir\nmove,1\n")
+    with pytest.raises(PathFileError, match="missing column value"):
+        list(iter_commands(str(path)))
+    # Only cmd and value are required
+    path.write_text("value,cmd\n0.5,move\n")
+    assert fields(iter_commands(str(path))) == [("move", 0.5, 1, None)]
+
+
+def test_json_errors_name_the_entry(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps([{"cmd": "turn", "a": 10}, {"cmd": "jump"}]))
+    with pytest.raises(PathFileError, match="line 2"):
+        list(iter_commands(str(path)))
+    path.write_text(json.dumps({"cmd": "turn", "a": 10}))
+    with pytest.raises(PathFileError, match="expected a list"):
+        list(iter_commands(str(path)))
+
+
+def test_unknown_extensions_are_refused(tmp_path):
+    with pytest.raises(ValueError, match="Unknown path file type"):
+        write_commands(str(tmp_path / "route.txt"), [Command("move", 1, "m1")])
+    with pytest.raises(ValueError, match="Unknown path file type"):
+        list(iter_commands(str(tmp_path / "route")))
+
+
+def test_chunked_loader_delivers_everything_in_order(tmp_path):
+    sequence = random_sequence(random.Random(5), 1000)
+    path = str(tmp_path / "route.jsonl")
+    write_commands(path, sequence)
+    root = ManualRoot()
+    chunks, done = [], []
+    ChunkedLoader(root, path, chunks.append, done.append, budget_ms=0, max_chunk=64).start()
+    root.run()
+    assert done == [1000]
+    assert len(chunks) > 1 and all(len(chunk) <= 64 for chunk in chunks)
+    assert fields(command for chunk in chunks for command in chunk) == fields(sequence)
+
+
+def test_chunked_loader_delivers_up_to_a_bad_entry(tmp_path):
+    path = tmp_path / "bad.jsonl"
+    path.write_text('{"cmd": "move", "d": 0.2}\n' * 10 + '{"cmd": "move"}\n')
+    root = ManualRoot()
+    chunks, errors = [], []
+    ChunkedLoader(root, str(path), chunks.append, on_error=errors.append).start()
+    root.run()
+    assert sum(map(len, chunks)) == 10
+    assert isinstance(errors[0], PathFileError) and errors[0].line == 11
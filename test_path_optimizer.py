@@ -0,0 +1,76 @@
+import math
+import random
+
+from Commands import CommandSequence
+from PathOptimizer import optimize
+from PathSimulator import PathSimulator
+
+def make_sequence(steps):
+    """CommandSequence from ("move", meters) / ("turn", angle) pairs"""
+    sequence = CommandSequence()
+    for cmd, value in steps:
+        sequence.append(sequence.new_move(value) if cmd == "move" else sequence.new_turn(value))
+    return sequence
+
+
+def random_steps(rng, count):
+    steps = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            steps.append(("move", rng.choice([0.1, 0.15, 0.2, 0.25])))
+        else:
+            steps.append(("turn", rng.choice([0, 10, 45, 90, 135, 180, 270])))
+    return steps
+
+
+def end_pose(commands):
+    sequence = CommandSequence()
+    for command in commands:
+        sequence.append(command)
+    return PathSimulator(sequence).end_pose()
+
+
+def test_merges_moves_and_turns():
+    result = optimize(list(make_sequence([("move", 0.1), ("move", 0.2), ("turn", 45), ("turn", 45)])))
+    assert [(c.cmd, c.value) for c in result.commands] == [("move", 0.3), ("turn", 0.0)]
+    assert result.sources == {"m1": ["m1", "m2"], "t1": ["t1", "t2"]}
+    assert result.saved_requests == 2
+
+
+def test_cancelled_turns_go_with_the_next_command():
+    result = optimize(list(make_sequence([("move", 0.1), ("turn", 120), ("turn", 60), ("move", 0.2)])))
+    assert [(c.cmd, c.value) for c in result.commands] == [("move", 0.3)]
+    assert result.sources == {"m1": ["m1", "t1", "t2", "m2"]}
+
+
+def test_cancelled_turns_at_the_end_go_with_the_last_command():
+    result = optimize(list(make_sequence([("move", 0.1), ("turn", 0), ("turn", 180)])))
+    assert result.sources == {"m1": ["m1", "t1", "t2"]}
+
+
+def test_big_turns_are_split_into_accepted_steps():
+    result = optimize(list(make_sequence([("turn", 180), ("turn", 180)])), min_angle=45, max_angle=135)
+    assert [c.id for c in result.commands] == ["t1", "t1.1", "t1.2", "t1.3"]
+    assert all(45 <= c.value <= 135 for c in result.commands)
+    assert all(result.sources[c.id] == ["t1", "t2"] for c in result.commands)
+
+
+def test_random_paths_keep_their_end_pose_and_every_id():
+    rng = random.Random(7)
+    for _ in range(200):
+        original = list(make_sequence(random_steps(rng, rng.randint(1, 30))))
+        result = optimize(original)
+
+        # Every original id is delivered with exactly one sent command (split
+        # turns share their sources)
+        covered = [command_id for ids in set(map(tuple, result.sources.values())) for command_id in ids]
+        if result.commands:
+            assert sorted(covered) == sorted(c.id for c in original)
+
+        x, y, heading = end_pose(original)
+        if result.commands:
+            new_x, new_y, new_heading = end_pose(result.commands)
+        else:
+            new_x, new_y, new_heading = 0.0, 0.0, 90.0
+        assert math.isclose(x, new_x, abs_tol=1e-6) and math.isclose(y, new_y, abs_tol=1e-6)
+        assert math.isclose((heading - new_heading + 180) % 360 - 180, 0, abs_tol=1e-6)
@@ -0,0 +1,47 @@
+import random
+
+import PathSimulator
+from Commands import CommandSequence
+from PathSimulator import PathSimulator as Simulator
+
+def random_sequence(rng, count):
+    sequence = CommandSequence()
+    for _ in range(count):
+        if rng.random() < 0.6:
+            sequence.append(sequence.new_move(rng.choice([0.001, 0.05, rng.uniform(0.01, 1)])))
+        else:
+            sequence.append(sequence.new_turn(rng.choice([90, 91, rng.uniform(0, 360)])))
+    return sequence
+
+
+def canvas(track, center, scale):
+    return [(round(center + x * scale), round(center - y * scale)) for x, y in track]
+
+
+def test_canvas_coords_follow_the_track():
+    rng = random.Random(3)
+    for count in (1, 2, 50, 400):
+        simulator = Simulator(random_sequence(rng, count))
+        pose = (0.5, -0.25, 30.0)
+        coords = simulator.canvas_coords(*pose, 250, 50)
+        points = list(zip(coords[::2], coords[1::2]))
+        expected = canvas(simulator.track(*pose), 250, 50)
+        assert points[0] == expected[0] and points[-1] == expected[-1]
+        # Only repeats of the same pixel are left out
+        assert [p for i, p in enumerate(expected) if i == 0 or p != expected[i - 1]][:-1] == points[:-1]
+
+
+def test_long_tracks_are_thinned_to_max_points():
+    sequence = random_sequence(random.Random(4), 10000)
+    simulator = Simulator(sequence)
+    coords = simulator.canvas_coords(0.0, 0.0, 90.0, 250, 50, max_points=500)
+    expected = canvas(simulator.track(), 250, 50)
+    assert 250 <= len(coords) // 2 <= 501
+    assert coords[:2] == list(expected[0]) and coords[-2:] == list(expected[-1])
+
+
+def test_canvas_coords_without_numpy(monkeypatch):
+    sequence = random_sequence(random.Random(5), 3000)
+    with_numpy = Simulator(sequence).canvas_coords(0.1, 0.2, 45.0, 250, 50, max_points=400)
+    monkeypatch.setattr(PathSimulator, "np", None)
+    assert Simulator(sequence).canvas_coords(0.1, 0.2, 45.0, 250, 50, max_points=400) == with_numpy
@@ -3,136 +3,557 @@
 Test script to simulate robot pose API responses.
 This creates a mock HTTP server that responds to /api/pose requests
 with test JSON data to demo the pose display functionality.
+
+Each simulated robot has its own state and its own simulated link, with
+latency, jitter and loss profiles, and counts request rate and latency
+percentiles. Several robots can be served at once (one port each) to
+stand in for a fleet.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 import json
 import time
 import math
+import random
+import threading
+
+import WireFormat
+
+class LinkProfile:
+    """Simulated network between the planner and a robot.
+    Every request is held for latency_ms +- jitter_ms, and `loss` of the
+    command requests are lost - half of those before the robot sees them,
+    half after it ran them but before the reply gets back"""
+    
+    def __init__(self, name="custom", latency_ms=0.0, jitter_ms=0.0, loss=0.0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+    
+    def delay(self):
+        """Sleep for one sampled link delay"""
+        delay_ms = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+    
+    def lost(self):
+        """None, "request" or "reply" - which half of an exchange gets lost"""
+        if random.random() >= self.loss:
+            return None
+        return "request" if random.random() < 0.5 else "reply"
+    
+    def __str__(self):
+        return f"{self.name}: {self.latency_ms:g}±{self.jitter_ms:g} ms, {self.loss:.0%} loss"
+
+
+# Named link profiles, pick one with --profile=NAME
+LINK_PROFILES = {
+    "ideal": LinkProfile("ideal"),
+    "lan": LinkProfile("lan", latency_ms=1, jitter_ms=0.5),
+    "wifi": LinkProfile("wifi", latency_ms=8, jitter_ms=4, loss=0.005),
+    "weak-wifi": LinkProfile("weak-wifi", latency_ms=40, jitter_ms=25, loss=0.03),
+    "lossy": LinkProfile("lossy", latency_ms=20, jitter_ms=10, loss=0.15),
+}
+
+
+class ServerStats:
+    """Thread-safe request counters and service times for one robot"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = 0
+            self.by_endpoint = {}
+            self.dropped = 0
+            self.latencies_ms = []
+    
+    def record(self, endpoint, latency_ms, dropped=False):
+        with self.lock:
+            self.requests += 1
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+            self.latencies_ms.append(latency_ms)
+            if dropped:
+                self.dropped += 1
+    
+    def percentile(self, latencies, p):
+        """Nearest-rank percentile of a sorted list"""
+        if not latencies:
+            return 0.0
+        rank = max(0, min(len(latencies) - 1, math.ceil(p / 100 * len(latencies)) - 1))
+        return latencies[rank]
+    
+    def snapshot(self):
+        """Counters as a dict - also served as JSON on /api/stats"""
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            latencies = sorted(self.latencies_ms)
+            return {
+                "requests": self.requests,
+                "dropped": self.dropped,
+                "elapsed_s": round(elapsed, 3),
+                "rate_per_s": round(self.requests / elapsed, 1),
+                "by_endpoint": dict(self.by_endpoint),
+                "latency_ms": {
+                    "p50": round(self.percentile(latencies, 50), 2),
+                    "p90": round(self.percentile(latencies, 90), 2),
+                    "p99": round(self.percentile(latencies, 99), 2),
+                    "max": round(latencies[-1], 2) if latencies else 0.0,
+                }
+            }
+    
+    def summary(self):
+        stats = self.snapshot()
+        latency = stats["latency_ms"]
+        return (f"{stats['requests']} requests ({stats['rate_per_s']}/s, {stats['dropped']} dropped), "
+                f"latency p50 {latency['p50']} ms, p90 {latency['p90']} ms, p99 {latency['p99']} ms, "
+                f"max {latency['max']} ms")
+
+
+class RobotState:
+    """Everything one simulated robot knows - pose, command buffer, features"""
+    
+    def __init__(self, name="robot", link=None, verbose=True):
+        self.name = name
+        self.link = link or LINK_PROFILES["ideal"]
+        self.verbose = verbose
+        self.stats = ServerStats()
+        self.lock = threading.Lock()
+        
+        # Simulated robot state
+        self.current_x = 0.0
+        self.current_y = 0.0
+        self.time_offset = time.time()
+        self.executed = 0
+        
+        # Batched uploads - set batch_enabled = False to mimic older firmware
+        self.batch_enabled = True
+        self.max_batch = 64
+        
+        # Long-poll pose feed - the simulated pose gets a new version pose_rate_hz times a second
+        self.longpoll_enabled = True
+        self.pose_rate_hz = 20
+        
+        # Pipelined uploads - commands tagged with "seq" may arrive out of order,
+        # they are buffered (up to `window` ahead) and run in seq order
+        self.window = 16
+        self.upload = None
+        self.next_seq = 0
+        self.reorder_buffer = {}
+        
+        # Compact binary wire format (see WireFormat.py) - set binary_enabled = False for JSON only
+        self.binary_enabled = True
+    
+    def log(self, message):
+        if self.verbose:
+            print(message)
+    
+    def capabilities(self):
+        return {
+            "batch": self.batch_enabled,
+            "max_batch": self.max_batch,
+            "pose_longpoll": self.longpoll_enabled,
+            "window": self.window,
+            "binary": 1 if self.binary_enabled else 0
+        }
+    
+    def execute_command(self, command):
+        """Simulate executing a single command"""
+        self.log(f"\n📨 [{self.name}] Received command: {command}")
+        self.executed += 1
+        
+        if command.get('cmd') == 'move':
+            distance = float(command.get('d', 0))
+            direction = int(command.get('dir', 1))
+            self.current_x += distance * direction
+            self.log(f"   ✓ Moving {distance}m {'forward' if direction == 1 else 'backward'}")
+            self.log(f"   New position: ({self.current_x:.2f}, {self.current_y:.2f})")
+        
+        elif command.get('cmd') == 'turn':
+            angle = float(command.get('a', 0))
+            self.log(f"   ✓ Turning to {angle}°")
+    
+    def execute_batch(self, commands):
+        with self.lock:
+            self.log(f"\n📦 [{self.name}] Received batch of {len(commands)} commands")
+            for command in commands:
+                self.execute_command(command)
+    
+    def execute_single(self, command):
+        with self.lock:
+            self.execute_command(command)
+    
+    def receive_pipelined(self, command):
+        """Buffer a pipelined command and run every command that is now
+        next in line. Repeats of commands already received are acknowledged
+        but not run twice. Returns False when seq is beyond the window"""
+        with self.lock:
+            if command.get('upload') != self.upload:
+                # A new path replaces whatever was left of the last one
+                self.upload = command.get('upload')
+                self.next_seq = 0
+                self.reorder_buffer = {}
+            
+            seq = int(command['seq'])
+            if seq < self.next_seq or seq in self.reorder_buffer:
+                self.log(f"\n🔁 [{self.name}] Duplicate of {command.get('id')}, already received")
+                return True
+            if seq >= self.next_seq + self.window:
+                return False
+            
+            self.reorder_buffer[seq] = command
+            while self.next_seq in self.reorder_buffer:
+                self.execute_command(self.reorder_buffer.pop(self.next_seq))
+                self.next_seq += 1
+        return True
+    
+    def pose_version(self):
+        """Version number of the current simulated pose"""
+        return int((time.time() - self.time_offset) * self.pose_rate_hz)
+    
+    def wait_for_pose(self, since, wait_ms):
+        """Block until there is a pose newer than `since`, or wait_ms runs out"""
+        deadline = time.time() + wait_ms / 1000
+        while self.pose_version() <= since and time.time() < deadline:
+            # Sleep until the next pose tick
+            next_tick = (self.pose_version() + 1) / self.pose_rate_hz + self.time_offset
+            time.sleep(max(0.0, min(next_tick, deadline) - time.time()))
+    
+    def pose(self):
+        """The simulated pose response"""
+        # Simulate some movement over time for demo purposes
+        elapsed = time.time() - self.time_offset
+        
+        # Create a circular pattern for demo
+        self.current_x = 2 * math.cos(elapsed * 0.3)
+        self.current_y = 2 * math.sin(elapsed * 0.3)
+        
+        # Format: {"H":"command_id", "pose":{"x":value, "y":value}, "v":version}
+        return {
+            "H": f"pose_{int(elapsed)}",
+            "pose": {
+                "x": round(self.current_x, 2),
+                "y": round(self.current_y, 2)
+            },
+            "v": int(elapsed * self.pose_rate_hz)
+        }
+
 
 class MockRobotAPIHandler(BaseHTTPRequestHandler):
-    """Handler for mock robot API requests"""
+    """Handler for mock robot API requests.
+    Serves the RobotState of the server it belongs to (server.robot)"""
+    
+    # Keep-alive, so clients reuse their pooled connections like with the car
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes - without TCP_NODELAY the
+    # body waits for the client's delayed ACK, adding ~40 ms per request
+    disable_nagle_algorithm = True
     
-    # Simulated robot state
-    current_x = 0.0
-    current_y = 0.0
-    time_offset = 0
+    @property
+    def robot(self):
+        return self.server.robot
+    
+    def parse_request(self):
+        """Start timing once a request line arrives (not while a kept-alive
+        connection sits idle)"""
+        self.request_start = time.perf_counter()
+        self.dropped = False
+        return super().parse_request()
+    
+    def record(self):
+        endpoint = urlparse(self.path).path if getattr(self, 'path', None) else "?"
+        latency_ms = (time.perf_counter() - self.request_start) * 1000
+        self.robot.stats.record(endpoint, latency_ms, self.dropped)
     
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/api/pose':
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        
+        if url.path == '/api/stats':
+            # Not part of the robot's API and not delayed - it's for the test harness
+            if 'reset' in query:
+                self.robot.stats.reset()
+            self.send_json_response(self.robot.stats.snapshot())
+            return
+        
+        self.robot.link.delay()
+        if url.path == '/api/pose':
+            if 'since' in query and self.robot.longpoll_enabled:
+                since = int(query['since'][0])
+                wait_ms = int(query.get('wait', ['1000'])[0])
+                self.robot.wait_for_pose(since, wait_ms)
             self.send_pose_response()
+        elif url.path == '/api/capabilities':
+            self.send_json_response(self.robot.capabilities())
         else:
             self.send_error(404, "Endpoint not found")
+        self.record()
     
     def do_POST(self):
-        """Handle POST requests (for command sending)"""
-        if self.path.startswith('/api/'):
-            # Read the command data
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
+        """Handle POST requests (for command sending)
+        Accepts a single command object or, when batching is enabled,
+        a JSON list of commands executed in order"""
+        robot = self.robot
+        if not self.path.startswith('/api/'):
+            self.send_error(404, "Endpoint not found")
+            self.record()
+            return
+        
+        # Read the command data
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        if WireFormat.is_binary(self.headers):
+            if not robot.binary_enabled:
+                self.send_error(415, "Binary format not supported")
+                self.record()
+                return
+            # One record is a single command, more are a batch
+            try:
+                command = WireFormat.decode_commands(post_data)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                self.record()
+                return
+            if len(command) == 1:
+                command = command[0]
+        else:
             command = json.loads(post_data.decode('utf-8'))
+        robot.link.delay()
+        
+        lost = robot.link.lost()
+        if lost == "request":
+            robot.log(f"\n💥 [{robot.name}] Dropped request {command.get('id') if isinstance(command, dict) else 'batch'}")
+            self.drop()
+            return
+        
+        if isinstance(command, list):
+            if not robot.batch_enabled or len(command) > robot.max_batch:
+                self.send_error(400, "Batch not accepted")
+                self.record()
+                return
             
-            print(f"\n📨 Received command: {command}")
-            
-            # Simulate command execution
-            if command.get('cmd') == 'move':
-                distance = float(command.get('d', 0))
-                direction = int(command.get('dir', 1))
-                self.current_x += distance * direction
-                print(f"   ✓ Moving {distance}m {'forward' if direction == 1 else 'backward'}")
-                print(f"   New position: ({self.current_x:.2f}, {self.current_y:.2f})")
-            
-            elif command.get('cmd') == 'turn':
-                angle = float(command.get('a', 0))
-                print(f"   ✓ Turning to {angle}°")
+            robot.execute_batch(command)
+            response = {
+                "H": command[-1].get('id', 'unknown') if command else 'unknown',
+                "status": "success",
+                "count": len(command)
+            }
+        elif 'seq' in command:
+            if not robot.receive_pipelined(command):
+                self.send_error(409, "Too far ahead of the upload window")
+                self.record()
+                return
             
-            # Send success response
+            response = {
+                "H": command.get('id', 'unknown'),
+                "status": "queued"
+            }
+        else:
+            robot.execute_single(command)
             response = {
                 "H": command.get('id', 'unknown'),
                 "status": "success"
             }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+        
+        if lost == "reply":
+            # Ran the command but the acknowledgement never arrives
+            robot.log(f"\n💥 [{robot.name}] Dropped reply to {response['H']}")
+            self.drop()
+            return
+        
+        # Send success response, in the format the client prefers
+        if self.wants_binary():
+            self.send_binary_response(WireFormat.encode_ack(response['H'], response['status']))
         else:
-            self.send_error(404, "Endpoint not found")
+            self.send_json_response(response)
+        self.record()
+    
+    def drop(self):
+        """Close the connection without answering"""
+        self.dropped = True
+        self.close_connection = True
+        self.record()
+    
+    def wants_binary(self):
+        """Whether to answer in the binary format - binary requests get binary
+        replies, other clients have to ask for it with Accept"""
+        if not self.robot.binary_enabled:
+            return False
+        return WireFormat.is_binary(self.headers) or WireFormat.BINARY_TYPE in self.headers.get('Accept', '')
+    
+    def send_binary_response(self, body):
+        """Send a 200 response with a binary body"""
+        self.send_response(200)
+        self.send_header('Content-Type', WireFormat.BINARY_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_json_response(self, data):
+        """Send a 200 response with a JSON body"""
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
     
     def send_pose_response(self):
         """Send a simulated pose response"""
-        # Simulate some movement over time for demo purposes
-        elapsed = time.time() - MockRobotAPIHandler.time_offset
-        
-        # Create a circular pattern for demo
-        MockRobotAPIHandler.current_x = 2 * math.cos(elapsed * 0.3)
-        MockRobotAPIHandler.current_y = 2 * math.sin(elapsed * 0.3)
-        
-        # Format: {"H":"command_id", "pose":{"x":value, "y":value}}
-        response_data = {
-            "H": f"pose_{int(elapsed)}",
-            "pose": {
-                "x": round(MockRobotAPIHandler.current_x, 2),
-                "y": round(MockRobotAPIHandler.current_y, 2)
-            }
-        }
-        
-        print(f"📍 Sending pose: X={response_data['pose']['x']:.2f}, Y={response_data['pose']['y']:.2f}")
+        response_data = self.robot.pose()
+        self.robot.log(f"📍 [{self.robot.name}] Sending pose: X={response_data['pose']['x']:.2f}, "
+                       f"Y={response_data['pose']['y']:.2f}")
         
         # Send response
+        if self.wants_binary():
+            body = WireFormat.encode_pose(response_data['pose']['x'], response_data['pose']['y'], response_data['v'])
+            content_type = WireFormat.BINARY_TYPE
+        else:
+            body = json.dumps(response_data).encode()
+            content_type = 'application/json'
         self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')  # Allow CORS
         self.end_headers()
-        self.wfile.write(json.dumps(response_data).encode())
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Override to reduce noise in output"""
         pass  # Suppress default logging
 
 
-def run_test_server(port=8080):
-    """Run the mock API server"""
-    MockRobotAPIHandler.time_offset = time.time()
+class MockRobotServer(ThreadingHTTPServer):
+    """One simulated robot on one port, a thread per connection"""
+    
+    daemon_threads = True
     
-    server_address = ('', port)
-    httpd = HTTPServer(server_address, MockRobotAPIHandler)
+    def __init__(self, port, robot):
+        super().__init__(('', port), MockRobotAPIHandler)
+        self.robot = robot
+
+
+def start_servers(port=8080, count=1, link=None, verbose=False, **features):
+    """Start `count` simulated robots on consecutive ports in background
+    threads, for tests and benchmarks. features override RobotState
+    attributes (window=0, batch_enabled=False, ...).
+    Returns the servers - call shutdown() and server_close() when done"""
+    servers = []
+    for i in range(count):
+        robot = RobotState(f"robot{i + 1}" if count > 1 else "robot", link, verbose)
+        for name, value in features.items():
+            setattr(robot, name, value)
+        server = MockRobotServer(port + i, robot)
+        threading.Thread(target=server.serve_forever, name=f"mock-robot-{port + i}", daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def run_test_server(port=8080, count=1, link=None, verbose=True, stats_interval=10.0, **features):
+    """Run the mock API server(s) until Ctrl+C"""
+    servers = start_servers(port, count, link, verbose, **features)
+    robot = servers[0].robot
+    last_port = port + count - 1
     
     print("=" * 60)
     print("🤖 Mock Robot API Server")
     print("=" * 60)
-    print(f"\n✅ Server running on http://localhost:{port}")
+    if count == 1:
+        print(f"\n✅ Server running on http://localhost:{port}")
+    else:
+        print(f"\n✅ {count} robots running on http://localhost:{port} to http://localhost:{last_port}")
     print(f"📍 Pose endpoint: http://localhost:{port}/api/pose")
-    print(f"📨 Command endpoint: http://localhost:{port}/api/command")
+    print(f"📨 Command endpoint: http://localhost:{port}/api/path")
+    print(f"📦 Capabilities: http://localhost:{port}/api/capabilities (batch uploads {'on' if robot.batch_enabled else 'off'}, "
+          f"pose long-poll {'on' if robot.longpoll_enabled else 'off'}, upload window {robot.window}, "
+          f"binary format {'on' if robot.binary_enabled else 'off'})")
+    print(f"📈 Stats: http://localhost:{port}/api/stats (add ?reset to start over)")
+    print(f"🐢 Simulated link: {robot.link}")
     print("\n💡 Usage:")
     print("   1. Run this script in one terminal")
-    print("   2. In PathPlanner.py, set: api_address = 'http://localhost:8080/api/command'")
+    print("   2. In PathPlanner.py, set: robot_address = 'http://localhost:8080'")
     print("   3. Run your GUI application")
     print("   4. Click 'Update Pose' to see simulated position")
     print("   5. Send commands to see them logged here")
+    print("   For a fleet, use --robots=N and start the planner with")
+    print("   --fleet=cars.json, a list of {\"name\": ..., \"address\": ...}")
     print("\n📊 Pose data simulates circular movement pattern")
-    print("   (Updates every time you click 'Update Pose')")
+    print("   (Updates every time you click 'Update Pose', or continuously with 'Live' on)")
     print("\n🛑 Press Ctrl+C to stop the server\n")
     print("-" * 60)
     
     try:
-        httpd.serve_forever()
+        while True:
+            time.sleep(stats_interval)
+            for server in servers:
+                if server.robot.stats.requests:
+                    print(f"📈 [{server.robot.name}] {server.robot.stats.summary()}")
     except KeyboardInterrupt:
         print("\n\n🛑 Shutting down server...")
-        httpd.shutdown()
+        for server in servers:
+            print(f"📈 [{server.robot.name}] {server.robot.stats.summary()}")
+            server.shutdown()
+            server.server_close()
         print("✅ Server stopped\n")
 
 
 if __name__ == "__main__":
     import sys
     
-    # Allow custom port as argument
+    # Options:
+    #   --no-batch / --no-longpoll / --window=0   mimic firmware without those features
+    #   --no-binary                                JSON only, no binary wire format
+    #   --profile=NAME                             link profile: ideal, lan, wifi, weak-wifi, lossy
+    #   --latency=MS --jitter=MS --drop=RATE       custom link, overriding the profile
+    #   --robots=N                                 serve N robots on consecutive ports
+    #   --quiet                                    don't log every request
+    features = {}
+    link = LINK_PROFILES["ideal"]
+    custom = {}
+    count = 1
+    verbose = True
     port = 8080
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            print(f"Invalid port: {sys.argv[1]}, using default 8080")
     
-    run_test_server(port)
+    for arg in sys.argv[1:]:
+        option, _, value = arg.partition("=")
+        if option == "--no-batch":
+            features["batch_enabled"] = False
+        elif option == "--no-longpoll":
+            features["longpoll_enabled"] = False
+        elif option == "--no-binary":
+            features["binary_enabled"] = False
+        elif option == "--window":
+            features["window"] = int(value)
+        elif option == "--profile":
+            if value not in LINK_PROFILES:
+                print(f"Unknown profile {value}, choose from {', '.join(LINK_PROFILES)}")
+                sys.exit(1)
+            link = LINK_PROFILES[value]
+        elif option in ("--latency", "--jitter", "--drop"):
+            custom[option[2:]] = float(value)
+        elif option == "--robots":
+            count = int(value)
+        elif option == "--quiet":
+            verbose = False
+        else:
+            # Allow custom port as argument
+            try:
+                port = int(arg)
+            except ValueError:
+                print(f"Invalid port: {arg}, using default 8080")
+    
+    if custom:
+        link = LinkProfile(
+            "custom",
+            latency_ms=custom.get("latency", link.latency_ms),
+            jitter_ms=custom.get("jitter", link.jitter_ms),
+            loss=custom.get("drop", link.loss)
+        )
+    
+    run_test_server(port, count, link, verbose, **features)
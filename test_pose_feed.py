@@ -0,0 +1,143 @@
+import requests
+
+from PoseFeed import PoseFeed
+
+class ManualRoot:
+    """Runs root.after callbacks one at a time when told to, no display needed"""
+
+    def __init__(self):
+        self.timers = {}
+        self.counter = 0
+
+    def after(self, delay_ms, callback):
+        self.counter += 1
+        self.timers[self.counter] = callback
+        return self.counter
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def step(self):
+        self.timers.pop(min(self.timers))()
+
+
+class Job:
+    done = False
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ManualNetwork:
+    """Holds submitted work until run() is called"""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        job = Job()
+        self.pending.append((job, fn, args, on_done, on_error))
+        return job
+
+    def run(self):
+        job, fn, args, on_done, on_error = self.pending.pop(0)
+        try:
+            result = fn(job, *args)
+        except Exception as e:
+            job.done = True
+            on_error(e)
+        else:
+            job.done = True
+            on_done(result)
+
+
+class FakeRobot:
+    """Pose source that can go down, restart and refuse the capability check.
+    Like RobotClient, capabilities are only cached once the check succeeds"""
+
+    def __init__(self):
+        self.up = True
+        self.capabilities_up = True
+        self.version = 0
+        self.capabilities = None
+        self.capability_requests = 0
+        self.polls = []  # `since` of every pose request
+
+    def read_pose(self, since=None, wait_ms=0):
+        self.polls.append(since)
+        if not self.up:
+            raise requests.exceptions.ConnectionError("robot is down")
+        self.version += 1
+        return 0.0, 0.0, self.version
+
+    def supports_pose_longpoll(self):
+        if self.capabilities is None:
+            self.capability_requests += 1
+            if not (self.up and self.capabilities_up):
+                return False
+            self.capabilities = {"pose_longpoll": True}
+        return self.capabilities["pose_longpoll"]
+
+
+def feed_for(robot):
+    root, network = ManualRoot(), ManualNetwork()
+    feed = PoseFeed(root, network, robot, on_pose=lambda x, y: None)
+
+    def poll():
+        """Run timers until the feed asks for a pose, then answer it"""
+        while not network.pending:
+            root.step()
+        network.run()
+    return feed, poll
+
+
+def test_a_robot_that_is_down_is_not_asked_for_capabilities():
+    robot = FakeRobot()
+    robot.up = False
+    feed, poll = feed_for(robot)
+    feed.start()
+    for _ in range(5):
+        poll()
+    assert robot.polls == [None] * 5 and robot.capability_requests == 0
+    assert feed.stats["errors"] == 5 and feed.longpoll is None
+
+    # The robot is back but its capability check fails - ask again next time
+    robot.up = True
+    robot.capabilities_up = False
+    poll()
+    assert robot.capability_requests == 1 and feed.longpoll is None
+    robot.capabilities_up = True
+    poll()
+    assert robot.capability_requests == 2 and feed.longpoll is True
+
+    for _ in range(3):
+        poll()
+    assert robot.capability_requests == 2
+    assert robot.polls[-3:] == [2, 3, 4]
+
+
+def test_versions_start_over_after_a_restart():
+    robot = FakeRobot()
+    feed, poll = feed_for(robot)
+    feed.start()
+    for _ in range(3):
+        poll()
+    assert feed.version == 3 and robot.polls == [None, 1, 2]
+
+    # The robot restarts and counts from 0 again, the long-poll still gets through
+    robot.version = 0
+    poll()
+    assert feed.stats["restarts"] == 1 and feed.version == 1
+    poll()
+    assert robot.polls[-1] == 1 and feed.version == 2
+
+    # Restarting the feed forgets the version, the robot may have restarted meanwhile
+    feed.stop()
+    robot.version = 100
+    feed.start()
+    assert feed.version is None and feed.longpoll is None
+    poll()
+    poll()
+    assert robot.polls[-2:] == [None, 101]
+    assert feed.stats["restarts"] == 1 and feed.version == 102
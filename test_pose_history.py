@@ -0,0 +1,35 @@
+import math
+from collections import deque
+
+from PoseHistory import PoseHistory
+
+def test_buffers_grow_lazily_and_wrap_in_order():
+    history = PoseHistory(capacity=1000, initial=16)
+    assert len(history.t) == 16
+    reference = deque(maxlen=1000)
+    for i in range(2500):
+        history.append(i * 0.01, -i * 0.01, 90.0, t=float(i))
+        reference.append((float(i), i * 0.01, -i * 0.01, 90.0))
+        if i == 100:
+            assert len(history.t) == 128 and list(history) == list(reference)
+    assert len(history.t) == 1000
+    assert list(history) == list(reference)
+    assert history.last() == reference[-1]
+    t, x, _, _ = history.as_arrays()
+    assert list(t) == [sample[0] for sample in reference] and x[0] == reference[0][1]
+
+
+def test_decimated_keeps_the_shape_in_few_points():
+    history = PoseHistory()
+    for i in range(5000):
+        angle = i / 5000 * 2 * math.pi
+        history.append(math.cos(angle), math.sin(angle), t=float(i))
+    points = history.decimated(0.01, 0.005)
+    assert points[0] == (1.0, 0.0) and 20 < len(points) < 200
+    assert all(abs(math.hypot(x, y) - 1.0) < 1e-9 for x, y in points)
+    assert len(history.decimated(0.01, 0.005, max_points=10)) <= 10
+
+    # Only samples from `since` on
+    recent = history.decimated(0.0, 0.0, since=4990.0)
+    assert len(recent) == 10 and recent[0] == (history.x[4990], history.y[4990])
+    assert history.decimated(since=6000.0) == []
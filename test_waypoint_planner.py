@@ -0,0 +1,154 @@
+import heapq
+import math
+import random
+import time
+
+import pytest
+
+from WaypointPlanner import OccupancyGrid, NoRouteError, plan_route, route_cells
+
+def grid_distance(grid, start, goal):
+    """Shortest 8-connected path length between two cells, diagonals not
+    cutting corners - the search route_cells has to agree with. None when
+    there is no path"""
+    distance = {start: 0.0}
+    heap = [(0.0, start)]
+    while heap:
+        d, (column, row) = heapq.heappop(heap)
+        if (column, row) == goal:
+            return d
+        if d > distance[(column, row)]:
+            continue
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                c, r = column + dc, row + dr
+                if (dc, dr) == (0, 0) or not (0 <= c < grid.width and 0 <= r < grid.height) or grid.blocked(c, r):
+                    continue
+                if dc and dr and (grid.blocked(column + dc, row) or grid.blocked(column, row + dr)):
+                    continue
+                nd = d + (math.sqrt(2) if dc and dr else 1.0)
+                if nd < distance.get((c, r), math.inf):
+                    distance[(c, r)] = nd
+                    heapq.heappush(heap, (nd, (c, r)))
+    return None
+
+
+def length(points):
+    return sum(math.dist(a, b) for a, b in zip(points, points[1:]))
+
+
+def random_grid(rng, factor):
+    width, height = rng.randint(5, 70), rng.randint(5, 70)
+    grid = OccupancyGrid(width, height, 0.032, 0, 0, coarse_factor=factor)
+    for _ in range(rng.randint(0, 30)):
+        column, row = rng.randrange(width), rng.randrange(height)
+        if rng.random() < 0.5:
+            grid.fill(column, row, column + rng.randint(0, 15), row + rng.randint(0, 2))
+        else:
+            grid.fill(column, row, column + rng.randint(0, 2), row + rng.randint(0, 15))
+    density = rng.choice([0.0, 0.05, 0.15])
+    for row in range(height):
+        for column in range(width):
+            if rng.random() < density:
+                grid.fill(column, row, column, row)
+    return grid
+
+
+def wall(gap_rows):
+    """The default 500 x 500 grid cut by a wall 3 cells thick, open at gap_rows"""
+    grid = OccupancyGrid()
+    grid.fill(250, 0, 252, 499)
+    for row in gap_rows:
+        grid.fill(250, row, 252, row, blocked=False)
+    return grid
+
+
+@pytest.mark.parametrize("factor", [4, 8, 16])
+def test_routes_agree_with_a_full_search(factor):
+    rng = random.Random(factor)
+    routes = 0
+    for _ in range(60):
+        grid = random_grid(rng, factor)
+        for _ in range(4):
+            start = (rng.randrange(grid.width), rng.randrange(grid.height))
+            goal = (rng.randrange(grid.width), rng.randrange(grid.height))
+            if grid.blocked(*start) or grid.blocked(*goal):
+                continue
+            shortest = grid_distance(grid, start, goal)
+            if shortest is None:
+                with pytest.raises(NoRouteError):
+                    route_cells(grid, start, goal)
+                continue
+            points, _ = route_cells(grid, start, goal)
+            routes += 1
+            assert points[0] == start and points[-1] == goal
+            assert all(grid.line_of_sight(a, b) for a, b in zip(points, points[1:]))
+            # Straight segments never need more than the grid path, give or
+            # take the detours of threading through the coarse cells
+            assert length(points) <= 2 * shortest + 2 * factor
+            # Edits keep the coarse graph current
+            grid.fill(rng.randrange(grid.width), rng.randrange(grid.height),
+                      rng.randrange(grid.width), rng.randrange(grid.height), rng.random() < 0.3)
+    assert routes > 100
+
+
+def test_incremental_updates_match_a_fresh_grid():
+    rng = random.Random(5)
+    grid = OccupancyGrid(90, 70, 0.032, 0, 0, coarse_factor=8)
+    for _ in range(300):
+        column, row = rng.randrange(90), rng.randrange(70)
+        grid.fill(column, row, column + rng.randint(0, 6), row + rng.randint(0, 6), rng.random() < 0.6)
+
+    fresh = OccupancyGrid(90, 70, 0.032, 0, 0, coarse_factor=8)
+    for row in range(70):
+        for column in range(90):
+            if grid.blocked(column, row):
+                fresh.fill(column, row, column, row)
+    assert fresh.labels == grid.labels
+    for k in range(grid.coarse_width * grid.coarse_height):
+        assert sorted(fresh.links_of(k)) == sorted(grid.links_of(k))
+
+
+def test_a_gap_far_from_the_straight_line_is_found_quickly():
+    grid = wall([9, 10])
+    best = math.inf
+    for _ in range(3):
+        began = time.perf_counter()
+        points, expanded = route_cells(grid, (100, 250), (400, 250))
+        best = min(best, time.perf_counter() - began)
+    assert min(row for column, row in points) <= 10  # through the gap
+    assert all(grid.line_of_sight(a, b) for a, b in zip(points, points[1:]))
+    # Only the coarse graph is searched - the old full search expanded 117k cells
+    assert expanded <= grid.coarse_width * grid.coarse_height
+    assert best < 0.1
+
+
+def test_no_route_is_a_quick_answer():
+    grid = wall([])
+    began = time.perf_counter()
+    with pytest.raises(NoRouteError):
+        route_cells(grid, (100, 250), (400, 250))
+    assert time.perf_counter() - began < 0.1
+
+
+def test_plan_route_drives_through_every_waypoint():
+    grid = OccupancyGrid()
+    for i in range(60):
+        grid.paint(1.0, -1.0 + i * 0.032, 0.15)
+    waypoints = [(2.0, 0.0), (2.0, 2.0), (-1.0, 1.0)]
+    route = plan_route(grid, (0.0, 0.0, 90.0), waypoints)
+
+    x, y, heading = 0.0, 0.0, 90.0
+    reached = []
+    for cmd, value in route.commands:
+        if cmd == "turn":
+            assert abs(value - 90.0) <= 90.0
+            heading += value - 90.0
+        else:
+            x += value * math.cos(math.radians(heading))
+            y += value * math.sin(math.radians(heading))
+            reached.append((x, y))
+    for target in waypoints:
+        assert any(math.dist(point, target) < 0.01 for point in reached)
+    with pytest.raises(NoRouteError, match="Waypoint 1"):
+        plan_route(grid, (0.0, 0.0, 90.0), [(9.0, 0.0)])
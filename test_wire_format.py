@@ -0,0 +1,84 @@
+import math
+import random
+
+import pytest
+
+import WireFormat
+from WireFormat import (decode_ack, decode_commands, decode_pose, encode_ack, encode_command,
+                        encode_commands, encode_pose, join_id, split_id)
+
+def random_command(rng, seq=None, upload=None):
+    """A command dict as the robot's JSON format has it, values exact in float32"""
+    command_id = f"{rng.choice('mt')}{rng.randint(0, 10 ** 6)}"
+    if rng.random() < 0.3:
+        command_id += f".{rng.randint(1, 255)}"
+    if command_id[0] == "m":
+        command = {"cmd": "move", "d": rng.randint(-400, 400) / 8, "dir": rng.choice([1, -1]), "id": command_id}
+    else:
+        command = {"cmd": "turn", "a": rng.randint(0, 1440) / 4, "id": command_id}
+    if seq is not None:
+        command["seq"] = seq
+        command["upload"] = upload
+    return command
+
+
+def test_ids_round_trip():
+    assert split_id("m12") == (ord("m"), 0, 12)
+    assert split_id("t3.1") == (ord("t"), 1, 3)
+    for command_id in ["m0", "t7", "t3.1", "x4294967295", "m12.255"]:
+        assert join_id(*split_id(command_id)) == command_id
+
+
+@pytest.mark.parametrize("command_id", ["12", "m", "mx", "m1.x", "é1", "m4294967296", "t1.256", "m-1"])
+def test_ids_without_an_encoding_are_refused(command_id):
+    with pytest.raises(ValueError):
+        split_id(command_id)
+
+
+def test_commands_round_trip():
+    rng = random.Random(1)
+    for _ in range(500):
+        command = random_command(rng) if rng.random() < 0.5 else random_command(rng, rng.randint(0, 10 ** 6), rng.randint(0, 99999))
+        body = encode_command(command)
+        assert len(body) == WireFormat.COMMAND.size
+        assert decode_commands(body) == [command]
+
+
+def test_batches_round_trip():
+    rng = random.Random(2)
+    batch = [random_command(rng, seq, 77) for seq in range(50)]
+    body = encode_commands(batch)
+    assert len(body) == 50 * WireFormat.COMMAND.size
+    assert decode_commands(body) == batch
+    assert encode_commands(batch[0]) == encode_command(batch[0])
+
+
+def test_bodies_that_are_not_whole_records_are_refused():
+    body = encode_command({"cmd": "move", "d": 0.5, "dir": 1, "id": "m1"})
+    with pytest.raises(ValueError):
+        decode_commands(body[:-1])
+    with pytest.raises(ValueError):
+        decode_commands(b"\x09" + body[1:])  # unknown command code
+
+
+def test_acks_round_trip():
+    for command_id in ["m1", "t3.1", "m4294967295"]:
+        for status in ["success", "queued"]:
+            assert decode_ack(encode_ack(command_id, status)) == {"H": command_id, "status": status}
+    with pytest.raises(ValueError):
+        decode_ack(encode_ack("m1") + b"\x00")
+
+
+def test_poses_round_trip():
+    assert decode_pose(encode_pose(1.5, -0.25, 42)) == (1.5, -0.25, 42)
+    assert decode_pose(encode_pose(0.0, 3.0)) == (0.0, 3.0, None)
+    x, y, _ = decode_pose(encode_pose(0.1, -7.3, 0))
+    assert math.isclose(x, 0.1, rel_tol=1e-6) and math.isclose(y, -7.3, rel_tol=1e-6)
+    with pytest.raises(ValueError):
+        decode_pose(b"\x00" * 8)
+
+
+def test_content_type_is_recognised():
+    assert WireFormat.is_binary({"Content-Type": WireFormat.BINARY_TYPE + "; charset=binary"})
+    assert not WireFormat.is_binary({"Content-Type": WireFormat.JSON_TYPE})
+    assert not WireFormat.is_binary({})